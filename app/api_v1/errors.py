@@ -0,0 +1,22 @@
+from fastapi import HTTPException, status
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.crud.transaction import retryable_sqlstate
+
+
+def database_error(error: SQLAlchemyError) -> HTTPException:
+    """Ответ на ошибку базы данных.
+
+    Если повторы транзакции исчерпаны из-за конфликта блокировок, возвращается
+    503 с заголовком Retry-After, чтобы клиент повторил запрос позже, а не сразу.
+    """
+    if retryable_sqlstate(error) is not None:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Кошелёк занят, повторите запрос позже",
+            headers={"Retry-After": "1"},
+        )
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail="Внутренняя ошибка сервера",
+    )
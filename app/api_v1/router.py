@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+
+from app.api_v1.transfer.views import router as transfer_router
+from app.api_v1.wallet.views import router as wallet_router
+
+router = APIRouter()
+router.include_router(router=wallet_router, prefix="/wallets")
+router.include_router(router=transfer_router, prefix="/transfers")
@@ -0,0 +1,48 @@
+from decimal import Decimal
+from uuid import UUID
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.api_v1.wallet.schemas import OperationResponse
+from app.core.config import settings
+
+
+class TransferCreate(BaseModel):
+    from_wallet_id: UUID
+    to_wallet_id: UUID
+    amount: Decimal = Field(gt=0, description="Сумма должна быть положительной")
+
+    @model_validator(mode="after")
+    def _different_wallets(self) -> "TransferCreate":
+        if self.from_wallet_id == self.to_wallet_id:
+            raise ValueError("Кошельки отправителя и получателя совпадают")
+        return self
+
+
+class TransferResponse(BaseModel):
+    """Выполненный перевод: списание с отправителя и зачисление получателю."""
+
+    id: UUID
+    outgoing: OperationResponse
+    incoming: OperationResponse
+
+
+class TransferBatchRequest(BaseModel):
+    transfers: list[TransferCreate] = Field(
+        min_length=1,
+        max_length=settings.wallet.batch_max_operations,
+    )
+    atomic: bool = Field(
+        default=True,
+        description="Откатить весь пакет при первой ошибке",
+    )
+
+
+class TransferBatchResult(BaseModel):
+    status_code: int
+    transfer: TransferResponse | None = None
+    detail: str | None = None
+
+
+class TransferBatchResponse(BaseModel):
+    results: list[TransferBatchResult]
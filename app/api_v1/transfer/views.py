@@ -0,0 +1,92 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api_v1.errors import database_error
+from app.api_v1.transfer.schemas import (
+    TransferBatchRequest,
+    TransferBatchResponse,
+    TransferBatchResult,
+    TransferCreate,
+    TransferResponse,
+)
+from app.core import db_helper, logger
+from app.core.responses import ModelResponse
+from app.crud.wallet import apply_transfers
+
+router = APIRouter(tags=["Transfer"])
+
+
+@router.post("", response_model=TransferResponse)
+async def create_transfer(
+    data: TransferCreate,
+    session: Annotated[AsyncSession, Depends(db_helper.sesion_getter)],
+) -> ModelResponse:
+    """Переводит средства с одного кошелька на другой одной транзакцией.
+
+    Args:
+        data: Кошельки отправителя и получателя и сумма.
+        session: Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        TransferResponse: Перевод и его операции TRANSFER_OUT и TRANSFER_IN.
+
+    Raises:
+        HTTPException:
+            - 404: Если один из кошельков не найден.
+            - 422: Если недостаточно средств или валюты кошельков не совпадают.
+            - 500: Если произошла ошибка сервера.
+            - 503: Если транзакция не выполнена из-за конфликта блокировок.
+    """
+    try:
+        (result,) = await apply_transfers(session, [data])
+    except SQLAlchemyError as e:
+        logger.error("Ошибка в эндпоинте create_transfer: %s", e)
+        raise database_error(e)
+    if isinstance(result, HTTPException):
+        raise result
+    return ModelResponse(result)
+
+
+@router.post(":batch", response_model=TransferBatchResponse)
+async def create_transfers_batch(
+    data: TransferBatchRequest,
+    session: Annotated[AsyncSession, Depends(db_helper.sesion_getter)],
+) -> ModelResponse:
+    """Выполняет пакет переводов в одной транзакции.
+
+    Args:
+        data: Переводы и режим выполнения.
+        session: Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        TransferBatchResponse: Результат для каждого перевода в порядке запроса.
+
+    Raises:
+        HTTPException:
+            - 404: Если atomic=True и один из кошельков не найден.
+            - 422: Если atomic=True и один из переводов невозможен.
+            - 500: Если произошла ошибка сервера.
+            - 503: Если транзакция не выполнена из-за конфликта блокировок.
+    """
+    try:
+        results = await apply_transfers(session, data.transfers, atomic=data.atomic)
+    except SQLAlchemyError as e:
+        logger.error("Ошибка в эндпоинте create_transfers_batch: %s", e)
+        raise database_error(e)
+    return ModelResponse(
+        TransferBatchResponse(
+            results=[
+                TransferBatchResult(
+                    status_code=result.status_code, detail=result.detail
+                )
+                if isinstance(result, HTTPException)
+                else TransferBatchResult(
+                    status_code=status.HTTP_200_OK, transfer=result
+                )
+                for result in results
+            ]
+        )
+    )
@@ -1,9 +1,19 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
+from typing import Literal
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    field_serializer,
+    field_validator,
+)
 
+from app.core.config import settings
+from app.core.money import Currency, format_minor
 from app.models.models import OperationType
 
 
@@ -13,26 +23,150 @@ class WalletBase(BaseModel):
 
 class WalletCreateResponse(WalletBase):
     email: str
+    currency: Currency
     model_config = ConfigDict(from_attributes=True)
 
 
-class WalletResponse(WalletBase):
-    balance: Decimal
+class MoneyModel(BaseModel):
+    """Модель с суммами ``amount`` и ``balance`` в минимальных единицах ``currency``.
+
+    В JSON суммы выводятся десятичными строками с числом знаков валюты.
+    """
+
+    currency: Currency
+
+    @field_serializer("amount", "balance", check_fields=False)
+    def _format_money(self, value: int | None) -> str | None:
+        return None if value is None else format_minor(value, self.currency)
+
+
+class WalletResponse(MoneyModel, WalletBase):
+    balance: int
+
+
+class WalletStripesUpdate(BaseModel):
+    stripes: int = Field(
+        ge=0,
+        le=settings.wallet.max_stripes,
+        description="Число полос баланса, 0 - без полос",
+    )
+
+
+class WalletStripesResponse(WalletResponse):
+    stripes: int
 
 
 class OperationCreate(BaseModel):
     operation_type: OperationType
     amount: Decimal = Field(gt=0, description="Сумма должна быть положительной")
 
+    @field_validator("operation_type")
+    @classmethod
+    def _not_transfer(cls, value: OperationType) -> OperationType:
+        if value in (OperationType.TRANSFER_IN, OperationType.TRANSFER_OUT):
+            raise ValueError("Переводы выполняются через POST /api/v1/transfers")
+        return value
+
 
-class OperationResponse(BaseModel):
+class OperationResponse(MoneyModel):
     id: UUID
     wallet_id: UUID
     operation_type: OperationType
-    amount: Decimal
+    amount: int
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
 
+class WalletEvent(MoneyModel):
+    """Событие ленты кошелька: текущий баланс при подписке или новая операция.
+
+    ``balance`` - баланс после операции; None, если он неизвестен (режим ledger).
+    """
+
+    event: Literal["snapshot", "operation"]
+    wallet_id: UUID
+    balance: int | None = None
+    operation: OperationResponse | None = None
+
+
+class BatchOperationItem(OperationCreate):
+    wallet_id: UUID
+
+
+class BatchOperationRequest(BaseModel):
+    operations: list[BatchOperationItem] = Field(
+        min_length=1,
+        max_length=settings.wallet.batch_max_operations,
+    )
+    atomic: bool = Field(
+        default=True,
+        description="Откатить весь пакет при первой ошибке",
+    )
+
+
+class BatchOperationResult(BaseModel):
+    status_code: int
+    operation: OperationResponse | None = None
+    detail: str | None = None
+
+
+class BatchOperationResponse(BaseModel):
+    results: list[BatchOperationResult]
+
+
+class OperationPage(BaseModel):
+    items: list[OperationResponse]
+    next_cursor: str | None = None
+
+
 class EmailWallet(BaseModel):
     email: EmailStr
+    currency: Currency = Field(default_factory=lambda: settings.wallet.default_currency)
+
+
+class BulkWalletCreate(BaseModel):
+    emails: list[EmailStr] = Field(
+        min_length=1,
+        max_length=settings.wallet.bulk_max_wallets,
+    )
+    currency: Currency = Field(default_factory=lambda: settings.wallet.default_currency)
+
+
+class BulkWalletCreateResponse(BaseModel):
+    created: list[WalletCreateResponse]
+    duplicates: list[str]
+
+
+class WalletStatsBucket(MoneyModel):
+    """Суммы и число операций каждого типа за день или месяц.
+
+    ``period`` - первый день периода, ``net_amount`` - поступления минус
+    списания.
+    """
+
+    period: date
+    deposit_amount: int = 0
+    deposit_count: int = 0
+    withdraw_amount: int = 0
+    withdraw_count: int = 0
+    transfer_in_amount: int = 0
+    transfer_in_count: int = 0
+    transfer_out_amount: int = 0
+    transfer_out_count: int = 0
+    net_amount: int = 0
+
+    @field_serializer(
+        "deposit_amount",
+        "withdraw_amount",
+        "transfer_in_amount",
+        "transfer_out_amount",
+        "net_amount",
+    )
+    def _format_amounts(self, value: int) -> str:
+        return format_minor(value, self.currency)
+
+
+class WalletStatsResponse(BaseModel):
+    wallet_id: UUID
+    granularity: Literal["day", "month"]
+    buckets: list[WalletStatsBucket]
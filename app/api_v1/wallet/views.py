@@ -1,43 +1,216 @@
+import asyncio
 import uuid
-from typing import Annotated
+from collections.abc import AsyncIterator
+from datetime import date, datetime
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    WebSocket,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api_v1.errors import database_error
 from app.api_v1.wallet.schemas import (
+    BatchOperationRequest,
+    BatchOperationResponse,
+    BatchOperationResult,
+    BulkWalletCreate,
+    BulkWalletCreateResponse,
     EmailWallet,
     OperationCreate,
+    OperationPage,
     OperationResponse,
     WalletCreateResponse,
+    WalletEvent,
     WalletResponse,
+    WalletStatsResponse,
+    WalletStripesResponse,
+    WalletStripesUpdate,
 )
 from app.core import db_helper, logger
+from app.core.cache import balance_cache, currency_cache, email_cache
+from app.core.config import settings
+from app.core.events import Subscription, event_hub
+from app.core.responses import ModelResponse
 from app.crud.base import test_connection
+from app.crud.coalescer import operation_coalescer
+from app.crud.operation import get_wallet_operations, stream_operations
+from app.crud.stats import get_wallet_stats
+from app.crud.stripes import set_wallet_stripes
 from app.crud.wallet import (
+    apply_operations,
     create_wallet_by_email,
+    create_wallets_bulk,
+    get_wallet_balance,
+    get_wallet_by_email,
     get_wallet_by_id,
+    normalize_email,
     update_wallet_balance,
 )
+from app.models import OperationType
 
 router = APIRouter(tags=["Wallet"])
 
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_response(
+    session: AsyncSession,
+    export_format: Literal["ndjson", "csv"],
+    filename: str,
+    **filters,
+) -> StreamingResponse:
+    """Оборачивает потоковую выгрузку операций в ``StreamingResponse``."""
+    return StreamingResponse(
+        stream_operations(
+            session,
+            export_format,
+            settings.wallet.export_chunk_size,
+            **filters,
+        ),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        },
+    )
+
+
+WS_CLOSE_NOT_FOUND = 4404
+
+
+async def wallet_snapshot(session: AsyncSession, wallet_id: uuid.UUID) -> str:
+    """Событие с текущим балансом кошелька, отправляемое подписчику первым.
+
+    Raises:
+        HTTPException:
+            - 404: Если кошелёк не найден.
+    """
+    wallet = await get_wallet_balance(session, wallet_id)
+    if wallet is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Кошелёк не найден",
+        )
+    balance, currency = wallet
+    return WalletEvent(
+        event="snapshot", wallet_id=wallet_id, currency=currency, balance=balance
+    ).model_dump_json()
+
+
+async def sse_events(
+    subscription: Subscription,
+    snapshot: str,
+    heartbeat: float,
+) -> AsyncIterator[str]:
+    """Поток SSE: снимок баланса, затем события кошелька и пинги.
+
+    Отключённый как медленный подписчик получает событие ``dropped`` и должен
+    переподключиться.
+    """
+    try:
+        yield f"data: {snapshot}\n\n"
+        while True:
+            try:
+                payload = await asyncio.wait_for(subscription.get(), heartbeat)
+            except TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if payload is None:
+                yield "event: dropped\ndata: {}\n\n"
+                return
+            yield f"data: {payload}\n\n"
+    finally:
+        event_hub.unsubscribe(subscription)
+
+
+async def forward_events(websocket: WebSocket, subscription: Subscription) -> None:
+    """Пересылает события подписки в WebSocket до отключения подписчика."""
+    while (payload := await subscription.get()) is not None:
+        await websocket.send_text(payload)
+    await websocket.close(
+        code=status.WS_1013_TRY_AGAIN_LATER,
+        reason="Подписчик не успевает читать события",
+    )
+
 
 @router.get("/health_check")
 async def health_check(
-    session: Annotated[AsyncSession, Depends(db_helper.sesion_getter)],
+    session: Annotated[AsyncSession, Depends(db_helper.replica_session_getter)],
 ):
     try:
         await test_connection(session)
-        return {"messege": "OK"}
+        # Состояние пула того движка, на котором выполнена проверка.
+        database = "replica" if db_helper.is_replica_session(session) else "primary"
+        return {
+            "messege": "OK",
+            "database": database,
+            "pool": db_helper.pool_status(session.bind),
+        }
     except Exception as e:
-        logger.error(f"Error connect with db: {e}")
+        logger.error("Error connect with db: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Внутренняя ошибка сервера",
         )
 
 
+@router.post(
+    "/operations:batch",
+    response_model=BatchOperationResponse,
+)
+async def create_operations_batch(
+    data: BatchOperationRequest,
+    session: Annotated[AsyncSession, Depends(db_helper.sesion_getter)],
+) -> ModelResponse:
+    """Выполняет пакет операций над кошельками в одной транзакции.
+
+    Args:
+        data: Операции (UUID кошелька, тип и сумма) и режим выполнения.
+        session: Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        BatchOperationResponse: Результат для каждой операции в порядке запроса.
+
+    Raises:
+        HTTPException:
+            - 404: Если atomic=True и кошелёк одной из операций не найден.
+            - 422: Если atomic=True и для одного из снятий недостаточно средств.
+            - 500: Если произошла ошибка сервера.
+            - 503: Если транзакция не выполнена из-за конфликта блокировок.
+    """
+    try:
+        results = await apply_operations(
+            session,
+            [(item.wallet_id, item) for item in data.operations],
+            atomic=data.atomic,
+        )
+    except SQLAlchemyError as e:
+        logger.error("Ошибка в эндпоинте create_operations_batch: %s", e)
+        raise database_error(e)
+    return ModelResponse(
+        BatchOperationResponse(
+            results=[
+                BatchOperationResult(
+                    status_code=result.status_code, detail=result.detail
+                )
+                if isinstance(result, HTTPException)
+                else BatchOperationResult(
+                    status_code=status.HTTP_200_OK, operation=result
+                )
+                for result in results
+            ]
+        )
+    )
+
+
 @router.post(
     "/{wallet_id}/operation",
     response_model=OperationResponse,
@@ -46,13 +219,20 @@ async def create_operation(
     wallet_id: uuid.UUID,
     operation: OperationCreate,
     session: Annotated[AsyncSession, Depends(db_helper.sesion_getter)],
-):
+    idempotency_key: Annotated[str | None, Header(max_length=255)] = None,
+) -> ModelResponse:
     """Выполняет операцию (пополнение или снятие) на кошельке.
 
+    При включённой настройке ``wallet.coalesce_enabled`` операция проходит через
+    очередь кошелька и может быть применена в одной транзакции с соседними.
+    Запросы с заголовком ``Idempotency-Key`` выполняются напрямую: повтор с тем
+    же ключом возвращает исходную операцию, не применяя её снова.
+
     Args:
         wallet_id: UUID кошелька.
         operation: Данные операции (тип: 'DEPOSIT', 'WITHDRAW' и сумма).
         session: Асинхронная сессия SQLAlchemy.
+        idempotency_key: Ключ идемпотентности запроса.
 
     Returns:
         OperationResponse: Данные созданной операции.
@@ -60,46 +240,432 @@ async def create_operation(
     Raises:
         HTTPException:
             - 404: Если кошелёк не найден.
+            - 409: Если ключ идемпотентности использован для другой операции.
             - 422: Если недостаточно средств.
             - 500: Если произошла ошибка сервера.
+            - 503: Если транзакция не выполнена из-за конфликта блокировок.
     """
     try:
-        return await update_wallet_balance(session, wallet_id, operation)
+        if settings.wallet.coalesce_enabled and idempotency_key is None:
+            response = await operation_coalescer.submit(wallet_id, operation)
+        else:
+            response = await update_wallet_balance(
+                session, wallet_id, operation, idempotency_key
+            )
     except SQLAlchemyError as e:
-        logger.error(f"Ошибка в эндпоинте create_operation для кошелька {wallet_id}: {e}")
+        logger.error(
+            "Ошибка в эндпоинте create_operation для кошелька %s: %s",
+            wallet_id,
+            e,
+            extra={"wallet_id": wallet_id},
+        )
+        raise database_error(e)
+    return ModelResponse(response)
+
+
+@router.get("/cache-stats")
+async def cache_stats() -> dict[str, int]:
+    """Возвращает счётчики кэша балансов (размер, попадания, промахи, вытеснения)."""
+    return balance_cache.stats()
+
+
+@router.get("/operations/export", response_class=StreamingResponse)
+async def export_all_operations(
+    session: Annotated[AsyncSession, Depends(db_helper.stream_session_getter)],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> StreamingResponse:
+    """Потоково выгружает операции всех кошельков за период (для сверок).
+
+    Args:
+        session: Сессия, которую закрывает сама выгрузка.
+        format: ``ndjson`` или ``csv``.
+        created_from: Нижняя граница времени создания (включительно).
+        created_to: Верхняя граница времени создания (не включительно).
+
+    Returns:
+        StreamingResponse: Операции в выбранном формате.
+    """
+    return export_response(
+        session,
+        format,
+        "operations",
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+
+@router.get("/{wallet_id}/operations/export", response_class=StreamingResponse)
+async def export_operations(
+    wallet_id: uuid.UUID,
+    session: Annotated[AsyncSession, Depends(db_helper.replica_session_getter)],
+    stream_session: Annotated[AsyncSession, Depends(db_helper.stream_session_getter)],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> StreamingResponse:
+    """Потоково выгружает операции кошелька в порядке создания.
+
+    Строки читаются серверным курсором порциями, поэтому память не растёт
+    с числом операций. При отключении клиента курсор и соединение
+    освобождаются сразу.
+
+    Args:
+        wallet_id: UUID кошелька.
+        session: Асинхронная сессия SQLAlchemy для проверки кошелька.
+        stream_session: Сессия, которую закрывает сама выгрузка.
+        format: ``ndjson`` или ``csv``.
+        created_from: Нижняя граница времени создания (включительно).
+        created_to: Верхняя граница времени создания (не включительно).
+
+    Returns:
+        StreamingResponse: Операции в выбранном формате.
+
+    Raises:
+        HTTPException:
+            - 404: Если кошелёк не найден.
+    """
+    if not await get_wallet_by_id(session, wallet_id):
+        await stream_session.close()
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Внутренняя ошибка сервера",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Кошелёк не найден",
         )
+    return export_response(
+        stream_session,
+        format,
+        f"operations-{wallet_id}",
+        uuid_wallet=wallet_id,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+
+@router.get("/{wallet_id}/operations", response_model=OperationPage)
+async def list_operations(
+    wallet_id: uuid.UUID,
+    session: Annotated[AsyncSession, Depends(db_helper.replica_session_getter)],
+    limit: Annotated[
+        int,
+        Query(ge=1, le=settings.wallet.history_max_page_size),
+    ] = settings.wallet.history_page_size,
+    cursor: str | None = None,
+    operation_type: OperationType | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> ModelResponse:
+    """Возвращает историю операций кошелька постранично, от новых к старым.
+
+    Args:
+        wallet_id: UUID кошелька.
+        session: Асинхронная сессия SQLAlchemy.
+        limit: Размер страницы.
+        cursor: ``next_cursor`` из предыдущей страницы.
+        operation_type: Фильтр по типу операции.
+        created_from: Нижняя граница времени создания (включительно).
+        created_to: Верхняя граница времени создания (не включительно).
+
+    Returns:
+        OperationPage: Операции и курсор следующей страницы.
+
+    Raises:
+        HTTPException:
+            - 400: Если курсор некорректен.
+            - 404: Если кошелёк не найден.
+    """
+    try:
+        items, next_cursor = await get_wallet_operations(
+            session,
+            wallet_id,
+            limit,
+            cursor=cursor,
+            operation_type=operation_type,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор",
+        )
+    if not items and cursor is None and not await get_wallet_by_id(session, wallet_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Кошелёк не найден",
+        )
+    return ModelResponse(OperationPage(items=items, next_cursor=next_cursor))
+
+
+@router.get("/{wallet_id}/stats", response_model=WalletStatsResponse)
+async def wallet_stats(
+    wallet_id: uuid.UUID,
+    session: Annotated[AsyncSession, Depends(db_helper.replica_session_getter)],
+    date_from: Annotated[date, Query(alias="from")],
+    date_to: Annotated[date, Query(alias="to")],
+    granularity: Literal["day", "month"] = "day",
+) -> ModelResponse:
+    """Возвращает суммы и число операций кошелька по дням или месяцам.
+
+    Ответ строится из дневных сводок ``wallet_daily_stats`` и операций, ещё
+    не перенесённых в них, поэтому стоимость зависит от длины периода, а не от
+    числа операций.
+
+    Args:
+        wallet_id: UUID кошелька.
+        session: Асинхронная сессия SQLAlchemy.
+        date_from: Первый день периода (включительно, UTC).
+        date_to: Последний день периода (не включительно, UTC).
+        granularity: ``day`` или ``month``.
+
+    Returns:
+        WalletStatsResponse: Периоды с операциями по возрастанию.
+
+    Raises:
+        HTTPException:
+            - 404: Если кошелёк не найден.
+            - 422: Если ``from`` не раньше ``to``.
+    """
+    if date_from >= date_to:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Начало периода должно быть раньше конца",
+        )
+    stats = await get_wallet_stats(session, wallet_id, date_from, date_to, granularity)
+    if stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Кошелёк не найден",
+        )
+    return ModelResponse(stats)
+
+
+@router.put("/{wallet_id}/stripes", response_model=WalletStripesResponse)
+async def update_wallet_stripes(
+    wallet_id: uuid.UUID,
+    data: WalletStripesUpdate,
+    session: Annotated[AsyncSession, Depends(db_helper.sesion_getter)],
+) -> ModelResponse:
+    """Меняет число полос баланса кошелька (администрирование «горячих» кошельков).
+
+    Пополнения кошелька с K полосами блокируют одну из K строк вместо строки
+    кошелька. Баланс перераспределяется между новыми полосами без остановки
+    записи.
+
+    Args:
+        wallet_id: UUID кошелька.
+        data: Новое число полос.
+        session: Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        WalletStripesResponse: UUID кошелька, число полос и полный баланс.
+
+    Raises:
+        HTTPException:
+            - 404: Если кошелёк не найден.
+            - 500: Если произошла ошибка сервера.
+            - 503: Если транзакция не выполнена из-за конфликта блокировок.
+    """
+    try:
+        wallet = await set_wallet_stripes(session, wallet_id, data.stripes)
+    except SQLAlchemyError as e:
+        logger.error(
+            "Ошибка в эндпоинте update_wallet_stripes для кошелька %s: %s",
+            wallet_id,
+            e,
+            extra={"wallet_id": wallet_id},
+        )
+        raise database_error(e)
+    if wallet is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Кошелёк не найден",
+        )
+    balance, currency = wallet
+    return ModelResponse(
+        WalletStripesResponse(
+            id=wallet_id, balance=balance, currency=currency, stripes=data.stripes
+        )
+    )
+
+
+@router.get("/by-email/{email}", response_model=WalletCreateResponse)
+async def get_wallet_by_email_view(
+    email: str,
+    session: Annotated[AsyncSession, Depends(db_helper.replica_session_getter)],
+    x_consistency: Annotated[str | None, Header()] = None,
+) -> ModelResponse:
+    """Находит кошелёк по email без учёта регистра.
+
+    Найденные кошельки и отсутствие кошелька кэшируются в памяти процесса
+    (``EMAIL_CACHE_TTL_SECONDS`` и ``EMAIL_CACHE_NEGATIVE_TTL_SECONDS``),
+    поэтому повторные запросы неизвестных email не доходят до базы данных.
+    Отсутствие кошелька в реплике не кэшируется: реплика может ещё не
+    получить только что созданный кошелёк. Заголовок ``X-Consistency: strict``
+    пропускает кэш и читает из основной базы.
+
+    Args:
+        email: Email кошелька.
+        session: Асинхронная сессия SQLAlchemy.
+        x_consistency: ``strict``, чтобы пропустить кэш.
+
+    Returns:
+        WalletCreateResponse: Данные кошелька (id, email и валюта).
+
+    Raises:
+        HTTPException:
+            - 404: Если кошелёк не найден.
+            - 500: Если произошла ошибка сервера.
+    """
+    email = normalize_email(email)
+    cached = email_cache.get(email) if x_consistency != "strict" else None
+    if cached is None:
+        try:
+            wallet = await get_wallet_by_email(session, email)
+        except SQLAlchemyError:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Внутренняя ошибка сервера",
+            )
+        if wallet is None:
+            cached = False
+            if not db_helper.is_replica_session(session):
+                email_cache.set(
+                    email, cached, ttl=settings.cache.email_negative_ttl_seconds
+                )
+        else:
+            cached = WalletCreateResponse.model_validate(wallet)
+            email_cache.set(email, cached)
+    if cached is False:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Кошелёк не найден",
+        )
+    return ModelResponse(cached)
 
 
 @router.get("/{wallet_id}", response_model=WalletResponse)
 async def get_wallet(
     wallet_id: uuid.UUID,
-    session: Annotated[AsyncSession, Depends(db_helper.sesion_getter)],
-) -> WalletResponse:
+    session: Annotated[AsyncSession, Depends(db_helper.replica_session_getter)],
+    x_consistency: Annotated[str | None, Header()] = None,
+) -> ModelResponse:
     """Получает информацию о кошельке по его UUID.
 
+    Баланс отдаётся из кэша, если он там есть. Заголовок ``X-Consistency: strict``
+    требует чтения из базы данных. Баланс, прочитанный с реплики, в кэш не
+    записывается.
+
     Args:
         wallet_id: UUID кошелька.
         session: Асинхронная сессия SQLAlchemy.
+        x_consistency: ``strict``, чтобы пропустить кэш.
 
     Returns:
-        WalletResponse: Данные кошелька (id, balance, email).
+        WalletResponse: Данные кошелька (id, balance, currency).
 
     Raises:
         HTTPException:
             - 404: Если кошелёк не найден.
     """
-    wallet = await get_wallet_by_id(session, wallet_id)
-    if not wallet:
-        logger.debug(f"Кошелёк с ID {wallet_id} не найден")
+    if x_consistency != "strict":
+        currency = currency_cache.get(wallet_id)
+        balance = await balance_cache.get(wallet_id) if currency else None
+        if balance is not None:
+            return ModelResponse(
+                WalletResponse(id=wallet_id, balance=balance, currency=currency)
+            )
+
+    wallet = await get_wallet_balance(session, wallet_id)
+    if wallet is None:
+        logger.debug(
+            "Кошелёк с ID %s не найден", wallet_id, extra={"wallet_id": wallet_id}
+        )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Кошелёк не найден",
         )
-    logger.info(f"Кошелёк с ID {wallet_id} успешно получен")
-    return WalletResponse(id=wallet.id, balance=wallet.balance)
+    balance, currency = wallet
+    # Баланс из реплики может отставать и затёр бы в кэше более свежий,
+    # записанный после коммита операции.
+    if not db_helper.is_replica_session(session):
+        await balance_cache.set(wallet_id, balance)
+    logger.info(
+        "Кошелёк с ID %s успешно получен", wallet_id, extra={"wallet_id": wallet_id}
+    )
+    return ModelResponse(
+        WalletResponse(id=wallet_id, balance=balance, currency=currency)
+    )
+
+
+@router.get("/{wallet_id}/events", response_class=StreamingResponse)
+async def wallet_events(
+    wallet_id: uuid.UUID,
+    session: Annotated[AsyncSession, Depends(db_helper.sesion_getter)],
+) -> StreamingResponse:
+    """Лента изменений баланса кошелька в формате Server-Sent Events.
+
+    Первым приходит событие ``snapshot`` с текущим балансом, затем событие
+    ``operation`` на каждую выполненную операцию. Подписка оформляется до
+    чтения баланса, поэтому операции, выполненные между ними, не теряются.
+    Соединение с базой данных освобождается сразу после чтения баланса.
+
+    Args:
+        wallet_id: UUID кошелька.
+        session: Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        StreamingResponse: Поток ``text/event-stream``.
+
+    Raises:
+        HTTPException:
+            - 404: Если кошелёк не найден.
+    """
+    subscription = event_hub.subscribe(wallet_id)
+    try:
+        snapshot = await wallet_snapshot(session, wallet_id)
+    except Exception:
+        event_hub.unsubscribe(subscription)
+        raise
+    await session.close()
+    return StreamingResponse(
+        sse_events(subscription, snapshot, settings.events.heartbeat_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{wallet_id}/ws")
+async def wallet_events_ws(
+    websocket: WebSocket,
+    wallet_id: uuid.UUID,
+    session: Annotated[AsyncSession, Depends(db_helper.sesion_getter)],
+) -> None:
+    """Лента изменений баланса кошелька через WebSocket.
+
+    События те же, что и в ``GET /{wallet_id}/events``. Неизвестный кошелёк
+    закрывает соединение с кодом 4404, медленный подписчик - с кодом 1013.
+    """
+    subscription = event_hub.subscribe(wallet_id)
+    try:
+        await websocket.accept()
+        try:
+            snapshot = await wallet_snapshot(session, wallet_id)
+        except HTTPException as e:
+            await websocket.close(code=WS_CLOSE_NOT_FOUND, reason=e.detail)
+            return
+        finally:
+            await session.close()
+        await websocket.send_text(snapshot)
+        forwarder = asyncio.create_task(forward_events(websocket, subscription))
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            forwarder.cancel()
+            await asyncio.gather(forwarder, return_exceptions=True)
+    finally:
+        event_hub.unsubscribe(subscription)
 
 
 @router.post(
@@ -110,15 +676,15 @@ async def get_wallet(
 async def create_wallet(
     data: EmailWallet,
     session: Annotated[AsyncSession, Depends(db_helper.sesion_getter)],
-) -> WalletCreateResponse:
+) -> ModelResponse:
     """Создаёт новый кошелёк с указанным email.
 
     Args:
-        email: Email для создания кошелька (должен быть валидным).
+        data: Email (должен быть валидным) и валюта кошелька.
         session: Асинхронная сессия SQLAlchemy.
 
     Returns:
-        WalletResponse: Данные созданного кошелька (id и email).
+        WalletResponse: Данные созданного кошелька (id, email и валюта).
 
     Raises:
         HTTPException:
@@ -127,22 +693,76 @@ async def create_wallet(
             - 500: Если произошла ошибка сервера.
     """
     try:
-        wallet = await create_wallet_by_email(session, data.email)
+        wallet = await create_wallet_by_email(session, data.email, data.currency)
         if wallet is None:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Кошелёк с таким email уже существует",
             )
-        logger.info(f"create_wallet: Кошелёк создан для email {data.email}")
-        return WalletCreateResponse(id=wallet.id, email=wallet.email)
+        logger.info(
+            "create_wallet: Кошелёк %s создан для email %s",
+            wallet.id,
+            data.email,
+            extra={"wallet_id": wallet.id},
+        )
+        return ModelResponse(
+            WalletCreateResponse.model_validate(wallet),
+            status_code=status.HTTP_201_CREATED,
+        )
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Некорректный формат email",
         )
     except SQLAlchemyError as e:
-        logger.error(f"Ошибка при создании кошелька для email {data.email}: {e}")
+        logger.error("Ошибка при создании кошелька для email %s: %s", data.email, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Внутренняя ошибка сервера",
+        )
+
+
+@router.post(
+    "/create-wallets:bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BulkWalletCreateResponse,
+)
+async def create_wallets(
+    data: BulkWalletCreate,
+    session: Annotated[AsyncSession, Depends(db_helper.sesion_getter)],
+) -> ModelResponse:
+    """Массово создаёт кошельки для списка email.
+
+    Уже занятые email не создаются повторно и возвращаются в ``duplicates``.
+
+    Args:
+        data: Список email для новых кошельков и их валюта.
+        session: Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        BulkWalletCreateResponse: Созданные кошельки и пропущенные email.
+
+    Raises:
+        HTTPException:
+            - 500: Если произошла ошибка сервера.
+    """
+    try:
+        created, duplicates = await create_wallets_bulk(
+            session, data.emails, data.currency
+        )
+    except SQLAlchemyError as e:
+        logger.error("Ошибка при массовом создании кошельков: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Внутренняя ошибка сервера",
         )
+    return ModelResponse(
+        BulkWalletCreateResponse(
+            created=[
+                WalletCreateResponse(id=id_, email=email, currency=data.currency)
+                for id_, email in created
+            ],
+            duplicates=duplicates,
+        ),
+        status_code=status.HTTP_201_CREATED,
+    )
@@ -0,0 +1,63 @@
+"""Обслуживание секций таблицы operations (только PostgreSQL).
+
+Создаёт секции текущего месяца и ``--months-ahead`` следующих, затем
+отсоединяет секции старше ``--retention-months`` полных месяцев, выгружает их
+в ``--archive-dir`` (``operations_pYYYYMM.csv.gz``) и удаляет. При
+``--retention-months 0`` секции не архивируются. Рассчитан на периодический
+запуск, например из cron.
+
+Пример:
+    python -m app.cli.archive_operations --retention-months 12 --archive-dir /var/archive
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from app.core import db_helper, logger
+from app.core.config import settings
+from app.core.logger import configure_logging
+from app.crud.partitions import archive_partitions, create_partitions
+
+
+async def run(args: argparse.Namespace) -> tuple[list[str], list[Path]]:
+    try:
+        created = await create_partitions(db_helper.engine, args.months_ahead)
+        archived = await archive_partitions(
+            db_helper.engine,
+            args.retention_months,
+            args.archive_dir,
+        )
+        return created, archived
+    finally:
+        await db_helper.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    configure_logging(settings.logging)
+    parser = argparse.ArgumentParser(description="Обслуживание секций operations")
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=settings.partitions.months_ahead,
+    )
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=settings.partitions.retention_months,
+    )
+    parser.add_argument(
+        "--archive-dir",
+        type=Path,
+        default=settings.partitions.archive_dir,
+    )
+    created, archived = asyncio.run(run(parser.parse_args(argv)))
+    logger.info(
+        "Обслуживание секций завершено: создано %s, выгружено %s",
+        len(created),
+        len(archived),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Массовое создание кошельков из файла NDJSON или CSV.
+
+Email читаются потоково и отправляются в базу частями по ``--chunk-size``.
+Созданные кошельки выводятся в stdout в формате NDJSON (id, email).
+
+Пример:
+    python -m app.cli.import_wallets partner.ndjson --chunk-size 5000 > created.ndjson
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import sys
+from collections.abc import Iterable, Iterator
+from itertools import batched
+from pathlib import Path
+from typing import TextIO
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api_v1.wallet.schemas import EmailWallet
+from app.core import db_helper, logger
+from app.core.config import settings
+from app.core.logger import configure_logging
+from app.core.money import CURRENCY_SCALES
+from app.crud.wallet import create_wallets_bulk
+
+
+def read_emails(path: Path, file_format: str) -> Iterator[str]:
+    """Построчно читает email из файла.
+
+    NDJSON: каждая строка - объект с ключом ``email`` или строка JSON.
+    CSV: файл с заголовком, содержащим колонку ``email``.
+    """
+    with path.open(newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            for row in csv.DictReader(file):
+                yield row["email"]
+            return
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield record["email"] if isinstance(record, dict) else record
+
+
+async def import_wallets(
+    emails: Iterable[str],
+    session_factory: async_sessionmaker[AsyncSession],
+    chunk_size: int,
+    output: TextIO,
+    duplicates_output: TextIO | None = None,
+    currency: str | None = None,
+) -> dict[str, int]:
+    """Создаёт кошельки частями и пишет созданные в ``output``.
+
+    ``currency`` - валюта всех создаваемых кошельков (None - валюта по умолчанию).
+
+    Returns:
+        dict[str, int]: Количество созданных, дубликатов и некорректных email.
+    """
+    stats = {"created": 0, "duplicates": 0, "invalid": 0}
+    for chunk in batched(emails, chunk_size, strict=False):
+        valid = []
+        for email in chunk:
+            try:
+                valid.append(EmailWallet(email=email).email)
+            except ValidationError:
+                stats["invalid"] += 1
+                logger.warning("Некорректный email пропущен: %r", email)
+        if not valid:
+            continue
+
+        async with session_factory() as session:
+            created, duplicates = await create_wallets_bulk(session, valid, currency)
+        for wallet_id, email in created:
+            output.write(json.dumps({"id": str(wallet_id), "email": email}) + "\n")
+        if duplicates_output is not None:
+            for email in duplicates:
+                duplicates_output.write(json.dumps({"email": email}) + "\n")
+        stats["created"] += len(created)
+        stats["duplicates"] += len(duplicates)
+    return stats
+
+
+async def run(args: argparse.Namespace) -> dict[str, int]:
+    file_format = args.format or ("csv" if args.path.suffix == ".csv" else "ndjson")
+    duplicates_output = args.duplicates.open("w") if args.duplicates else None
+    try:
+        return await import_wallets(
+            read_emails(args.path, file_format),
+            db_helper.session_factory,
+            args.chunk_size,
+            sys.stdout,
+            duplicates_output,
+            args.currency,
+        )
+    finally:
+        if duplicates_output is not None:
+            duplicates_output.close()
+        await db_helper.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    configure_logging(settings.logging)
+    parser = argparse.ArgumentParser(description="Массовое создание кошельков")
+    parser.add_argument("path", type=Path, help="Файл NDJSON или CSV с email")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default=None)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument(
+        "--duplicates",
+        type=Path,
+        default=None,
+        help="Файл NDJSON для уже существующих email",
+    )
+    parser.add_argument(
+        "--currency",
+        choices=sorted(CURRENCY_SCALES),
+        default=None,
+        help="Валюта кошельков (по умолчанию WALLET_DEFAULT_CURRENCY)",
+    )
+    stats = asyncio.run(run(parser.parse_args(argv)))
+    logger.info(
+        "Импорт завершён: создано %s, дубликатов %s, некорректных %s",
+        stats["created"],
+        stats["duplicates"],
+        stats["invalid"],
+    )
+
+
+if __name__ == "__main__":
+    main()
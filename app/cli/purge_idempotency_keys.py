@@ -0,0 +1,47 @@
+"""Очистка устаревших ключей идемпотентности операций.
+
+Удаляет ключи операций старше ``--ttl-hours`` (по умолчанию
+``IDEMPOTENCY_KEY_TTL_HOURS``). Рассчитан на периодический запуск, например
+из cron.
+
+Пример:
+    python -m app.cli.purge_idempotency_keys --ttl-hours 24
+"""
+
+import argparse
+import asyncio
+from datetime import timedelta
+
+from app.core import db_helper, logger
+from app.core.config import settings
+from app.core.logger import configure_logging
+from app.crud.operation import purge_idempotency_keys
+
+
+async def run(args: argparse.Namespace) -> int:
+    try:
+        async with db_helper.session_factory() as session:
+            return await purge_idempotency_keys(
+                session,
+                timedelta(hours=args.ttl_hours),
+            )
+    finally:
+        await db_helper.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    configure_logging(settings.logging)
+    parser = argparse.ArgumentParser(
+        description="Очистка устаревших ключей идемпотентности"
+    )
+    parser.add_argument(
+        "--ttl-hours",
+        type=float,
+        default=settings.idempotency.key_ttl_hours,
+    )
+    purged = asyncio.run(run(parser.parse_args(argv)))
+    logger.info("Очистка ключей идемпотентности завершена: очищено %s", purged)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Запуск сервера приложения.
+
+Число рабочих процессов, реализации цикла событий и HTTP-протокола и время
+ожидания начатых запросов при остановке берутся из переменных ``SERVER_*``
+(см. ``ServerConfig``). Пул соединений каждого процесса ограничивается долей
+``DB_CONNECTION_BUDGET``.
+
+Пример:
+    SERVER_WORKERS=4 DB_CONNECTION_BUDGET=80 python -m app.cli.serve
+"""
+
+import uvicorn
+
+from app.core import logger
+from app.core.config import settings
+from app.core.logger import configure_logging
+
+
+def main() -> None:
+    configure_logging(settings.logging)
+    server = settings.server
+    workers = 1 if server.reload else server.workers
+    pool_size, max_overflow = settings.worker_pool
+    logger.info(
+        "Запуск сервера: %s процессов, пул %s+%s соединений на процесс",
+        workers,
+        pool_size,
+        max_overflow,
+    )
+    uvicorn.run(
+        "main:app",
+        host=server.host,
+        port=server.port,
+        workers=workers,
+        loop=server.loop,
+        http=server.http,
+        reload=server.reload,
+        timeout_graceful_shutdown=server.graceful_timeout_seconds,
+        lifespan="on",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,5 +3,34 @@ __all__ = (
     "logger",
 )
 
-from app.core.db_helper import db_helper
-from app.core.logger import logger
+import sys
+from importlib import import_module
+from types import ModuleType
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from app.core.db_helper import db_helper
+    from app.core.logger import logger
+
+
+class _CoreModule(ModuleType):
+    """Пакет ``app.core`` с ленивыми ``db_helper`` и ``logger``.
+
+    Подмодули импортируются при первом обращении, поэтому ``import
+    app.core.config`` не тянет за собой SQLAlchemy, asyncpg и FastAPI.
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        if name in __all__:
+            return getattr(import_module(f"{__name__}.{name}"), name)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Импорт подмодуля записывает модуль в одноимённый атрибут пакета;
+        # вместо модуля сохраняется одноимённый объект из этого модуля.
+        if name in __all__ and isinstance(value, ModuleType):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _CoreModule
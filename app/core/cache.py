@@ -0,0 +1,147 @@
+import math
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from app.core.config import settings
+
+
+class TTLCache[K, V]:
+    """LRU-кэш в памяти процесса с ограничением по размеру и времени жизни записей.
+
+    Ведёт счётчики попаданий, промахов и вытеснений. Просроченная запись
+    считается промахом и удаляется при обращении.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SharedBalanceBackend(Protocol):
+    """Общее для нескольких процессов хранилище балансов (например, Redis)."""
+
+    async def get(self, wallet_id: uuid.UUID) -> int | None: ...
+
+    async def set(self, wallet_id: uuid.UUID, balance: int, ttl: float) -> None: ...
+
+    async def delete(self, wallet_id: uuid.UUID) -> None: ...
+
+
+class BalanceCache:
+    """Кэш балансов кошельков: локальный LRU и необязательное общее хранилище.
+
+    Чтение идёт сначала в локальный кэш, затем в общее хранилище. Запись
+    (write-through после коммита) обновляет оба уровня. Балансы хранятся
+    в минимальных единицах валюты кошелька.
+    """
+
+    def __init__(
+        self,
+        local: TTLCache[uuid.UUID, int],
+        shared: SharedBalanceBackend | None = None,
+        enabled: bool = True,
+    ) -> None:
+        self.local = local
+        self.shared = shared
+        self.enabled = enabled
+
+    async def get(self, wallet_id: uuid.UUID) -> int | None:
+        if not self.enabled:
+            return None
+        balance = self.local.get(wallet_id)
+        if balance is None and self.shared is not None:
+            balance = await self.shared.get(wallet_id)
+            if balance is not None:
+                self.local.set(wallet_id, balance)
+        return balance
+
+    async def set(self, wallet_id: uuid.UUID, balance: int) -> None:
+        if not self.enabled:
+            return
+        self.local.set(wallet_id, balance)
+        if self.shared is not None:
+            await self.shared.set(wallet_id, balance, self.local.ttl)
+
+    async def invalidate(self, wallet_id: uuid.UUID) -> None:
+        self.local.delete(wallet_id)
+        if self.shared is not None:
+            await self.shared.delete(wallet_id)
+
+    def stats(self) -> dict[str, int]:
+        return self.local.stats()
+
+
+balance_cache = BalanceCache(
+    local=TTLCache(
+        max_size=settings.cache.max_size,
+        ttl=settings.cache.ttl_seconds,
+    ),
+    enabled=settings.cache.enabled,
+)
+
+idempotency_cache: TTLCache[tuple[uuid.UUID, str], Any] = TTLCache(
+    max_size=settings.idempotency.cache_max_size,
+    ttl=settings.idempotency.cache_ttl_seconds,
+)
+
+stripes_cache: TTLCache[uuid.UUID, int] = TTLCache(
+    max_size=settings.cache.max_size,
+    ttl=settings.wallet.stripes_cache_ttl_seconds,
+)
+
+# Валюта кошелька не меняется, поэтому записи не устаревают.
+currency_cache: TTLCache[uuid.UUID, str] = TTLCache(
+    max_size=settings.cache.max_size,
+    ttl=math.inf,
+)
+
+# Кошелёк по email (GET /wallets/by-email/{email}): ответ или False, если
+# кошелька нет. Отрицательные записи живут ``email_negative_ttl_seconds``.
+email_cache: TTLCache[str, Any] = TTLCache(
+    max_size=settings.cache.max_size,
+    ttl=settings.cache.email_ttl_seconds,
+)
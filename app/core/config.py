@@ -1,24 +1,402 @@
 import os
+from functools import cache
+from pathlib import Path
+from typing import Any, Literal
 
 from dotenv import load_dotenv
-from pydantic import BaseModel, PostgresDsn
+from pydantic import BaseModel, ConfigDict, Field, Json, PostgresDsn
 from pydantic_settings import BaseSettings
 
-load_dotenv(".env.local", override=True)
+from app.core.money import Currency
+
+IsolationLevel = Literal["READ COMMITTED", "REPEATABLE READ", "SERIALIZABLE"]
+
+
+def env(name: str, default: str | None = None, **kwargs: Any) -> Any:
+    """Поле настроек со значением из переменной окружения ``name``.
+
+    Переменная читается при создании настроек (``get_settings``), а не при
+    импорте модуля.
+    """
+    return Field(default_factory=lambda: os.getenv(name, default), **kwargs)
 
 
 class DatabaseConfig(BaseModel):
-    user: str = os.getenv("POSTGRES_USER")
-    password: str = os.getenv("POSTGRES_PASSWORD")
-    port: str = os.getenv("POSTGRES_PORT")
-    db_name: str = os.getenv("POSTGRES_DB")
-    app_host: str = os.getenv("APP_HOST")
-    url: PostgresDsn = f"postgresql+asyncpg://{user}:{password}@{app_host}:{port}/{db_name}"
+    """Настройки подключения к базе данных.
+
+    pool_size, max_overflow:
+        Постоянные соединения пула и сколько ещё можно открыть сверх них.
+    pool_timeout:
+        Сколько секунд ждать свободного соединения до ошибки.
+    pool_recycle:
+        Через сколько секунд пересоздавать соединение (-1 - никогда).
+    pool_pre_ping:
+        Проверять соединение перед выдачей из пула.
+    statement_cache_size:
+        Размер кэша подготовленных выражений asyncpg (0 - для PgBouncer в
+        режиме transaction).
+    application_name, statement_timeout_ms:
+        Параметры сеанса PostgreSQL (``server_settings`` asyncpg);
+        0 отключает ограничение времени выполнения запроса.
+    replica_urls:
+        Адреса реплик для читающих эндпоинтов (через запятую в DB_REPLICA_URLS).
+    replica_strategy:
+        - round_robin: реплики выбираются по очереди;
+        - least_connections: выбирается реплика с наименьшим числом выданных соединений.
+    replica_retry_seconds:
+        Как часто (в секундах) фоновая проверка подключается к реплике,
+        недоступной после ошибки подключения.
+    connection_budget:
+        Сколько соединений с базой данных (и с каждой репликой) могут держать
+        все рабочие процессы вместе; 0 - без ограничения. Пул процесса
+        ограничивается долей бюджета (см. ``Settings.worker_pool``).
+    """
+
+    user: str = env("POSTGRES_USER")
+    password: str = env("POSTGRES_PASSWORD")
+    port: str = env("POSTGRES_PORT")
+    db_name: str = env("POSTGRES_DB")
+    app_host: str = env("APP_HOST")
+    url: PostgresDsn = Field(
+        default_factory=lambda data: (
+            f"postgresql+asyncpg://{data['user']}:{data['password']}"
+            f"@{data['app_host']}:{data['port']}/{data['db_name']}"
+        )
+    )
     echo: bool = False
+    pool_size: int = env("DB_POOL_SIZE", "5", validate_default=True)
+    max_overflow: int = env("DB_MAX_OVERFLOW", "10", validate_default=True)
+    pool_timeout: float = env("DB_POOL_TIMEOUT", "30", validate_default=True)
+    pool_recycle: int = env("DB_POOL_RECYCLE", "1800", validate_default=True)
+    pool_pre_ping: bool = env("DB_POOL_PRE_PING", "true", validate_default=True)
+    statement_cache_size: int = env(
+        "DB_STATEMENT_CACHE_SIZE", "100", validate_default=True
+    )
+    application_name: str = env("DB_APPLICATION_NAME", "wallet-api")
+    statement_timeout_ms: int = env(
+        "DB_STATEMENT_TIMEOUT_MS", "0", validate_default=True
+    )
+    replica_urls: list[str] = Field(
+        default_factory=lambda: [
+            url.strip()
+            for url in os.getenv("DB_REPLICA_URLS", "").split(",")
+            if url.strip()
+        ]
+    )
+    replica_strategy: Literal["round_robin", "least_connections"] = env(
+        "DB_REPLICA_STRATEGY", "round_robin", validate_default=True
+    )
+    replica_retry_seconds: float = env(
+        "DB_REPLICA_RETRY_SECONDS", "5", validate_default=True
+    )
+    connection_budget: int = env("DB_CONNECTION_BUDGET", "0", validate_default=True)
+
+    @property
+    def connect_args(self) -> dict:
+        """Параметры подключения asyncpg."""
+        server_settings = {"application_name": self.application_name}
+        if self.statement_timeout_ms:
+            server_settings["statement_timeout"] = str(self.statement_timeout_ms)
+        return {
+            "statement_cache_size": self.statement_cache_size,
+            "server_settings": server_settings,
+        }
+
+
+class WalletConfig(BaseModel):
+    """Настройки операций с кошельками.
+
+    operation_mode:
+        - orm: загрузка кошелька через SELECT ... FOR UPDATE и изменение баланса в Python;
+        - single_statement: условный UPDATE ... RETURNING и вставка операции за один запрос;
+        - ledger: операции только добавляются в журнал, баланс - снимок в wallets.balance
+          плюс сумма ещё не компактизированных операций.
+    ledger_compact_every, ledger_compact_interval_seconds:
+        В режиме ledger снимок баланса кошелька обновляется после стольких
+        операций, а все кошельки проверяются с таким интервалом.
+    max_stripes, stripes_cache_ttl_seconds:
+        Максимальное число полос баланса кошелька и время, на которое процесс
+        запоминает число полос кошелька.
+    coalesce_enabled:
+        Объединять параллельные операции над одним кошельком в одну транзакцию.
+    coalesce_window_ms, coalesce_max_batch:
+        Окно накопления операций и максимальный размер пакета.
+    batch_max_operations:
+        Максимальное число операций в одном запросе пакетного эндпоинта.
+    bulk_max_wallets:
+        Максимальное число email в одном запросе массового создания кошельков.
+    history_page_size, history_max_page_size:
+        Размер страницы истории операций по умолчанию и его верхняя граница.
+    export_chunk_size:
+        Число строк, читаемых из курсора за раз при выгрузке операций.
+    default_currency:
+        Валюта новых кошельков, если она не указана при создании.
+    stats_interval_seconds, stats_lag_seconds:
+        Как часто операции переносятся в дневные сводки ``wallet_daily_stats``
+        и насколько отметка агрегации отстаёт от текущего времени. Отставание
+        должно превышать длительность самой долгой пишущей транзакции, иначе
+        операция с более ранним created_at может зафиксироваться после
+        переноса отметки и не попасть в сводки.
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    operation_mode: Literal["orm", "single_statement", "ledger"] = env(
+        "WALLET_OPERATION_MODE", "single_statement"
+    )
+    ledger_compact_every: int = env("WALLET_LEDGER_COMPACT_EVERY", "100")
+    ledger_compact_interval_seconds: float = env(
+        "WALLET_LEDGER_COMPACT_INTERVAL_SECONDS", "5"
+    )
+    max_stripes: int = env("WALLET_MAX_STRIPES", "64")
+    stripes_cache_ttl_seconds: float = env("WALLET_STRIPES_CACHE_TTL_SECONDS", "60")
+    coalesce_enabled: bool = env("WALLET_COALESCE_ENABLED", "false")
+    coalesce_window_ms: float = env("WALLET_COALESCE_WINDOW_MS", "2")
+    coalesce_max_batch: int = env("WALLET_COALESCE_MAX_BATCH", "64")
+    batch_max_operations: int = env("WALLET_BATCH_MAX_OPERATIONS", "10000")
+    bulk_max_wallets: int = env("WALLET_BULK_MAX_WALLETS", "10000")
+    history_page_size: int = env("WALLET_HISTORY_PAGE_SIZE", "50")
+    history_max_page_size: int = env("WALLET_HISTORY_MAX_PAGE_SIZE", "500")
+    export_chunk_size: int = env("WALLET_EXPORT_CHUNK_SIZE", "1000")
+    default_currency: Currency = env("WALLET_DEFAULT_CURRENCY", "RUB")
+    stats_interval_seconds: float = env("WALLET_STATS_INTERVAL_SECONDS", "60")
+    stats_lag_seconds: float = env("WALLET_STATS_LAG_SECONDS", "60")
+
+
+class CacheConfig(BaseModel):
+    """Настройки кэшей GET /wallets/{wallet_id} и GET /wallets/by-email/{email}.
+
+    email_ttl_seconds:
+        Время жизни найденного кошелька в кэше поиска по email.
+    email_negative_ttl_seconds:
+        Время жизни отметки «кошелька нет»: кошелёк, созданный с этим email
+        другим процессом, до её истечения не находится.
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    enabled: bool = env("BALANCE_CACHE_ENABLED", "true")
+    ttl_seconds: float = env("BALANCE_CACHE_TTL_SECONDS", "1")
+    max_size: int = env("BALANCE_CACHE_MAX_SIZE", "100000")
+    email_ttl_seconds: float = env("EMAIL_CACHE_TTL_SECONDS", "3600")
+    email_negative_ttl_seconds: float = env("EMAIL_CACHE_NEGATIVE_TTL_SECONDS", "5")
+
+
+class IdempotencyConfig(BaseModel):
+    """Настройки ключей идемпотентности операций (заголовок Idempotency-Key).
+
+    key_ttl_hours:
+        Сколько часов ключ защищает от повторного выполнения операции;
+        более старые ключи удаляются задачей очистки.
+    cache_ttl_seconds, cache_max_size:
+        Время жизни и размер LRU-кэша ответов для повторных запросов.
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    key_ttl_hours: float = env("IDEMPOTENCY_KEY_TTL_HOURS", "24")
+    cache_ttl_seconds: float = env("IDEMPOTENCY_CACHE_TTL_SECONDS", "300")
+    cache_max_size: int = env("IDEMPOTENCY_CACHE_MAX_SIZE", "10000")
+
+
+class TransactionConfig(BaseModel):
+    """Настройки повторного выполнения пишущих транзакций.
+
+    max_attempts:
+        Сколько раз выполнять транзакцию при взаимной блокировке (40P01),
+        ошибке сериализации (40001) или ожидании блокировки (55P03).
+    base_delay_ms, max_delay_ms:
+        Задержка перед повтором - случайная в пределах base_delay_ms * 2^n,
+        но не больше max_delay_ms.
+    deadline_ms:
+        Бюджет времени запроса, отсчитываемый от его начала: повтор, который
+        не успевает до конца бюджета, не выполняется.
+    deposit_isolation, withdraw_isolation:
+        Уровень изоляции транзакций пополнения и снятия (пусто - уровень
+        базы данных по умолчанию). Пакет операций выполняется на самом
+        строгом из уровней входящих в него типов операций, перевод - на
+        более строгом из двух уровней.
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    max_attempts: int = env("TX_RETRY_MAX_ATTEMPTS", "5", ge=1)
+    base_delay_ms: float = env("TX_RETRY_BASE_DELAY_MS", "5")
+    max_delay_ms: float = env("TX_RETRY_MAX_DELAY_MS", "200")
+    deadline_ms: float = env("TX_RETRY_DEADLINE_MS", "2000")
+    deposit_isolation: IsolationLevel | None = Field(
+        default_factory=lambda: os.getenv("TX_DEPOSIT_ISOLATION") or None
+    )
+    withdraw_isolation: IsolationLevel | None = Field(
+        default_factory=lambda: os.getenv("TX_WITHDRAW_ISOLATION") or None
+    )
+
+
+class EventsConfig(BaseModel):
+    """Настройки ленты изменений балансов (SSE и WebSocket).
+
+    broker:
+        - memory: события доставляются подписчикам только этого процесса;
+        - postgres: события рассылаются всем процессам через LISTEN/NOTIFY.
+    channel:
+        Канал LISTEN/NOTIFY PostgreSQL.
+    buffer_size:
+        Сколько событий хранится для одного подписчика; подписчик, который не
+        успевает их читать, отключается.
+    heartbeat_seconds:
+        Интервал комментариев-пингов в потоке SSE.
+    reconnect_seconds:
+        Пауза перед повторным подключением брокера к PostgreSQL.
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    broker: Literal["memory", "postgres"] = env("EVENTS_BROKER", "memory")
+    channel: str = env("EVENTS_CHANNEL", "wallet_events")
+    buffer_size: int = env("EVENTS_BUFFER_SIZE", "64", ge=1)
+    heartbeat_seconds: float = env("EVENTS_HEARTBEAT_SECONDS", "15")
+    reconnect_seconds: float = env("EVENTS_RECONNECT_SECONDS", "1")
+
+
+class PartitionsConfig(BaseModel):
+    """Настройки секций таблицы operations (PostgreSQL, секция на месяц).
+
+    months_ahead:
+        На сколько месяцев вперёд заранее создаются секции.
+    check_interval_seconds:
+        Как часто процесс приложения проверяет, что будущие секции созданы.
+    retention_months:
+        Сколько полных месяцев секций хранить в базе (0 - хранить все);
+        более старые секции выгружает и удаляет
+        ``python -m app.cli.archive_operations``.
+    archive_dir:
+        Каталог для выгруженных секций (``operations_pYYYYMM.csv.gz``).
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    months_ahead: int = env("OPERATIONS_PARTITIONS_AHEAD", "3", ge=1)
+    check_interval_seconds: float = env(
+        "OPERATIONS_PARTITIONS_CHECK_INTERVAL_SECONDS", "3600"
+    )
+    retention_months: int = env("OPERATIONS_RETENTION_MONTHS", "0", ge=0)
+    archive_dir: Path = env("OPERATIONS_ARCHIVE_DIR", "archive")
+
+
+class MetricsConfig(BaseModel):
+    """Настройки метрик запросов (заголовок Server-Timing и GET /metrics)."""
+
+    model_config = ConfigDict(validate_default=True)
+
+    enabled: bool = env("METRICS_ENABLED", "true")
+
+
+class LoggingConfig(BaseModel):
+    """Настройки логирования.
+
+    Записи передаются в очередь и пишутся в stderr фоновым потоком, поэтому
+    вызов ``logger`` в обработчике запроса не ждёт ввода-вывода.
+
+    format:
+        - json: одна JSON-строка на запись с полями из ``extra``;
+        - text: прежний текстовый формат.
+    queue_size:
+        Размер очереди записей; записи сверх него отбрасываются и
+        учитываются в ``log_records_dropped_total`` (``GET /metrics``).
+    info_sample_rate:
+        Доля записей уровня INFO, которые пишутся во время запроса.
+    route_sample_rates:
+        Доли для отдельных маршрутов, JSON вида
+        ``{"GET /api/v1/wallets/{wallet_id}": 0.01}``. Записи WARNING и
+        выше, а также записи вне запросов пишутся всегда.
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    level: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = env("LOG_LEVEL", "INFO")
+    format: Literal["json", "text"] = env("LOG_FORMAT", "json")
+    queue_size: int = env("LOG_QUEUE_SIZE", "10000", ge=1)
+    info_sample_rate: float = env("LOG_INFO_SAMPLE_RATE", "1", ge=0, le=1)
+    route_sample_rates: Json[dict[str, float]] = env("LOG_ROUTE_SAMPLE_RATES", "{}")
+
+
+class ServerConfig(BaseModel):
+    """Настройки запуска сервера (``python -m app.cli.serve``).
+
+    workers:
+        Число рабочих процессов; по умолчанию - число доступных ядер.
+    loop, http:
+        Реализации цикла событий и HTTP-протокола uvicorn; ``auto`` выбирает
+        uvloop и httptools, если они установлены.
+    graceful_timeout_seconds:
+        Сколько секунд при остановке ждать завершения начатых запросов.
+    reload:
+        Перезапуск при изменении кода (только для разработки, один процесс).
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    host: str = env("SERVER_HOST", "0.0.0.0")
+    port: int = env("SERVER_PORT", "8080")
+    workers: int = Field(
+        default_factory=lambda: (
+            os.getenv("SERVER_WORKERS") or os.process_cpu_count() or 1
+        ),
+        ge=1,
+    )
+    loop: Literal["auto", "asyncio", "uvloop"] = env("SERVER_LOOP", "auto")
+    http: Literal["auto", "h11", "httptools"] = env("SERVER_HTTP", "auto")
+    graceful_timeout_seconds: float = env("SERVER_GRACEFUL_TIMEOUT", "30")
+    reload: bool = env("SERVER_RELOAD", "false")
 
 
 class Settings(BaseSettings):
-    db: DatabaseConfig = DatabaseConfig()
+    db: DatabaseConfig = Field(default_factory=DatabaseConfig)
+    wallet: WalletConfig = Field(default_factory=WalletConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    idempotency: IdempotencyConfig = Field(default_factory=IdempotencyConfig)
+    transaction: TransactionConfig = Field(default_factory=TransactionConfig)
+    events: EventsConfig = Field(default_factory=EventsConfig)
+    partitions: PartitionsConfig = Field(default_factory=PartitionsConfig)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+    logging: LoggingConfig = Field(default_factory=LoggingConfig)
+    server: ServerConfig = Field(default_factory=ServerConfig)
+
+    @property
+    def worker_pool(self) -> tuple[int, int]:
+        """Размер пула и допустимое переполнение для одного рабочего процесса.
+
+        При заданном ``db.connection_budget`` пул процесса не превышает долю
+        бюджета ``connection_budget // server.workers``, из которой вычитается
+        соединение брокера событий PostgreSQL.
+
+        Returns:
+            tuple[int, int]: ``pool_size`` и ``max_overflow``.
+        """
+        pool_size, max_overflow = self.db.pool_size, self.db.max_overflow
+        if not self.db.connection_budget:
+            return pool_size, max_overflow
+        share = self.db.connection_budget // self.server.workers
+        if self.events.broker == "postgres":
+            share -= 1
+        share = max(share, 1)
+        pool_size = min(pool_size, share)
+        return pool_size, min(max_overflow, share - pool_size)
+
+
+@cache
+def get_settings() -> Settings:
+    """Настройки приложения, создаются при первом обращении.
+
+    Тогда же читается ``.env.local``, поэтому импорт модуля ничего не делает,
+    а скрипты и миграции, которым настройки не нужны, за них не платят.
+    """
+    load_dotenv(".env.local", override=True)
+    return Settings()
 
 
-settings = Settings()
+def __getattr__(name: str) -> Any:
+    # ``from app.core.config import settings`` создаёт настройки при первом импорте имени.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,34 +1,270 @@
-from collections.abc import AsyncGenerator
+import asyncio
+import itertools
+from collections.abc import AsyncGenerator, Sequence
+from functools import cached_property
+from typing import Annotated, Literal
 
+from fastapi import Header
+from sqlalchemy import event, text
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import QueuePool
 
 from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import TimedQueuePool
 
 
-class DataBaseHelper:
-    def __init__(self, url: str, echo: bool = False) -> None:
-        self.engine: AsyncEngine = create_async_engine(url=url, echo=echo)
+class Replica:
+    """Реплика базы данных: движок, фабрика сессий и признак недоступности.
+
+    Доступность не проверяется перед запросом: если не удалось открыть
+    соединение или оно разорвано, реплика помечается недоступной, и чтение
+    идёт в основную базу. Запрос, на котором это произошло, завершается
+    ошибкой. Вернуть реплику может только успешный ``probe`` (см.
+    ``DataBaseHelper.start_replica_monitor``), а не запрос клиента.
+    """
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
         self.session_factory = async_sessionmaker(
+            bind=engine,
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False,
+        )
+        self.down = False
+        event.listen(engine.sync_engine, "handle_error", self._on_error)
+
+    def _on_error(self, context: ExceptionContext) -> None:
+        # connection равно None, если ошибка произошла при подключении.
+        if context.connection is None or context.is_disconnect:
+            if not self.down:
+                logger.warning(
+                    "Реплика %r недоступна: %s",
+                    self.engine.url,
+                    context.original_exception,
+                )
+            self.down = True
+
+    async def probe(self) -> bool:
+        """Подключается к реплике и при успехе снова делает её доступной.
+
+        Returns:
+            bool: Удалось ли подключиться.
+        """
+        try:
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        except (SQLAlchemyError, OSError):
+            return False
+        if self.down:
+            self.down = False
+            logger.info("Реплика %r снова доступна", self.engine.url)
+        return True
+
+    def checked_out(self) -> int:
+        pool = self.engine.pool
+        return pool.checkedout() if isinstance(pool, QueuePool) else 0
+
+
+class DataBaseHelper:
+    def __init__(
+        self,
+        url: str,
+        echo: bool = False,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        connect_args: dict | None = None,
+        replica_urls: Sequence[str] = (),
+        replica_strategy: Literal["round_robin", "least_connections"] = "round_robin",
+        replica_retry_seconds: float = 5,
+    ) -> None:
+        self.url = url
+        self.replica_urls = list(replica_urls)
+        self.engine_options = {
+            "echo": echo,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+            "pool_pre_ping": pool_pre_ping,
+            "connect_args": connect_args or {},
+            "poolclass": TimedQueuePool,
+        }
+        self.replica_strategy = replica_strategy
+        self.replica_retry_seconds = replica_retry_seconds
+        self._round_robin = itertools.count()
+        self._replica_monitor: asyncio.Task | None = None
+
+    # Движки создаются при первом обращении: создание движка импортирует
+    # драйвер базы данных, который нужен не всем скриптам.
+    @cached_property
+    def engine(self) -> AsyncEngine:
+        return create_async_engine(url=self.url, **self.engine_options)
+
+    @cached_property
+    def session_factory(self) -> async_sessionmaker[AsyncSession]:
+        return async_sessionmaker(
             bind=self.engine,
             autoflush=False,
             autocommit=False,
             expire_on_commit=False,
         )
 
+    @cached_property
+    def replicas(self) -> list[Replica]:
+        return [
+            Replica(create_async_engine(url=replica_url, **self.engine_options))
+            for replica_url in self.replica_urls
+        ]
+
+    async def warm_up(self) -> int:
+        """Открывает ``pool_size`` соединений каждого движка заранее.
+
+        Первые запросы после запуска процесса не ждут установки соединений.
+        Ошибка подключения не мешает запуску: соединения будут открыты по
+        мере надобности.
+
+        Returns:
+            int: Число открытых соединений.
+        """
+        opened = 0
+        for engine in (self.engine, *(replica.engine for replica in self.replicas)):
+            pool = engine.pool
+            connections = [
+                engine.connect()
+                for _ in range(pool.size() if isinstance(pool, QueuePool) else 1)
+            ]
+            results = await asyncio.gather(
+                *(connection.start() for connection in connections),
+                return_exceptions=True,
+            )
+            for connection, result in zip(connections, results, strict=True):
+                if isinstance(result, BaseException):
+                    logger.warning(
+                        "Не удалось открыть соединение %r: %s", engine.url, result
+                    )
+                    continue
+                opened += 1
+                await connection.close()
+        return opened
+
     async def dispose(self) -> None:
-        await self.engine.dispose()
+        if "engine" in self.__dict__:
+            await self.engine.dispose()
+        for replica in self.__dict__.get("replicas", ()):
+            await replica.engine.dispose()
+
+    def pool_status(self, engine: AsyncEngine | None = None) -> dict[str, int]:
+        """Возвращает состояние пула: размер, свободные, выданные и сверхлимитные соединения.
+
+        Args:
+            engine: Движок основной базы или реплики, по умолчанию основной базы.
+        """
+        pool = (engine or self.engine).pool
+        if not isinstance(pool, QueuePool):
+            return {}
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
 
     async def sesion_getter(self) -> AsyncGenerator[AsyncSession]:
         async with self.session_factory() as session:
             yield session
 
+    def _replica_candidates(self) -> list[Replica]:
+        available = [replica for replica in self.replicas if not replica.down]
+        if self.replica_strategy == "least_connections":
+            return sorted(available, key=Replica.checked_out)
+        if not available:
+            return []
+        start = next(self._round_robin) % len(available)
+        return available[start:] + available[:start]
+
+    def read_session_factory(self) -> async_sessionmaker[AsyncSession]:
+        """Выбирает доступную реплику для чтения, при отказе всех - основную базу.
+
+        Реплика, к которой не удалось подключиться, пропускается, пока её не
+        вернёт фоновая проверка (см. ``Replica``). Соединение не открывается:
+        сессия берёт его из пула только при первом запросе.
+        """
+        candidates = self._replica_candidates()
+        if candidates:
+            return candidates[0].session_factory
+        return self.session_factory
+
+    async def _monitor_replicas(self) -> None:
+        while True:
+            await asyncio.sleep(self.replica_retry_seconds)
+            for replica in self.replicas:
+                if replica.down:
+                    await replica.probe()
+
+    def start_replica_monitor(self) -> None:
+        """Запускает проверку недоступных реплик раз в ``replica_retry_seconds`` секунд."""
+        if self.replicas and self._replica_monitor is None:
+            self._replica_monitor = asyncio.create_task(self._monitor_replicas())
+
+    async def stop_replica_monitor(self) -> None:
+        if self._replica_monitor is not None:
+            self._replica_monitor.cancel()
+            await asyncio.gather(self._replica_monitor, return_exceptions=True)
+            self._replica_monitor = None
+
+    def is_replica_session(self, session: AsyncSession) -> bool:
+        """Сессия читает из реплики, данные которой могут отставать от основной базы."""
+        return any(session.bind is replica.engine for replica in self.replicas)
+
+    async def replica_session_getter(
+        self,
+        x_consistency: Annotated[str | None, Header()] = None,
+    ) -> AsyncGenerator[AsyncSession]:
+        """Сессия для читающих эндпоинтов: реплика или основная база.
+
+        Заголовок ``X-Consistency: strict`` направляет чтение в основную базу,
+        чтобы клиент увидел собственные только что выполненные записи.
+        """
+        if x_consistency == "strict":
+            session_factory = self.session_factory
+        else:
+            session_factory = self.read_session_factory()
+        async with session_factory() as session:
+            yield session
+
+    def stream_session_getter(self) -> AsyncSession:
+        """Открывает сессию, которую закрывает потребитель (потоковый ответ, фоновая задача).
+
+        Сессия из ``sesion_getter`` закрывается до отправки тела ответа, поэтому
+        не подходит для ``StreamingResponse``.
+        """
+        return self.session_factory()
+
+
+pool_size, max_overflow = settings.worker_pool
 
 db_helper = DataBaseHelper(
     url=str(settings.db.url),
     echo=settings.db.echo,
+    pool_size=pool_size,
+    max_overflow=max_overflow,
+    pool_timeout=settings.db.pool_timeout,
+    pool_recycle=settings.db.pool_recycle,
+    pool_pre_ping=settings.db.pool_pre_ping,
+    connect_args=settings.db.connect_args,
+    replica_urls=settings.db.replica_urls,
+    replica_strategy=settings.db.replica_strategy,
+    replica_retry_seconds=settings.db.replica_retry_seconds,
 )
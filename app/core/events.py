@@ -0,0 +1,191 @@
+import asyncio
+import uuid
+from contextlib import suppress
+from typing import Protocol
+
+from app.core.config import settings
+from app.core.logger import logger
+
+PUBLISH_QUEUE_SIZE = 10000
+
+
+class Subscription:
+    """Подписка на события одного кошелька с ограниченным буфером."""
+
+    __slots__ = ("dropped", "queue", "wallet_id")
+
+    def __init__(self, wallet_id: uuid.UUID, buffer_size: int) -> None:
+        self.wallet_id = wallet_id
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue(buffer_size)
+        self.dropped = False
+
+    async def get(self) -> str | None:
+        """Следующее событие (JSON) или None, если подписчик отключён как медленный."""
+        return await self.queue.get()
+
+    def drop(self) -> None:
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class EventHub:
+    """Раздача событий подписчикам кошельков внутри процесса.
+
+    ``dispatch`` не ждёт подписчиков: событие кладётся в буфер каждого из них,
+    а подписчик с заполненным буфером отключается, чтобы медленный клиент не
+    задерживал остальных и не копил память.
+    """
+
+    def __init__(self, buffer_size: int) -> None:
+        self.buffer_size = buffer_size
+        self._subscribers: dict[uuid.UUID, set[Subscription]] = {}
+
+    def subscribe(self, wallet_id: uuid.UUID) -> Subscription:
+        subscription = Subscription(wallet_id, self.buffer_size)
+        self._subscribers.setdefault(wallet_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.wallet_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.wallet_id]
+
+    def dispatch(self, wallet_id: uuid.UUID, payload: str) -> None:
+        for subscription in list(self._subscribers.get(wallet_id, ())):
+            try:
+                subscription.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                logger.warning(
+                    "Подписчик событий кошелька %s не успевает их читать",
+                    wallet_id,
+                    extra={"wallet_id": wallet_id},
+                )
+                subscription.drop()
+                self.unsubscribe(subscription)
+
+
+class EventBroker(Protocol):
+    """Доставка событий в ``EventHub`` всех процессов приложения."""
+
+    def publish(self, wallet_id: uuid.UUID, payload: str) -> None: ...
+
+    async def start(self) -> None: ...
+
+    async def stop(self) -> None: ...
+
+
+class MemoryBroker:
+    """Брокер одного процесса: событие сразу раздаётся локальным подписчикам."""
+
+    def __init__(self, hub: EventHub) -> None:
+        self.hub = hub
+
+    def publish(self, wallet_id: uuid.UUID, payload: str) -> None:
+        self.hub.dispatch(wallet_id, payload)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class PostgresBroker:
+    """Брокер на LISTEN/NOTIFY PostgreSQL.
+
+    Каждый процесс держит одно отдельное от пула соединение: на нём он слушает
+    канал и отправляет накопившиеся события одним запросом ``pg_notify``.
+    Число подписчиков на стоимость не влияет - соединение одно на процесс.
+    События, опубликованные до подключения или во время его восстановления,
+    сверх ``PUBLISH_QUEUE_SIZE`` отбрасываются.
+    """
+
+    def __init__(
+        self,
+        hub: EventHub,
+        dsn: str,
+        channel: str,
+        reconnect_seconds: float,
+    ) -> None:
+        self.hub = hub
+        self._dsn = dsn
+        self._channel = channel
+        self._reconnect = reconnect_seconds
+        self._outbox: asyncio.Queue[str] = asyncio.Queue(PUBLISH_QUEUE_SIZE)
+        self._task: asyncio.Task | None = None
+
+    def publish(self, wallet_id: uuid.UUID, payload: str) -> None:
+        try:
+            self._outbox.put_nowait(f"{wallet_id} {payload}")
+        except asyncio.QueueFull:
+            logger.warning(
+                "Очередь событий переполнена, событие %s потеряно",
+                wallet_id,
+                extra={"wallet_id": wallet_id},
+            )
+
+    def _on_notify(self, connection, pid: int, channel: str, message: str) -> None:
+        wallet_id, _, payload = message.partition(" ")
+        self.hub.dispatch(uuid.UUID(wallet_id), payload)
+
+    async def _run(self) -> None:
+        # Драйвер нужен только этому брокеру, импорт откладывается до запуска.
+        import asyncpg
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self._dsn)
+                await connection.add_listener(self._channel, self._on_notify)
+                while not connection.is_closed():
+                    try:
+                        message = await asyncio.wait_for(
+                            self._outbox.get(), self._reconnect
+                        )
+                    except TimeoutError:
+                        continue
+                    messages = [message]
+                    while not self._outbox.empty():
+                        messages.append(self._outbox.get_nowait())
+                    await connection.execute(
+                        "SELECT pg_notify($1, message) FROM unnest($2::text[]) AS message",
+                        self._channel,
+                        messages,
+                    )
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.error("Ошибка соединения брокера событий: %s", e)
+            finally:
+                if connection is not None:
+                    with suppress(Exception):
+                        await connection.close(timeout=self._reconnect)
+            await asyncio.sleep(self._reconnect)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+event_hub = EventHub(buffer_size=settings.events.buffer_size)
+
+event_broker: EventBroker
+if settings.events.broker == "postgres":
+    event_broker = PostgresBroker(
+        hub=event_hub,
+        dsn=str(settings.db.url).replace("+asyncpg", "", 1),
+        channel=settings.events.channel,
+        reconnect_seconds=settings.events.reconnect_seconds,
+    )
+else:
+    event_broker = MemoryBroker(event_hub)
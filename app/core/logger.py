@@ -1,9 +1,200 @@
+"""Логирование через очередь и фоновый поток записи.
+
+``logger.info(...)`` в обработчике запроса только создаёт запись и кладёт её
+в ограниченную очередь (``put_nowait``); форматирование сообщения, JSON и
+запись в stderr выполняет поток ``QueueListener``. Поэтому вызов логгера не
+блокирует цикл событий на вводе-выводе и не удлиняет удержание блокировок
+строк, даже если он сделан внутри транзакции.
+
+Сообщения форматируются лениво: аргументы передаются отдельно
+(``logger.info("Кошелёк %s получен", wallet_id)``), а поля записи - через
+``extra``. Аргументы не должны изменяться после вызова: запись форматируется
+позже в другом потоке.
+"""
+
+import atexit
+import json
 import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING
+
+from app.core.config import LoggingConfig
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Receive, Scope, Send
+
+TEXT_FORMAT = "%(levelname)s: %(name)s. %(asctime)s - %(message)s"
+TEXT_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# Атрибуты любой записи; остальные пришли из ``extra``.
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {
+    "message",
+    "asctime",
+}
+
+request_scope: ContextVar["Scope | None"] = ContextVar("request_scope", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись как одну JSON-строку.
+
+    Поля ``extra`` добавляются в объект как есть; значения, которые json не
+    умеет сериализовать (UUID, Decimal, datetime), приводятся к строке.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RouteSampler(logging.Filter):
+    """Выборка записей INFO по маршруту текущего запроса.
+
+    Добавляет к записи поля ``method`` и ``route`` (шаблон пути маршрута).
+    Записи WARNING и выше и записи вне запроса проходят всегда.
+    """
+
+    def __init__(self, default_rate: float, rates: dict[str, float]) -> None:
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        scope = request_scope.get()
+        if scope is None:
+            return True
+        route = scope.get("route")
+        path = route.path if route is not None else scope["path"]
+        record.method = scope["method"]
+        record.route = path
+        if record.levelno != logging.INFO:
+            return True
+        rate = self.rates.get(f"{record.method} {path}", self.default_rate)
+        return rate >= 1 or random.random() < rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """``QueueHandler`` с ограниченной очередью, который не ждёт места в ней.
+
+    Если очередь заполнена, запись отбрасывается и учитывается в ``dropped``.
+    Сообщение не форматируется при постановке в очередь (в отличие от
+    ``QueueHandler.prepare``) - это делает поток записи.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # При остановке очередь может быть заполнена: ждём, пока поток записи
+        # освободит место, иначе последние записи потеряются.
+        self.queue.put(self._sentinel)
+
+
+class LogContextMiddleware:
+    """ASGI-middleware: сохраняет scope запроса для ``RouteSampler``.
+
+    Маршрут записывается в scope при сопоставлении, поэтому шаблон пути
+    читается из scope в момент вызова логгера, а не при входе в middleware.
+    """
+
+    def __init__(self, app: "ASGIApp") -> None:
+        self.app = app
+
+    async def __call__(self, scope: "Scope", receive: "Receive", send: "Send") -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_scope.reset(token)
+
+
+_listener: _Listener | None = None
+log_handler: DroppingQueueHandler | None = None
+
+
+def configure_logging(config: LoggingConfig) -> DroppingQueueHandler:
+    """Подключает к корневому логгеру очередь и запускает поток записи.
+
+    Вызывается при запуске приложения (lifespan) и в ``main()`` скриптов; при
+    импорте модуля логирование не настраивается. Повторный вызов
+    останавливает прежний поток (дописав его очередь) и заменяет обработчик.
+
+    Args:
+        config: Настройки логирования.
+
+    Returns:
+        DroppingQueueHandler: Обработчик корневого логгера.
+    """
+    global _listener, log_handler
+    root = logging.getLogger()
+    shutdown_logging()
+
+    stream = logging.StreamHandler(sys.stderr)
+    if config.format == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT, TEXT_DATEFMT))
+
+    log_handler = DroppingQueueHandler(queue.Queue(config.queue_size))
+    log_handler.addFilter(
+        RouteSampler(config.info_sample_rate, config.route_sample_rates)
+    )
+    _listener = _Listener(log_handler.queue, stream)
+    _listener.start()
+    root.addHandler(log_handler)
+    root.setLevel(config.level)
+    atexit.unregister(shutdown_logging)
+    atexit.register(shutdown_logging)
+    return log_handler
+
+
+def shutdown_logging() -> None:
+    """Отключает обработчик от корневого логгера и останавливает поток записи."""
+    global _listener
+    if log_handler is not None:
+        logging.getLogger().removeHandler(log_handler)
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    """Число записей, отброшенных из-за переполнения очереди."""
+    return log_handler.dropped if log_handler is not None else 0
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(levelname)s: %(name)s. %(asctime)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
 
 logger = logging.getLogger("App test rest")
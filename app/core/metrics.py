@@ -0,0 +1,248 @@
+import time
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Sequence
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logger import dropped_records
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+
+class RequestStats:
+    """Счётчики одного запроса: число SQL-запросов и время в базе и пуле."""
+
+    __slots__ = ("db_time", "pool_wait", "retries", "started", "statements")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.retries = 0
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "request_stats",
+    default=None,
+)
+
+
+class Histogram:
+    """Гистограмма с заранее выделенными корзинами.
+
+    Приложение работает в одном цикле событий, поэтому счётчики меняются без
+    блокировок: ``observe`` - это поиск корзины и два сложения.
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines = []
+        total = 0
+        for bound, count in zip(self.bounds, self.counts, strict=False):
+            total += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        total += self.counts[-1]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {total}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {total}")
+        return lines
+
+
+class RouteMetrics:
+    __slots__ = ("db_time", "duration", "pool_wait", "statements")
+
+    def __init__(self) -> None:
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.pool_wait = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+
+
+class MetricsRegistry:
+    """Гистограммы по маршрутам в формате Prometheus."""
+
+    HISTOGRAMS = (
+        ("duration", "http_request_duration_seconds", "Время обработки запроса"),
+        ("db_time", "db_query_duration_seconds", "Время SQL-запросов за запрос"),
+        ("pool_wait", "db_pool_wait_seconds", "Ожидание соединения из пула за запрос"),
+        ("statements", "db_statements_per_request", "Число SQL-запросов за запрос"),
+    )
+
+    def __init__(self) -> None:
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+        self.retries: Counter[str] = Counter()
+        self.retries_exhausted: Counter[str] = Counter()
+
+    def retry(self, sqlstate: str, exhausted: bool = False) -> None:
+        """Учитывает повтор транзакции (или отказ от повтора) по коду SQLSTATE."""
+        if exhausted:
+            self.retries_exhausted[sqlstate] += 1
+            return
+        self.retries[sqlstate] += 1
+        stats = request_stats.get()
+        if stats is not None:
+            stats.retries += 1
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        duration: float,
+        stats: RequestStats,
+    ) -> None:
+        metrics = self.routes.get((method, route))
+        if metrics is None:
+            metrics = self.routes[method, route] = RouteMetrics()
+        metrics.duration.observe(duration)
+        metrics.db_time.observe(stats.db_time)
+        metrics.pool_wait.observe(stats.pool_wait)
+        metrics.statements.observe(stats.statements)
+
+    def render(self) -> str:
+        lines = []
+        for attr, name, description in self.HISTOGRAMS:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), metrics in self.routes.items():
+                labels = f'method="{method}",route="{route}"'
+                lines.extend(getattr(metrics, attr).render(name, labels))
+        for counter, name, description in (
+            (self.retries, "db_transaction_retries_total", "Повторы транзакций"),
+            (
+                self.retries_exhausted,
+                "db_transaction_retries_exhausted_total",
+                "Транзакции, для которых повторы исчерпаны",
+            ),
+        ):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            for sqlstate, count in counter.items():
+                lines.append(f'{name}{{sqlstate="{sqlstate}"}} {count}')
+        lines.append(
+            "# HELP log_records_dropped_total "
+            "Записи лога, отброшенные из-за переполнения очереди"
+        )
+        lines.append("# TYPE log_records_dropped_total counter")
+        lines.append(f"log_records_dropped_total {dropped_records()}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, учитывающий время ожидания соединения в запросе."""
+
+    def _do_get(self):
+        stats = request_stats.get()
+        if stats is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            stats.pool_wait += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if request_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = request_stats.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    if started:
+        stats.db_time += time.perf_counter() - started.pop()
+    stats.statements += 1
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подключает подсчёт SQL-запросов и их времени к движку."""
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: собирает метрики запроса и добавляет заголовок Server-Timing.
+
+    Заголовок содержит время в базе (``db``), ожидание пула (``pool``) и время
+    обработчика до начала ответа (``app``); число SQL-запросов передаётся в
+    описании ``db``, число повторов транзакций - в ``retry``, если они были.
+    """
+
+    def __init__(
+        self, app: ASGIApp, registry: MetricsRegistry = metrics_registry
+    ) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                handler_time = time.perf_counter() - stats.started
+                timing = (
+                    f'db;dur={stats.db_time * 1000:.2f};desc="{stats.statements} queries", '
+                    f"pool;dur={stats.pool_wait * 1000:.2f}, "
+                    f"app;dur={handler_time * 1000:.2f}"
+                )
+                if stats.retries:
+                    timing += f', retry;desc="{stats.retries}"'
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", timing.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_stats.reset(token)
+            route = scope.get("route")
+            self.registry.observe(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                time.perf_counter() - stats.started,
+                stats,
+            )
@@ -0,0 +1,68 @@
+"""Денежные суммы в минимальных единицах валюты (копейках, центах, иенах).
+
+Балансы и суммы операций хранятся целыми числами (BIGINT) в минимальных
+единицах валюты кошелька. В Decimal и десятичную строку они переводятся
+только на границе API: при разборе запроса и при сериализации ответа.
+"""
+
+from decimal import Decimal
+from typing import Literal
+
+Currency = Literal["RUB", "USD", "EUR", "GBP", "CNY", "KZT", "JPY", "KRW", "BHD", "KWD"]
+
+# Число знаков после запятой в минимальной единице валюты (ISO 4217).
+CURRENCY_SCALES: dict[str, int] = {
+    "RUB": 2,
+    "USD": 2,
+    "EUR": 2,
+    "GBP": 2,
+    "CNY": 2,
+    "KZT": 2,
+    "JPY": 0,
+    "KRW": 0,
+    "BHD": 3,
+    "KWD": 3,
+}
+
+# Наибольшее значение BIGINT.
+MAX_MINOR_UNITS = 2**63 - 1
+
+_FACTORS = {scale: 10**scale for scale in set(CURRENCY_SCALES.values())}
+
+
+def to_minor(amount: Decimal, currency: str) -> int:
+    """Переводит сумму в минимальные единицы валюты.
+
+    Args:
+        amount: Сумма в основных единицах (например, рублях).
+        currency: Код валюты ISO 4217.
+
+    Returns:
+        int: Сумма в минимальных единицах.
+
+    Raises:
+        ValueError: Если в сумме больше знаков после запятой, чем допускает
+            валюта, или сумма не помещается в BIGINT.
+    """
+    minor = amount.scaleb(CURRENCY_SCALES[currency])
+    if minor != minor.to_integral_value():
+        raise ValueError(
+            f"Сумма {amount} не кратна минимальной единице валюты {currency}"
+        )
+    if abs(minor) > MAX_MINOR_UNITS:
+        raise ValueError(f"Сумма {amount} слишком велика")
+    return int(minor)
+
+
+def format_minor(value: int, currency: str) -> str:
+    """Форматирует сумму в минимальных единицах как десятичную строку.
+
+    Целочисленное деление вместо Decimal: ``format_minor(123405, "RUB")``
+    возвращает ``"1234.05"``.
+    """
+    scale = CURRENCY_SCALES[currency]
+    if not scale:
+        return str(value)
+    units, minor = divmod(abs(value), _FACTORS[scale])
+    sign = "-" if value < 0 else ""
+    return f"{sign}{units}.{minor:0{scale}d}"
@@ -0,0 +1,28 @@
+"""Ответ JSON, сериализуемый pydantic-core.
+
+``ModelResponse`` - класс ответа приложения по умолчанию. Модель Pydantic
+сериализуется в байты JSON её собственным сериализатором (Rust), без
+промежуточного словаря и ``json.dumps``; остальные значения - через
+``pydantic_core.to_json``. Decimal, UUID, datetime и перечисления выводятся
+так же, как при сериализации моделей: Decimal и UUID - строками, datetime -
+в ISO 8601.
+
+Если эндпоинт возвращает модель, FastAPI перед ответом превращает её в
+словарь, заново проверяет по ``response_model`` и снова сериализует.
+Эндпоинты, отвечающие уже собранной моделью, возвращают
+``ModelResponse(model)``: такой ответ FastAPI отдаёт как есть, а
+``response_model`` остаётся только для схемы OpenAPI.
+"""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+class ModelResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return to_json(content)
@@ -0,0 +1,113 @@
+import asyncio
+import uuid
+from collections.abc import Callable
+from contextlib import suppress
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api_v1.wallet.schemas import OperationCreate, OperationResponse
+from app.core import db_helper
+from app.core.config import settings
+from app.crud.wallet import apply_operations
+
+type PendingOperation = tuple[OperationCreate, asyncio.Future[OperationResponse]]
+
+
+class OperationCoalescer:
+    """Очередь операций перед кошельком с объединением их в общие транзакции.
+
+    Операции над одним кошельком, пришедшие в пределах окна ``window_ms``
+    (или пока их меньше ``max_batch``), применяются одной транзакцией через
+    ``apply_operations``: вместо N захватов блокировки строки - один.
+    Пакеты одного кошелька выполняются строго по очереди, каждый запрос
+    получает собственный результат.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        window_ms: float,
+        max_batch: int,
+    ) -> None:
+        self._session_factory = session_factory
+        self._window = window_ms / 1000
+        self._max_batch = max_batch
+        self._pending: dict[uuid.UUID, list[PendingOperation]] = {}
+        self._batch_full: dict[uuid.UUID, asyncio.Event] = {}
+        self._workers: dict[uuid.UUID, asyncio.Task] = {}
+
+    async def submit(
+        self,
+        uuid_wallet: uuid.UUID,
+        operation: OperationCreate,
+    ) -> OperationResponse:
+        """Ставит операцию в очередь кошелька и ждёт её результата.
+
+        Raises:
+            HTTPException:
+                - 404: Если кошелёк не найден.
+                - 422: Если недостаточно средств для снятия.
+            SQLAlchemyError: Если транзакция пакета завершилась ошибкой.
+        """
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(uuid_wallet, [])
+        pending.append((operation, future))
+        if uuid_wallet not in self._workers:
+            self._batch_full[uuid_wallet] = asyncio.Event()
+            self._workers[uuid_wallet] = asyncio.create_task(self._worker(uuid_wallet))
+        if len(pending) >= self._max_batch:
+            self._batch_full[uuid_wallet].set()
+        # Отмена запроса не должна отменять уже поставленную в пакет операцию.
+        return await asyncio.shield(future)
+
+    async def _worker(self, uuid_wallet: uuid.UUID) -> None:
+        batch_full = self._batch_full[uuid_wallet]
+        try:
+            while self._pending.get(uuid_wallet):
+                if len(self._pending[uuid_wallet]) < self._max_batch:
+                    with suppress(TimeoutError):
+                        await asyncio.wait_for(batch_full.wait(), self._window)
+                batch_full.clear()
+                pending = self._pending[uuid_wallet]
+                batch = pending[: self._max_batch]
+                self._pending[uuid_wallet] = pending[self._max_batch :]
+                await self._apply(uuid_wallet, batch)
+        finally:
+            for _, future in self._pending.pop(uuid_wallet, []):
+                future.cancel()
+            del self._workers[uuid_wallet]
+            del self._batch_full[uuid_wallet]
+
+    async def drain(self) -> None:
+        """Дожидается применения всех поставленных в очередь операций."""
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+    async def _apply(
+        self,
+        uuid_wallet: uuid.UUID,
+        batch: list[PendingOperation],
+    ) -> None:
+        try:
+            async with self._session_factory() as session:
+                results = await apply_operations(
+                    session,
+                    [(uuid_wallet, operation) for operation, _ in batch],
+                )
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results, strict=True):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+operation_coalescer = OperationCoalescer(
+    session_factory=db_helper.stream_session_getter,
+    window_ms=settings.wallet.coalesce_window_ms,
+    max_batch=settings.wallet.coalesce_max_batch,
+)
@@ -0,0 +1,195 @@
+import asyncio
+import uuid
+from collections.abc import Callable, Iterable
+from contextlib import suppress
+
+from sqlalchemy import BigInteger, ColumnElement, case, cast, func, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import db_helper, logger
+from app.core.config import settings
+from app.models import Operation, OperationType, Wallet
+
+
+def signed_amount() -> ColumnElement[int]:
+    """Сумма операции со знаком: снятие и исходящий перевод уменьшают баланс."""
+    return case(
+        (
+            Operation.operation_type.in_(
+                [OperationType.WITHDRAW, OperationType.TRANSFER_OUT]
+            ),
+            -Operation.amount,
+        ),
+        else_=Operation.amount,
+    )
+
+
+def pending_sum(uuid_wallet: uuid.UUID | ColumnElement) -> ColumnElement[int]:
+    """Скалярный подзапрос: сумма операций кошелька, ещё не учтённых в снимке.
+
+    Читает только строки частичного индекса ``ix_operations_wallet_id_pending``,
+    число которых ограничено компактизацией.
+    """
+    # sum(bigint) в PostgreSQL возвращает numeric.
+    return (
+        select(cast(func.coalesce(func.sum(signed_amount()), 0), BigInteger))
+        .where(Operation.wallet_id == uuid_wallet, Operation.compacted.is_(False))
+        .scalar_subquery()
+    )
+
+
+async def pending_sums(
+    session: AsyncSession,
+    wallet_ids: Iterable[uuid.UUID],
+) -> dict[uuid.UUID, int]:
+    """Суммы ещё не учтённых в снимке операций для нескольких кошельков."""
+    rows = await session.execute(
+        select(Operation.wallet_id, cast(func.sum(signed_amount()), BigInteger))
+        .where(
+            Operation.wallet_id.in_(list(wallet_ids)), Operation.compacted.is_(False)
+        )
+        .group_by(Operation.wallet_id)
+    )
+    return dict(rows.tuples().all())
+
+
+async def compact_wallet(session: AsyncSession, uuid_wallet: uuid.UUID) -> int:
+    """Переносит новые операции кошелька в снимок баланса ``wallets.balance``.
+
+    Строка кошелька блокируется (``FOR NO KEY UPDATE``), операции помечаются
+    учтёнными и суммируются одним UPDATE ... RETURNING, снимок меняется в той
+    же транзакции, поэтому читатель видит либо старый
+    снимок с операциями, либо новый без них.
+
+    Returns:
+        int: Число учтённых операций.
+    """
+    try:
+        async with session.begin():
+            # Строка кошелька блокируется до пометки операций, поэтому
+            # компактизация и снятия одного кошелька выполняются по очереди.
+            await session.execute(
+                select(Wallet.id)
+                .where(Wallet.id == uuid_wallet)
+                .with_for_update(key_share=True)
+            )
+            rows = await session.execute(
+                update(Operation)
+                .where(
+                    Operation.wallet_id == uuid_wallet,
+                    Operation.compacted.is_(False),
+                )
+                .values(compacted=True)
+                .returning(Operation.operation_type, Operation.amount)
+                .execution_options(synchronize_session=False)
+            )
+            compacted = rows.tuples().all()
+            delta = sum(
+                -amount if operation_type.is_debit else amount
+                for operation_type, amount in compacted
+            )
+            if compacted:
+                await session.execute(
+                    update(Wallet)
+                    .where(Wallet.id == uuid_wallet)
+                    .values(balance=Wallet.balance + delta)
+                    .execution_options(synchronize_session=False)
+                )
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error(
+            "Ошибка при компактизации кошелька %s: %s",
+            uuid_wallet,
+            e,
+            extra={"wallet_id": uuid_wallet},
+        )
+        raise
+    return len(compacted)
+
+
+class LedgerCompactor:
+    """Фоновая компактизация журнала операций в снимки балансов.
+
+    Кошелёк компактизируется после ``every`` операций, записанных этим
+    процессом, а раз в ``interval`` секунд - все кошельки с новыми операциями
+    (в том числе записанными другими процессами).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        every: int,
+        interval: float,
+    ) -> None:
+        self._session_factory = session_factory
+        self._every = every
+        self._interval = interval
+        self._counts: dict[uuid.UUID, int] = {}
+        self._running: dict[uuid.UUID, asyncio.Task] = {}
+        self._sweeper: asyncio.Task | None = None
+
+    def notify(self, uuid_wallet: uuid.UUID, operations: int = 1) -> None:
+        """Учитывает записанные операции и при необходимости запускает компактизацию."""
+        count = self._counts.get(uuid_wallet, 0) + operations
+        if count < self._every or uuid_wallet in self._running:
+            self._counts[uuid_wallet] = count
+            return
+        self._counts.pop(uuid_wallet, None)
+        task = asyncio.create_task(self._compact(uuid_wallet))
+        self._running[uuid_wallet] = task
+        task.add_done_callback(lambda _: self._running.pop(uuid_wallet, None))
+
+    async def _compact(self, uuid_wallet: uuid.UUID) -> None:
+        # Ошибка уже залогирована, операции будут учтены следующей проверкой.
+        with suppress(SQLAlchemyError):
+            async with self._session_factory() as session:
+                await compact_wallet(session, uuid_wallet)
+
+    async def sweep(self) -> int:
+        """Компактизирует все кошельки с новыми операциями.
+
+        Returns:
+            int: Число учтённых операций.
+        """
+        async with self._session_factory() as session:
+            wallet_ids = (
+                await session.scalars(
+                    select(Operation.wallet_id)
+                    .where(Operation.compacted.is_(False))
+                    .distinct()
+                )
+            ).all()
+            await session.rollback()
+            total = 0
+            for uuid_wallet in wallet_ids:
+                total += await compact_wallet(session, uuid_wallet)
+        self._counts.clear()
+        return total
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.sweep()
+            except SQLAlchemyError as e:
+                logger.error("Ошибка фоновой компактизации журнала: %s", e)
+
+    def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def stop(self) -> None:
+        tasks = [*self._running.values()]
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            tasks.append(self._sweeper)
+            self._sweeper = None
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+ledger_compactor = LedgerCompactor(
+    session_factory=db_helper.stream_session_getter,
+    every=settings.wallet.ledger_compact_every,
+    interval=settings.wallet.ledger_compact_interval_seconds,
+)
@@ -0,0 +1,325 @@
+import base64
+import binascii
+import csv
+import io
+import uuid
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime, timedelta
+from typing import Literal
+
+from sqlalchemy import Select, and_, delete, insert, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api_v1.wallet.schemas import OperationResponse
+from app.core import logger
+from app.core.cache import idempotency_cache
+from app.core.money import format_minor
+from app.models import Operation, OperationIdempotencyKey, OperationType, Wallet
+
+type Cursor = tuple[datetime, uuid.UUID]
+
+
+def encode_cursor(operation: OperationResponse) -> str:
+    """Кодирует позицию операции (created_at, id) в непрозрачный курсор."""
+    raw = f"{operation.created_at.isoformat()}|{operation.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Декодирует курсор, полученный из ``encode_cursor``.
+
+    Raises:
+        ValueError: Если курсор повреждён.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, operation_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(operation_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Некорректный курсор: {cursor}") from e
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Приводит время к UTC без часового пояса, как хранится ``created_at``."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(UTC).replace(tzinfo=None)
+
+
+def operations_query(
+    uuid_wallet: uuid.UUID | None = None,
+    operation_type: OperationType | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> Select:
+    """Строит запрос операций с фильтрами по кошельку, типу и времени создания.
+
+    Валюта операции берётся из кошелька (одна строка wallets по первичному
+    ключу для выборки по кошельку).
+
+    Args:
+        uuid_wallet: UUID кошелька или None для всех кошельков.
+        operation_type: Тип операции.
+        created_from: Нижняя граница created_at (включительно).
+        created_to: Верхняя граница created_at (не включительно).
+    """
+    stmt = select(
+        Operation.id,
+        Operation.wallet_id,
+        Operation.operation_type,
+        Operation.amount,
+        Operation.created_at,
+        Wallet.currency,
+    ).join(Wallet, Wallet.id == Operation.wallet_id)
+    if uuid_wallet is not None:
+        stmt = stmt.where(Operation.wallet_id == uuid_wallet)
+    if operation_type is not None:
+        stmt = stmt.where(Operation.operation_type == operation_type)
+    if created_from is not None:
+        stmt = stmt.where(Operation.created_at >= _naive_utc(created_from))
+    if created_to is not None:
+        stmt = stmt.where(Operation.created_at < _naive_utc(created_to))
+    return stmt
+
+
+async def get_operation_by_idempotency_key(
+    session: AsyncSession,
+    uuid_wallet: uuid.UUID,
+    idempotency_key: str,
+) -> OperationResponse | None:
+    """Возвращает операцию, уже выполненную с этим ключом идемпотентности.
+
+    Сначала проверяется кэш ответов, затем ключ ищется по уникальному индексу
+    ``operation_idempotency_keys``, а операция - по ``(id, created_at)`` в
+    одной секции ``operations``; строка кошелька не блокируется.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy.
+        uuid_wallet: UUID кошелька.
+        idempotency_key: Значение заголовка Idempotency-Key.
+
+    Returns:
+        OperationResponse | None: Исходная операция или None, если ключ новый.
+    """
+    cached = idempotency_cache.get((uuid_wallet, idempotency_key))
+    if cached is not None:
+        return cached
+    conditions = [
+        OperationIdempotencyKey.operation_id == Operation.id,
+        OperationIdempotencyKey.wallet_id == uuid_wallet,
+        OperationIdempotencyKey.idempotency_key == idempotency_key,
+    ]
+    if session.bind.dialect.name == "postgresql":
+        # Условие по created_at отсекает все секции, кроме одной. SQLite
+        # хранит время строкой, и формат server_default отличается от
+        # формата параметров, поэтому там сравнение только по id.
+        conditions.append(
+            OperationIdempotencyKey.operation_created_at == Operation.created_at
+        )
+    row = (
+        await session.execute(
+            operations_query(uuid_wallet).join(
+                OperationIdempotencyKey, and_(*conditions)
+            )
+        )
+    ).one_or_none()
+    if row is None:
+        return None
+    operation = OperationResponse.model_validate(row)
+    idempotency_cache.set((uuid_wallet, idempotency_key), operation)
+    return operation
+
+
+async def save_idempotency_key(
+    session: AsyncSession,
+    operation: OperationResponse,
+    idempotency_key: str,
+) -> None:
+    """Записывает ключ идемпотентности операции.
+
+    Вызывается в транзакции, создавшей операцию. Если ключ уже занят
+    параллельным запросом, уникальный индекс вызывает ``IntegrityError`` и
+    транзакция откатывается вместе с операцией.
+    """
+    await session.execute(
+        insert(OperationIdempotencyKey).values(
+            id=uuid.uuid4(),
+            wallet_id=operation.wallet_id,
+            idempotency_key=idempotency_key,
+            operation_id=operation.id,
+            operation_created_at=operation.created_at,
+        )
+    )
+
+
+async def purge_idempotency_keys(
+    session: AsyncSession,
+    ttl: timedelta,
+) -> int:
+    """Удаляет ключи идемпотентности операций старше ``ttl``.
+
+    Сами операции не меняются (старые секции ``operations`` не
+    перезаписываются), после очистки повтор с тем же ключом выполняется как
+    новая операция.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy.
+        ttl: Время, в течение которого ключ защищает от повтора.
+
+    Returns:
+        int: Число удалённых ключей.
+    """
+    cutoff = datetime.now(UTC).replace(tzinfo=None) - ttl
+    try:
+        async with session.begin():
+            result = await session.execute(
+                delete(OperationIdempotencyKey).where(
+                    OperationIdempotencyKey.created_at < cutoff
+                )
+            )
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error("Ошибка при очистке ключей идемпотентности: %s", e)
+        raise
+    return result.rowcount
+
+
+async def get_wallet_operations(
+    session: AsyncSession,
+    uuid_wallet: uuid.UUID,
+    limit: int,
+    cursor: str | None = None,
+    operation_type: OperationType | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> tuple[list[OperationResponse], str | None]:
+    """Возвращает страницу истории операций кошелька, от новых к старым.
+
+    Используется keyset-пагинация по ``(created_at, id)``: следующая страница
+    начинается строго после последней операции предыдущей, поэтому стоимость
+    запроса не зависит от глубины страницы и покрывается индексом
+    ``ix_operations_wallet_id_created_at_id``.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy.
+        uuid_wallet: UUID кошелька.
+        limit: Размер страницы.
+        cursor: Курсор, полученный вместе с предыдущей страницей.
+        operation_type: Фильтр по типу операции.
+        created_from: Нижняя граница created_at (включительно).
+        created_to: Верхняя граница created_at (не включительно).
+
+    Returns:
+        tuple[list[OperationResponse], str | None]: Операции страницы и курсор
+        следующей страницы (None, если страница последняя).
+
+    Raises:
+        ValueError: Если курсор повреждён.
+    """
+    stmt = operations_query(uuid_wallet, operation_type, created_from, created_to)
+    if cursor is not None:
+        created_at, operation_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(Operation.created_at, Operation.id)
+            < tuple_(_naive_utc(created_at), operation_id)
+        )
+    stmt = stmt.order_by(Operation.created_at.desc(), Operation.id.desc()).limit(
+        limit + 1
+    )
+    try:
+        rows = (await session.execute(stmt)).all()
+    except SQLAlchemyError as e:
+        logger.error(
+            "Ошибка при получении истории операций кошелька %s: %s",
+            uuid_wallet,
+            e,
+            extra={"wallet_id": uuid_wallet},
+        )
+        raise
+
+    items = [OperationResponse.model_validate(row) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return items, next_cursor
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "wallet_id",
+    "operation_type",
+    "amount",
+    "currency",
+    "created_at",
+)
+
+
+def _format_rows(rows: list, export_format: Literal["ndjson", "csv"]) -> str:
+    operations = [OperationResponse.model_validate(row) for row in rows]
+    if export_format == "ndjson":
+        return "".join(operation.model_dump_json() + "\n" for operation in operations)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        (
+            operation.id,
+            operation.wallet_id,
+            operation.operation_type.value,
+            format_minor(operation.amount, operation.currency),
+            operation.currency,
+            operation.created_at.isoformat(),
+        )
+        for operation in operations
+    )
+    return buffer.getvalue()
+
+
+async def stream_operations(
+    session: AsyncSession,
+    export_format: Literal["ndjson", "csv"],
+    chunk_size: int,
+    uuid_wallet: uuid.UUID | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> AsyncIterator[str]:
+    """Потоково выгружает операции в формате NDJSON или CSV.
+
+    Строки читаются серверным курсором порциями по ``chunk_size``, каждая
+    порция отдаётся одним фрагментом, поэтому потребление памяти не зависит
+    от числа строк. Операции одного кошелька идут в порядке
+    ``(created_at, id)`` по индексу, глобальная выгрузка не сортируется.
+
+    Генератор сам закрывает сессию по завершении или при прерывании (например,
+    при отключении клиента), освобождая курсор и соединение.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy.
+        export_format: ``ndjson`` или ``csv``.
+        chunk_size: Число строк в одной порции.
+        uuid_wallet: UUID кошелька или None для всех кошельков.
+        created_from: Нижняя граница created_at (включительно).
+        created_to: Верхняя граница created_at (не включительно).
+
+    Yields:
+        str: Фрагменты выгрузки; для CSV первым идёт заголовок.
+    """
+    stmt = operations_query(
+        uuid_wallet,
+        created_from=created_from,
+        created_to=created_to,
+    ).execution_options(yield_per=chunk_size)
+    if uuid_wallet is not None:
+        stmt = stmt.order_by(Operation.created_at, Operation.id)
+    try:
+        if export_format == "csv":
+            yield ",".join(EXPORT_COLUMNS) + "\r\n"
+        result = await session.stream(stmt)
+        try:
+            async for rows in result.partitions():
+                yield _format_rows(rows, export_format)
+        finally:
+            await result.close()
+    except SQLAlchemyError as e:
+        logger.error("Ошибка при выгрузке операций: %s", e)
+        raise
+    finally:
+        await session.close()
@@ -0,0 +1,259 @@
+"""Секции таблицы operations по месяцам ``created_at`` (только PostgreSQL).
+
+Секция месяца называется ``operations_pYYYYMM`` и содержит операции с
+``created_at`` в [первое число месяца, первое число следующего). Секции по
+умолчанию нет: вставка в месяц без секции завершится ошибкой, поэтому
+будущие секции создаются заранее (``PartitionMaintainer`` и
+``python -m app.cli.archive_operations``). Без секции по умолчанию старые
+секции можно отсоединять ``DETACH PARTITION CONCURRENTLY``, не блокируя
+вставку.
+"""
+
+import asyncio
+import gzip
+import re
+from collections.abc import Callable
+from datetime import UTC, date, datetime
+from pathlib import Path
+from typing import Literal
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core import db_helper, logger
+from app.core.config import settings
+
+PARTITION_NAME = re.compile(r"^operations_p(\d{4})(\d{2})$")
+
+# Ожидание блокировки родительской таблицы ограничено, чтобы DDL не
+# выстраивал очередь из вставок за долгой транзакцией.
+LOCK_TIMEOUT = "5s"
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    """Первое число месяца, отстоящего от ``value`` на ``months`` месяцев."""
+    year, month = divmod(value.year * 12 + value.month - 1 + months, 12)
+    return date(year, month + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"operations_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> date | None:
+    """Месяц секции по её имени или None, если это не секция месяца."""
+    match = PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return date(int(match[1]), int(match[2]), 1)
+
+
+def _today() -> date:
+    return datetime.now(UTC).date()
+
+
+PartitionState = Literal["attached", "detach_pending", "detached"]
+
+
+async def _partition_tables(engine: AsyncEngine) -> dict[str, PartitionState]:
+    """Таблицы секций: имя -> состояние относительно operations.
+
+    ``detach_pending`` - секция, ``DETACH PARTITION CONCURRENTLY`` которой
+    прервался после первой транзакции: строка в pg_inherits осталась, и
+    отсоединение завершает только ``DETACH PARTITION ... FINALIZE``.
+    """
+    async with engine.connect() as conn:
+        rows = await conn.execute(
+            text(
+                "SELECT c.relname, i.inhparent IS NOT NULL, "
+                "coalesce(i.inhdetachpending, false) "
+                "FROM pg_class c "
+                "LEFT JOIN pg_inherits i ON i.inhrelid = c.oid "
+                "WHERE c.relkind = 'r' AND c.relname LIKE 'operations\\_p%' "
+                "AND c.relnamespace = current_schema()::regnamespace"
+            )
+        )
+        tables: dict[str, PartitionState] = {}
+        for name, attached, detach_pending in rows:
+            if not partition_month(name):
+                continue
+            if detach_pending:
+                tables[name] = "detach_pending"
+            else:
+                tables[name] = "attached" if attached else "detached"
+        return tables
+
+
+async def create_partitions(
+    engine: AsyncEngine,
+    months_ahead: int,
+    today: date | None = None,
+) -> list[str]:
+    """Создаёт секции текущего месяца и ``months_ahead`` следующих.
+
+    Секция создаётся отдельной таблицей с ограничением CHECK по диапазону и
+    присоединяется ``ATTACH PARTITION``: он берёт SHARE UPDATE EXCLUSIVE на
+    operations и не блокирует вставку и чтение, а благодаря CHECK не
+    проверяет строки новой таблицы.
+
+    Returns:
+        list[str]: Имена созданных секций.
+    """
+    if engine.dialect.name != "postgresql":
+        return []
+    existing = await _partition_tables(engine)
+    current = month_start(today or _today())
+    created = []
+    for offset in range(months_ahead + 1):
+        start = add_months(current, offset)
+        end = add_months(start, 1)
+        name = partition_name(start)
+        if name in existing:
+            continue
+        bounds = f"created_at >= '{start}' AND created_at < '{end}'"
+        async with engine.begin() as conn:
+            # Процессы приложения создают секции по очереди; секцию, которую
+            # уже создал другой процесс, пропускаем.
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext('operations_partitions'))")
+            )
+            if await conn.scalar(text("SELECT to_regclass(:name)"), {"name": name}):
+                continue
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+            await conn.execute(
+                text(
+                    f"CREATE TABLE {name} "
+                    "(LIKE operations INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                )
+            )
+            await conn.execute(
+                text(f"ALTER TABLE {name} ADD CONSTRAINT {name}_range CHECK ({bounds})")
+            )
+            await conn.execute(
+                text(
+                    f"ALTER TABLE operations ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{start}') TO ('{end}')"
+                )
+            )
+            # После присоединения ограничение дублирует границы секции.
+            await conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_range"))
+        created.append(name)
+        logger.info("Создана секция %s", name, extra={"partition": name})
+    return created
+
+
+async def _export_table(engine: AsyncEngine, name: str, path: Path) -> None:
+    """Выгружает таблицу в CSV, сжатый gzip, через COPY ... TO STDOUT."""
+    partial = path.with_name(f"{path.name}.partial")
+    with gzip.open(partial, "wb") as archive:
+
+        async def write(chunk: bytes) -> None:
+            await asyncio.to_thread(archive.write, chunk)
+
+        async with engine.connect() as conn:
+            raw_connection = await conn.get_raw_connection()
+            await raw_connection.driver_connection.copy_from_table(
+                name, output=write, format="csv", header=True
+            )
+    # Файл без суффикса .partial появляется только после полной выгрузки.
+    partial.replace(path)
+
+
+async def archive_partitions(
+    engine: AsyncEngine,
+    retention_months: int,
+    archive_dir: Path,
+    today: date | None = None,
+) -> list[Path]:
+    """Выгружает и удаляет секции старше ``retention_months`` полных месяцев.
+
+    Для каждой секции: ``DETACH PARTITION CONCURRENTLY`` (запросы к
+    operations перестают её видеть, вставка не блокируется), выгрузка в
+    ``archive_dir/operations_pYYYYMM.csv.gz`` и ``DROP TABLE``. Если выгрузка
+    прервалась, отсоединённая таблица остаётся в базе и выгружается при
+    следующем запуске. Если прервалось само отсоединение (например, по
+    ``lock_timeout``), следующий запуск завершает его
+    ``DETACH PARTITION ... FINALIZE``: повторный ``CONCURRENTLY`` для такой
+    секции PostgreSQL отклоняет.
+
+    Returns:
+        list[Path]: Файлы выгруженных секций.
+    """
+    if engine.dialect.name != "postgresql" or retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(today or _today()), -retention_months)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    archived = []
+    tables = await _partition_tables(engine)
+    for name in sorted(tables):
+        if partition_month(name) >= cutoff:
+            continue
+        if tables[name] != "detached":
+            mode = "FINALIZE" if tables[name] == "detach_pending" else "CONCURRENTLY"
+            autocommit = engine.execution_options(isolation_level="AUTOCOMMIT")
+            async with autocommit.connect() as conn:
+                # DETACH ... CONCURRENTLY и FINALIZE нельзя выполнять в транзакции.
+                await conn.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+                try:
+                    await conn.execute(
+                        text(f"ALTER TABLE operations DETACH PARTITION {name} {mode}")
+                    )
+                finally:
+                    await conn.execute(text("RESET lock_timeout"))
+        path = archive_dir / f"{name}.csv.gz"
+        await _export_table(engine, name, path)
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE {name}"))
+        archived.append(path)
+        logger.info("Секция %s выгружена в %s", name, path, extra={"partition": name})
+    return archived
+
+
+class PartitionMaintainer:
+    """Фоновое создание будущих секций operations раз в ``interval`` секунд."""
+
+    def __init__(
+        self,
+        engine_factory: Callable[[], AsyncEngine],
+        months_ahead: int,
+        interval: float,
+    ) -> None:
+        self._engine_factory = engine_factory
+        self._months_ahead = months_ahead
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def run_once(self) -> list[str]:
+        return await create_partitions(self._engine_factory(), self._months_ahead)
+
+    async def _run_forever(self) -> None:
+        # Секции на ``months_ahead`` месяцев вперёд уже созданы миграцией или
+        # app.cli.archive_operations, поэтому первая проверка ждёт интервал.
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.run_once()
+            except SQLAlchemyError as e:
+                logger.error("Ошибка при создании секций operations: %s", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+partition_maintainer = PartitionMaintainer(
+    engine_factory=lambda: db_helper.engine,
+    months_ahead=settings.partitions.months_ahead,
+    interval=settings.partitions.check_interval_seconds,
+)
@@ -0,0 +1,283 @@
+import asyncio
+import uuid
+from collections.abc import Callable
+from datetime import UTC, date, datetime, time, timedelta
+from typing import Literal
+
+from sqlalchemy import BigInteger, Date, cast, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api_v1.wallet.schemas import WalletStatsBucket, WalletStatsResponse
+from app.core import db_helper, logger
+from app.core.cache import currency_cache
+from app.core.config import settings
+from app.models import Operation, StatsWatermark, Wallet, WalletDailyStat
+
+WATERMARK_NAME = "wallet_daily_stats"
+
+type Granularity = Literal["day", "month"]
+
+
+def _operation_day():
+    """День операции (UTC) из ``created_at``."""
+    return func.date(Operation.created_at, type_=Date)
+
+
+async def aggregate_operations(
+    session: AsyncSession,
+    until: datetime,
+    chunk_size: int = 1000,
+) -> int:
+    """Переносит операции до ``until`` в дневные сводки ``wallet_daily_stats``.
+
+    Операции с ``created_at`` в [отметка, until) группируются по кошельку, дню
+    и типу и прибавляются к сводкам через ``INSERT ... ON CONFLICT DO UPDATE``,
+    после чего отметка сдвигается на ``until`` - всё в одной транзакции.
+    Строка отметки блокируется, поэтому агрегаторы нескольких процессов не
+    учтут одни и те же операции дважды. При первом запуске отметка ставится
+    на самую раннюю операцию.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy.
+        until: Новая отметка (UTC без часового пояса, как ``created_at``).
+        chunk_size: Число строк сводок в одном INSERT.
+
+    Returns:
+        int: Число добавленных или обновлённых строк сводок.
+    """
+    try:
+        async with session.begin():
+            watermark = await session.scalar(
+                select(StatsWatermark)
+                .where(StatsWatermark.name == WATERMARK_NAME)
+                .with_for_update()
+            )
+            if watermark is None:
+                first = await session.scalar(select(func.min(Operation.created_at)))
+                watermark = StatsWatermark(
+                    name=WATERMARK_NAME, watermark=first or until
+                )
+                session.add(watermark)
+                await session.flush()
+            if watermark.watermark >= until:
+                return 0
+
+            day = _operation_day()
+            rows = (
+                await session.execute(
+                    select(
+                        Operation.wallet_id,
+                        day,
+                        Operation.operation_type,
+                        cast(func.sum(Operation.amount), BigInteger),
+                        func.count(),
+                    )
+                    .where(
+                        Operation.created_at >= watermark.watermark,
+                        Operation.created_at < until,
+                    )
+                    .group_by(Operation.wallet_id, day, Operation.operation_type)
+                )
+            ).all()
+            insert = (
+                pg_insert
+                if session.bind.dialect.name == "postgresql"
+                else sqlite_insert
+            )
+            for start in range(0, len(rows), chunk_size):
+                stmt = insert(WalletDailyStat).values(
+                    [
+                        {
+                            "id": uuid.uuid4(),
+                            "wallet_id": wallet_id,
+                            "day": row_day,
+                            "operation_type": operation_type,
+                            "amount": amount,
+                            "count": count,
+                        }
+                        for wallet_id, row_day, operation_type, amount, count in rows[
+                            start : start + chunk_size
+                        ]
+                    ]
+                )
+                await session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[
+                            WalletDailyStat.wallet_id,
+                            WalletDailyStat.day,
+                            WalletDailyStat.operation_type,
+                        ],
+                        set_={
+                            "amount": WalletDailyStat.amount + stmt.excluded.amount,
+                            "count": WalletDailyStat.count + stmt.excluded.count,
+                            "updated_at": func.now(),
+                        },
+                    )
+                )
+            watermark.watermark = until
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error("Ошибка при агрегации операций в сводки: %s", e)
+        raise
+    return len(rows)
+
+
+async def get_wallet_stats(
+    session: AsyncSession,
+    uuid_wallet: uuid.UUID,
+    date_from: date,
+    date_to: date,
+    granularity: Granularity = "day",
+) -> WalletStatsResponse | None:
+    """Возвращает суммы операций кошелька по дням или месяцам.
+
+    Операции до отметки агрегации берутся из ``wallet_daily_stats`` (строка на
+    день и тип операции), более новые - из ``operations`` по индексу
+    ``ix_operations_wallet_id_created_at_id``. Обе части читаются одним
+    запросом, поэтому видят одну и ту же отметку, даже если агрегатор сдвигает
+    её параллельно. Стоимость зависит от числа дней, а не операций.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy.
+        uuid_wallet: UUID кошелька.
+        date_from: Первый день периода (включительно, UTC).
+        date_to: Последний день периода (не включительно, UTC).
+        granularity: ``day`` или ``month``.
+
+    Returns:
+        WalletStatsResponse | None: Периоды с операциями по возрастанию или
+        None, если кошелёк не найден.
+    """
+    currency = currency_cache.get(uuid_wallet)
+    if currency is None:
+        currency = await session.scalar(
+            select(Wallet.currency).where(Wallet.id == uuid_wallet)
+        )
+        if currency is None:
+            return None
+        currency_cache.set(uuid_wallet, currency)
+
+    created_from = datetime.combine(date_from, time())
+    created_to = datetime.combine(date_to, time())
+    watermark = (
+        select(StatsWatermark.watermark)
+        .where(StatsWatermark.name == WATERMARK_NAME)
+        .scalar_subquery()
+    )
+    day = _operation_day()
+    stmt = union_all(
+        select(
+            WalletDailyStat.day,
+            WalletDailyStat.operation_type,
+            WalletDailyStat.amount,
+            WalletDailyStat.count,
+        ).where(
+            WalletDailyStat.wallet_id == uuid_wallet,
+            WalletDailyStat.day >= date_from,
+            WalletDailyStat.day < date_to,
+        ),
+        select(
+            day,
+            Operation.operation_type,
+            cast(func.sum(Operation.amount), BigInteger),
+            func.count(),
+        )
+        .where(
+            Operation.wallet_id == uuid_wallet,
+            Operation.created_at >= func.coalesce(watermark, literal(created_from)),
+            Operation.created_at >= created_from,
+            Operation.created_at < created_to,
+        )
+        .group_by(day, Operation.operation_type),
+    )
+    try:
+        rows = (await session.execute(stmt)).all()
+    except SQLAlchemyError as e:
+        logger.error(
+            "Ошибка при получении статистики кошелька %s: %s",
+            uuid_wallet,
+            e,
+            extra={"wallet_id": uuid_wallet},
+        )
+        raise
+
+    buckets: dict[date, WalletStatsBucket] = {}
+    for row_day, operation_type, amount, count in rows:
+        period = row_day if granularity == "day" else row_day.replace(day=1)
+        bucket = buckets.get(period)
+        if bucket is None:
+            bucket = buckets[period] = WalletStatsBucket(
+                period=period, currency=currency
+            )
+        prefix = operation_type.value.lower()
+        setattr(
+            bucket, f"{prefix}_amount", getattr(bucket, f"{prefix}_amount") + amount
+        )
+        setattr(bucket, f"{prefix}_count", getattr(bucket, f"{prefix}_count") + count)
+        bucket.net_amount += -amount if operation_type.is_debit else amount
+    return WalletStatsResponse(
+        wallet_id=uuid_wallet,
+        granularity=granularity,
+        buckets=[buckets[period] for period in sorted(buckets)],
+    )
+
+
+class StatsAggregator:
+    """Фоновый перенос операций в дневные сводки раз в ``interval`` секунд.
+
+    Отметка отстаёт от текущего времени на ``lag`` секунд: операции ещё
+    незафиксированных транзакций имеют ``created_at`` не позже их начала и
+    успевают зафиксироваться до того, как отметка пройдёт это время.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        interval: float,
+        lag: float,
+    ) -> None:
+        self._session_factory = session_factory
+        self._interval = interval
+        self._lag = lag
+        self._task: asyncio.Task | None = None
+
+    async def run_once(self) -> int:
+        """Переносит в сводки операции старше ``lag`` секунд.
+
+        Returns:
+            int: Число добавленных или обновлённых строк сводок.
+        """
+        until = datetime.now(UTC).replace(tzinfo=None) - timedelta(seconds=self._lag)
+        async with self._session_factory() as session:
+            return await aggregate_operations(session, until)
+
+    async def _run_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.run_once()
+            except IntegrityError:
+                # Другой процесс одновременно создал строку отметки.
+                continue
+            except SQLAlchemyError as e:
+                logger.error("Ошибка фоновой агрегации операций: %s", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+stats_aggregator = StatsAggregator(
+    session_factory=db_helper.stream_session_getter,
+    interval=settings.wallet.stats_interval_seconds,
+    lag=settings.wallet.stats_lag_seconds,
+)
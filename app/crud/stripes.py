@@ -0,0 +1,138 @@
+import uuid
+from collections.abc import Iterable
+
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    cast,
+    delete,
+    func,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import logger
+from app.core.cache import balance_cache, currency_cache, stripes_cache
+from app.crud.transaction import run_transaction
+from app.models import Wallet, WalletStripe
+
+
+def stripes_sum(uuid_wallet: uuid.UUID | ColumnElement) -> ColumnElement[int]:
+    """Скалярный подзапрос: сумма полос баланса кошелька (0, если полос нет)."""
+    # sum(bigint) в PostgreSQL возвращает numeric.
+    return (
+        select(cast(func.coalesce(func.sum(WalletStripe.balance), 0), BigInteger))
+        .where(WalletStripe.wallet_id == uuid_wallet)
+        .scalar_subquery()
+    )
+
+
+async def lock_stripes(
+    session: AsyncSession,
+    wallet_ids: Iterable[uuid.UUID],
+) -> dict[uuid.UUID, dict[int, int]]:
+    """Блокирует полосы кошельков (в порядке wallet_id, stripe) и возвращает их балансы."""
+    rows = await session.execute(
+        select(WalletStripe.wallet_id, WalletStripe.stripe, WalletStripe.balance)
+        .where(WalletStripe.wallet_id.in_(list(wallet_ids)))
+        .order_by(WalletStripe.wallet_id, WalletStripe.stripe)
+        .with_for_update(key_share=True)
+    )
+    stripes: dict[uuid.UUID, dict[int, int]] = {}
+    for wallet_id, stripe, balance in rows.tuples():
+        stripes.setdefault(wallet_id, {})[stripe] = balance
+    return stripes
+
+
+async def set_wallet_stripes(
+    session: AsyncSession,
+    uuid_wallet: uuid.UUID,
+    stripes: int,
+) -> tuple[int, str] | None:
+    """Меняет число полос баланса кошелька и распределяет баланс между ними.
+
+    Кошелёк и его полосы блокируются, полный баланс делится поровну между
+    ``stripes`` новыми полосами, остаток от деления остаётся в
+    ``wallets.balance``. При ``stripes=0`` весь баланс возвращается в
+    ``wallets.balance``. Пополнения, направленные в удалённую полосу, уходят в
+    строку кошелька, поэтому смена числа полос не требует остановки записи.
+    Транзакция повторяется при конфликте блокировок (см. ``run_transaction``).
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy.
+        uuid_wallet: UUID кошелька.
+        stripes: Новое число полос.
+
+    Returns:
+        tuple[int, str] | None: Полный баланс кошелька в минимальных единицах
+        и его валюта или None, если кошелёк не найден.
+    """
+
+    async def redistribute() -> tuple[int, str] | None:
+        # FOR NO KEY UPDATE не мешает блокировке KEY SHARE, которую берёт внешний
+        # ключ вставляемой операции при пополнении полосы.
+        wallet = (
+            await session.execute(
+                select(Wallet.balance, Wallet.currency)
+                .where(Wallet.id == uuid_wallet)
+                .with_for_update(key_share=True)
+            )
+        ).one_or_none()
+        if wallet is None:
+            return None
+        balance, currency = wallet
+        locked = await lock_stripes(session, [uuid_wallet])
+        total = balance + sum(locked.get(uuid_wallet, {}).values())
+        share = total // stripes if stripes else 0
+        await session.execute(
+            delete(WalletStripe).where(WalletStripe.wallet_id == uuid_wallet)
+        )
+        if stripes:
+            await session.execute(
+                insert(WalletStripe),
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "wallet_id": uuid_wallet,
+                        "stripe": stripe,
+                        "balance": share,
+                    }
+                    for stripe in range(stripes)
+                ],
+            )
+        await session.execute(
+            update(Wallet)
+            .where(Wallet.id == uuid_wallet)
+            .values(balance=total - share * stripes, stripes=stripes)
+            .execution_options(synchronize_session=False)
+        )
+        return total, currency
+
+    try:
+        wallet = await run_transaction(session, redistribute)
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error(
+            "Ошибка при изменении числа полос кошелька %s: %s",
+            uuid_wallet,
+            e,
+            extra={"wallet_id": uuid_wallet},
+        )
+        raise
+    if wallet is None:
+        return None
+
+    total, currency = wallet
+    stripes_cache.set(uuid_wallet, stripes)
+    currency_cache.set(uuid_wallet, currency)
+    await balance_cache.invalidate(uuid_wallet)
+    logger.info(
+        "Число полос баланса кошелька %s изменено на %s",
+        uuid_wallet,
+        stripes,
+        extra={"wallet_id": uuid_wallet},
+    )
+    return total, currency
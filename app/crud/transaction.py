@@ -0,0 +1,115 @@
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable, Iterable
+
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import logger
+from app.core.config import IsolationLevel, settings
+from app.core.metrics import metrics_registry, request_stats
+from app.models import OperationType
+
+# Ошибка сериализации, взаимная блокировка, не удалось получить блокировку.
+RETRYABLE_SQLSTATES = frozenset({"40001", "40P01", "55P03"})
+
+ISOLATION_ORDER: tuple[IsolationLevel, ...] = (
+    "READ COMMITTED",
+    "REPEATABLE READ",
+    "SERIALIZABLE",
+)
+
+
+def retryable_sqlstate(error: BaseException) -> str | None:
+    """Возвращает код SQLSTATE, если транзакцию с такой ошибкой можно повторить."""
+    if not isinstance(error, DBAPIError) or error.connection_invalidated:
+        return None
+    orig = error.orig
+    sqlstate = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    return sqlstate if sqlstate in RETRYABLE_SQLSTATES else None
+
+
+def isolation_level(
+    operation_types: Iterable[OperationType],
+) -> IsolationLevel | None:
+    """Самый строгий из настроенных уровней изоляции для типов операций."""
+    config = settings.transaction
+    levels = {
+        OperationType.DEPOSIT: config.deposit_isolation,
+        OperationType.WITHDRAW: config.withdraw_isolation,
+        OperationType.TRANSFER_OUT: config.withdraw_isolation,
+        OperationType.TRANSFER_IN: config.deposit_isolation,
+    }
+    configured = {levels[operation_type] for operation_type in operation_types}
+    configured.discard(None)
+    return max(configured, key=ISOLATION_ORDER.index, default=None)
+
+
+async def run_transaction[T](
+    session: AsyncSession,
+    work: Callable[[], Awaitable[T]],
+    isolation: IsolationLevel | None = None,
+) -> T:
+    """Выполняет ``work`` в транзакции и повторяет её при конфликте блокировок.
+
+    Повторяются только транзакции, завершившиеся ошибкой сериализации,
+    взаимной блокировкой или ошибкой ожидания блокировки: такая транзакция
+    откатана целиком, и её повтор безопасен. Задержка перед повтором растёт
+    экспоненциально со случайным разбросом. Повторы прекращаются после
+    ``transaction.max_attempts`` попыток или если следующая не успевает до
+    конца бюджета времени запроса ``transaction.deadline_ms``.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy без открытой транзакции.
+        work: Корутина-функция, выполняющая запросы транзакции через ``session``.
+        isolation: Уровень изоляции транзакции (None - по умолчанию).
+
+    Returns:
+        T: Результат ``work``.
+
+    Raises:
+        DBAPIError: Если ошибка не допускает повтора или повторы исчерпаны.
+    """
+    config = settings.transaction
+    stats = request_stats.get()
+    started = stats.started if stats is not None else time.perf_counter()
+    deadline = started + config.deadline_ms / 1000
+    attempt = 1
+    while True:
+        try:
+            async with session.begin():
+                if isolation is not None:
+                    await session.connection(
+                        execution_options={"isolation_level": isolation}
+                    )
+                return await work()
+        except DBAPIError as e:
+            sqlstate = retryable_sqlstate(e)
+            if sqlstate is None:
+                raise
+            delay = random.uniform(
+                0, min(config.max_delay_ms, config.base_delay_ms * 2 ** (attempt - 1))
+            )
+            if (
+                attempt >= config.max_attempts
+                or time.perf_counter() + delay / 1000 > deadline
+            ):
+                metrics_registry.retry(sqlstate, exhausted=True)
+                logger.warning(
+                    "Транзакция не выполнена после %s попыток: %s",
+                    attempt,
+                    sqlstate,
+                    extra={"sqlstate": sqlstate},
+                )
+                raise
+            metrics_registry.retry(sqlstate)
+            logger.info(
+                "Повтор транзакции после %s, попытка %s через %.1f мс",
+                sqlstate,
+                attempt + 1,
+                delay,
+                extra={"sqlstate": sqlstate},
+            )
+            attempt += 1
+            await asyncio.sleep(delay / 1000)
@@ -1,18 +1,65 @@
+import random
 import uuid
+from collections import Counter
+from collections.abc import Sequence
+from functools import partial
 
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import (
+    Column,
+    MetaData,
+    String,
+    Table,
+    case,
+    false,
+    func,
+    insert,
+    literal,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import CreateTable
 
-from app.api_v1.wallet.schemas import OperationCreate, OperationResponse
+from app.api_v1.transfer.schemas import TransferCreate, TransferResponse
+from app.api_v1.wallet.schemas import OperationCreate, OperationResponse, WalletEvent
 from app.core import logger
-from app.models import Operation, OperationType, Wallet
+from app.core.cache import (
+    balance_cache,
+    currency_cache,
+    email_cache,
+    idempotency_cache,
+    stripes_cache,
+)
+from app.core.config import settings
+from app.core.events import event_broker
+from app.core.money import to_minor
+from app.crud.ledger import ledger_compactor, pending_sum, pending_sums
+from app.crud.operation import (
+    get_operation_by_idempotency_key,
+    save_idempotency_key,
+)
+from app.crud.stripes import lock_stripes, stripes_sum
+from app.crud.transaction import isolation_level, run_transaction
+from app.models import Operation, OperationType, Wallet, WalletStripe
+
+wallet_import = Table(
+    "wallet_import",
+    MetaData(),
+    Column("email", String, nullable=False),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
 
 
 async def get_wallet_by_id(
     session: AsyncSession,
     uuid_wallet: uuid.UUID,
+    for_update: bool = False,
 ) -> Wallet | None:
     """
     Получает кошелёк по его уникальному идентификатору (UUID).
@@ -20,28 +67,54 @@ async def get_wallet_by_id(
     Args:
         session (AsyncSession): Асинхронная сессия SQLAlchemy.
         uuid_wallet (uuid.UUID): UUID кошелька для поиска.
+        for_update (bool): Заблокировать строку кошелька (SELECT ... FOR UPDATE).
+            Заблокированная строка перечитывается поверх объекта из сессии.
 
     Returns:
         Wallet | None: Найденный кошелёк или None, если не найден.
     """
     try:
         stmt = select(Wallet).where(Wallet.id == uuid_wallet)
+        if for_update:
+            stmt = stmt.with_for_update().execution_options(populate_existing=True)
         wallet = await session.scalar(stmt)
         if not wallet:
-            logger.debug(f"Кошелёк с ID {uuid_wallet} не найден")
+            logger.debug(
+                "Кошелёк с ID %s не найден",
+                uuid_wallet,
+                extra={"wallet_id": uuid_wallet},
+            )
             return None
         return wallet
     except SQLAlchemyError as e:
-        logger.error(f"Ошибка при получении кошелька с ID {uuid_wallet}: {e}")
+        logger.error(
+            "Ошибка при получении кошелька с ID %s: %s",
+            uuid_wallet,
+            e,
+            extra={"wallet_id": uuid_wallet},
+        )
         return None
 
 
+def normalize_email(email: str) -> str:
+    """Приводит email к виду, в котором он хранится в ``wallets.email``.
+
+    Email сравниваются без учёта регистра: ``A@x.com`` и ``a@x.com`` - один
+    кошелёк. Уникальный индекс ``ux_wallets_email_lower`` построен по
+    ``lower(email)``.
+    """
+    return email.strip().lower()
+
+
 async def get_wallet_by_email(
     session: AsyncSession,
     email: str,
 ) -> Wallet | None:
     """
-    Получает кошелёк по email.
+    Получает кошелёк по email без учёта регистра.
+
+    Запрос выполняется в текущей транзакции сессии по индексу
+    ``ux_wallets_email_lower``.
 
     Args:
         session (AsyncSession): Асинхронная сессия SQLAlchemy.
@@ -49,112 +122,1233 @@ async def get_wallet_by_email(
 
     Returns:
         Wallet | None: Найденный кошелёк или None, если не найден.
+
+    Raises:
+        SQLAlchemyError: Если произошла ошибка базы данных (чтобы она не
+            была принята за отсутствие кошелька).
     """
+    email = normalize_email(email)
     try:
-        async with session.begin():
-            stmt = select(Wallet).where(Wallet.email == email)
-            wallet = await session.scalar(stmt)
-            if not wallet:
-                logger.debug(f"Кошелёк с email {email} не найден")
-            return wallet
+        wallet = await session.scalar(
+            select(Wallet).where(func.lower(Wallet.email) == email)
+        )
     except SQLAlchemyError as e:
-        logger.error(f"Ошибка при получении кошелька с email {email}: {e}")
-        return None
+        logger.error("Ошибка при получении кошелька с email %s: %s", email, e)
+        raise
+    if wallet is None:
+        logger.debug("Кошелёк с email %s не найден", email)
+    return wallet
 
 
 async def create_wallet_by_email(
     session: AsyncSession,
     email: str,
+    currency: str | None = None,
 ) -> Wallet | None:
     """
     Создаёт новый кошелёк с указанным email, если такой email ещё не используется.
 
+    Email сохраняется в нормализованном виде (см. ``normalize_email``).
+
     Args:
         session (AsyncSession): Асинхронная сессия SQLAlchemy.
         email (str): Email, связанный с кошельком.
+        currency (str | None): Валюта кошелька (None - ``wallet.default_currency``).
 
     Returns:
         Wallet | None: Созданный кошелёк или None, если создание не удалось.
     """
+    email = normalize_email(email)
     try:
         async with session.begin():
-            wallet = Wallet(email=email)
+            wallet = Wallet(
+                email=email,
+                currency=currency or settings.wallet.default_currency,
+            )
             session.add(wallet)
             await session.commit()
-            logger.debug(f"Кошелёк с email {email} успешно создан")
-            return wallet
+            logger.debug(
+                "Кошелёк с email %s успешно создан",
+                email,
+                extra={"wallet_id": wallet.id},
+            )
+        currency_cache.set(wallet.id, wallet.currency)
+        email_cache.delete(email)
+        await _balances_changed({wallet.id: wallet.balance})
+        return wallet
     except IntegrityError:
         await session.rollback()
-        logger.debug(f"Кошелёк с email {email} уже существует")
+        logger.debug("Кошелёк с email %s уже существует", email)
         return None
     except SQLAlchemyError:
         await session.rollback()
         raise
 
 
+async def _copy_wallets_postgresql(
+    session: AsyncSession,
+    emails: list[str],
+    currency: str,
+) -> list[tuple[uuid.UUID, str]]:
+    await session.execute(CreateTable(wallet_import))
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        wallet_import.name,
+        records=[(email,) for email in emails],
+        columns=["email"],
+    )
+    stmt = (
+        pg_insert(Wallet)
+        .from_select(
+            ["id", "email", "currency"],
+            select(
+                func.gen_random_uuid(),
+                wallet_import.c.email,
+                literal(currency, Wallet.currency.type),
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=[func.lower(Wallet.email)])
+        .returning(Wallet.id, Wallet.email)
+    )
+    return list((await session.execute(stmt)).tuples())
+
+
+async def _insert_wallets_chunked(
+    session: AsyncSession,
+    emails: list[str],
+    currency: str,
+    chunk_size: int = 1000,
+) -> list[tuple[uuid.UUID, str]]:
+    created = []
+    for start in range(0, len(emails), chunk_size):
+        stmt = (
+            sqlite_insert(Wallet)
+            .values(
+                [
+                    {"id": uuid.uuid4(), "email": email, "currency": currency}
+                    for email in emails[start : start + chunk_size]
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[func.lower(Wallet.email)])
+            .returning(Wallet.id, Wallet.email)
+        )
+        created.extend((await session.execute(stmt)).tuples())
+    return created
+
+
+async def create_wallets_bulk(
+    session: AsyncSession,
+    emails: Sequence[str],
+    currency: str | None = None,
+) -> tuple[list[tuple[uuid.UUID, str]], list[str]]:
+    """Создаёт кошельки для набора email одной транзакцией, пропуская уже занятые.
+
+    В PostgreSQL email загружаются через COPY во временную таблицу, откуда
+    переносятся одним ``INSERT ... ON CONFLICT (lower(email)) DO NOTHING
+    RETURNING``.
+    В остальных СУБД используются многострочные INSERT частями. Дубликаты не
+    приводят к откату: они просто не попадают в RETURNING.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy.
+        emails: Email для новых кошельков.
+        currency: Валюта кошельков (None - ``wallet.default_currency``).
+
+    Returns:
+        tuple[list[tuple[uuid.UUID, str]], list[str]]: Созданные кошельки
+        (id, email) и email, которые уже использовались (все email - в
+        нормализованном виде).
+    """
+    unique_emails = list(dict.fromkeys(map(normalize_email, emails)))
+    currency = currency or settings.wallet.default_currency
+    try:
+        async with session.begin():
+            if _is_postgresql(session):
+                created = await _copy_wallets_postgresql(
+                    session, unique_emails, currency
+                )
+            else:
+                created = await _insert_wallets_chunked(
+                    session, unique_emails, currency
+                )
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error("Ошибка при массовом создании кошельков: %s", e)
+        raise
+
+    created_emails = {email for _, email in created}
+    for email in created_emails:
+        email_cache.delete(email)
+    duplicates = [email for email in unique_emails if email not in created_emails]
+    logger.info(
+        "Массовое создание кошельков: создано %s, дубликатов %s",
+        len(created),
+        len(duplicates),
+    )
+    return created, duplicates
+
+
+async def _balances_changed(balances: dict[uuid.UUID, int | None]) -> None:
+    """Обновляет кэш балансов после коммита (write-through).
+
+    В режиме ledger итоговый баланс после записи неизвестен (параллельные
+    пополнения не блокируют кошелёк), поэтому записи кэша удаляются.
+    """
+    for uuid_wallet, balance in balances.items():
+        if balance is None or settings.wallet.operation_mode == "ledger":
+            await balance_cache.invalidate(uuid_wallet)
+        else:
+            await balance_cache.set(uuid_wallet, balance)
+
+
+def _publish_operations(
+    responses: Sequence[OperationResponse],
+    balances: dict[uuid.UUID, int | None],
+) -> None:
+    """Публикует события выполненных операций после коммита.
+
+    ``balances`` - итоговые балансы кошельков; баланс после каждой операции
+    восстанавливается от итогового в обратном порядке операций. В режиме
+    ledger итоговый баланс неизвестен, и события передаются без него.
+    """
+    ledger = settings.wallet.operation_mode == "ledger"
+    balances = {} if ledger else dict(balances)
+    events = []
+    for response in reversed(responses):
+        balance = balances.get(response.wallet_id)
+        if balance is not None:
+            balances[response.wallet_id] = (
+                balance + response.amount
+                if response.operation_type.is_debit
+                else balance - response.amount
+            )
+        events.append(
+            WalletEvent(
+                event="operation",
+                wallet_id=response.wallet_id,
+                currency=response.currency,
+                balance=balance,
+                operation=response,
+            )
+        )
+    for event in reversed(events):
+        event_broker.publish(event.wallet_id, event.model_dump_json())
+
+
+async def get_wallet_balance(
+    session: AsyncSession,
+    uuid_wallet: uuid.UUID,
+) -> tuple[int, str] | None:
+    """Возвращает полный баланс кошелька и его валюту.
+
+    Баланс - ``wallets.balance`` плюс сумма полос баланса, в режиме ledger -
+    ещё и сумма не компактизированных операций.
+
+    Returns:
+        tuple[int, str] | None: Баланс в минимальных единицах и валюта или
+        None, если кошелёк не найден.
+    """
+    balance = Wallet.balance + stripes_sum(Wallet.id)
+    if settings.wallet.operation_mode == "ledger":
+        balance += pending_sum(Wallet.id)
+    stmt = select(balance, Wallet.currency).where(Wallet.id == uuid_wallet)
+    try:
+        row = (await session.execute(stmt)).one_or_none()
+    except SQLAlchemyError as e:
+        logger.error(
+            "Ошибка при получении баланса кошелька %s: %s",
+            uuid_wallet,
+            e,
+            extra={"wallet_id": uuid_wallet},
+        )
+        raise
+    if row is None:
+        return None
+    balance, currency = row
+    currency_cache.set(uuid_wallet, currency)
+    return int(balance), currency
+
+
+def _wallet_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Кошелёк не найден",
+    )
+
+
+def _insufficient_funds() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail="Недостаточно средств",
+    )
+
+
+def _currency_mismatch() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail="Валюты кошельков не совпадают",
+    )
+
+
+def _is_postgresql(session: AsyncSession) -> bool:
+    return session.bind.dialect.name == "postgresql"
+
+
+async def _wallet_currency(session: AsyncSession, uuid_wallet: uuid.UUID) -> str:
+    """Валюта кошелька: из ``currency_cache`` или запросом по первичному ключу.
+
+    Raises:
+        HTTPException:
+            - 404: Если кошелёк не найден.
+    """
+    currency = currency_cache.get(uuid_wallet)
+    if currency is None:
+        currency = await session.scalar(
+            select(Wallet.currency).where(Wallet.id == uuid_wallet)
+        )
+        if currency is None:
+            logger.debug(
+                "Кошелёк с ID %s не найден",
+                uuid_wallet,
+                extra={"wallet_id": uuid_wallet},
+            )
+            raise _wallet_not_found()
+        currency_cache.set(uuid_wallet, currency)
+    return currency
+
+
+def _minor_amount(operation: OperationCreate | TransferCreate, currency: str) -> int:
+    """Сумма операции или перевода в минимальных единицах валюты кошелька.
+
+    Raises:
+        HTTPException:
+            - 422: Если сумма точнее минимальной единицы валюты.
+    """
+    try:
+        return to_minor(operation.amount, currency)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        ) from e
+
+
+async def _apply_operation_orm(
+    session: AsyncSession,
+    uuid_wallet: uuid.UUID,
+    operation: OperationCreate,
+    idempotency_key: str | None = None,
+) -> tuple[OperationResponse, int | None]:
+    """Применяет операцию через ORM: блокирует строку кошелька и меняет баланс в Python.
+
+    Операции над кошельком с полосами баланса передаются в
+    ``_apply_operation_striped``. Вызывается внутри открытой транзакции.
+
+    Returns:
+        tuple[OperationResponse, int | None]: Созданная операция и новый баланс.
+    """
+    wallet = await get_wallet_by_id(session, uuid_wallet, for_update=True)
+    if not wallet:
+        logger.debug(
+            "Кошелёк с ID %s не найден", uuid_wallet, extra={"wallet_id": uuid_wallet}
+        )
+        raise _wallet_not_found()
+    currency_cache.set(uuid_wallet, wallet.currency)
+    if wallet.stripes:
+        stripes_cache.set(uuid_wallet, wallet.stripes)
+        return await _apply_operation_striped(
+            session, uuid_wallet, operation, idempotency_key, wallet.stripes
+        )
+
+    amount = _minor_amount(operation, wallet.currency)
+    if operation.operation_type == OperationType.WITHDRAW:
+        if wallet.balance < amount:
+            logger.warning(
+                "Недостаточно средств для снятия %s с кошелька %s",
+                operation.amount,
+                uuid_wallet,
+                extra={"wallet_id": uuid_wallet},
+            )
+            raise _insufficient_funds()
+        wallet.balance -= amount
+    elif operation.operation_type == OperationType.DEPOSIT:
+        wallet.balance += amount
+
+    new_operation = Operation(
+        wallet_id=wallet.id,
+        operation_type=operation.operation_type,
+        amount=amount,
+        idempotency_key=idempotency_key,
+    )
+    session.add(new_operation)
+    await session.flush()
+    response = OperationResponse(
+        id=new_operation.id,
+        wallet_id=new_operation.wallet_id,
+        operation_type=new_operation.operation_type,
+        amount=new_operation.amount,
+        created_at=new_operation.created_at,
+        currency=wallet.currency,
+    )
+    return response, wallet.balance
+
+
+async def _apply_operation_single_statement(
+    session: AsyncSession,
+    uuid_wallet: uuid.UUID,
+    operation: OperationCreate,
+    idempotency_key: str | None = None,
+) -> tuple[OperationResponse, int | None]:
+    """Применяет операцию условным UPDATE ... RETURNING без предварительного SELECT.
+
+    Для снятия условие ``balance >= amount`` проверяется в самом UPDATE, поэтому
+    блокировка строки держится только на время одного запроса. В PostgreSQL
+    обновление баланса и вставка операции выполняются одним запросом через CTE,
+    в остальных СУБД - двумя запросами в одной транзакции. Кошельки с полосами
+    баланса обрабатывает ``_apply_operation_striped``. Валюта кошелька,
+    нужная для перевода суммы в минимальные единицы, берётся из
+    ``currency_cache``, при промахе - отдельным запросом.
+
+    Вызывается внутри открытой транзакции.
+
+    Returns:
+        tuple[OperationResponse, int | None]: Созданная операция и новый баланс.
+
+    Raises:
+        HTTPException:
+            - 404: Если кошелёк не найден.
+            - 422: Если недостаточно средств для снятия или сумма точнее
+              минимальной единицы валюты.
+    """
+    currency = await _wallet_currency(session, uuid_wallet)
+    amount = _minor_amount(operation, currency)
+    is_withdraw = operation.operation_type == OperationType.WITHDRAW
+    delta = -amount if is_withdraw else amount
+    wallets = Wallet.__table__
+    operations = Operation.__table__
+
+    conditions = [wallets.c.id == uuid_wallet, wallets.c.stripes == 0]
+    if is_withdraw:
+        conditions.append(wallets.c.balance >= amount)
+
+    if _is_postgresql(session):
+        updated = (
+            update(wallets)
+            .where(*conditions)
+            .values(balance=wallets.c.balance + delta)
+            .returning(wallets.c.id, wallets.c.balance)
+            .cte("updated_wallet")
+        )
+        inserted = (
+            insert(operations)
+            .from_select(
+                ["id", "wallet_id", "operation_type", "amount", "idempotency_key"],
+                select(
+                    literal(uuid.uuid4(), operations.c.id.type),
+                    updated.c.id,
+                    literal(operation.operation_type, operations.c.operation_type.type),
+                    literal(amount, operations.c.amount.type),
+                    literal(idempotency_key, operations.c.idempotency_key.type),
+                ),
+            )
+            .returning(
+                operations.c.id,
+                operations.c.wallet_id,
+                operations.c.operation_type,
+                operations.c.amount,
+                operations.c.created_at,
+            )
+            .cte("inserted_operation")
+        )
+        stmt = select(inserted, updated.c.balance).select_from(
+            inserted.join(updated, true())
+        )
+        row = (await session.execute(stmt)).one_or_none()
+    else:
+        balance = await session.scalar(
+            update(Wallet)
+            .where(*conditions)
+            .values(balance=Wallet.balance + delta)
+            .returning(Wallet.balance)
+        )
+        row = None
+        if balance is not None:
+            inserted = (
+                await session.execute(
+                    insert(Operation)
+                    .values(
+                        id=uuid.uuid4(),
+                        wallet_id=uuid_wallet,
+                        operation_type=operation.operation_type,
+                        amount=amount,
+                        idempotency_key=idempotency_key,
+                    )
+                    .returning(
+                        Operation.id,
+                        Operation.wallet_id,
+                        Operation.operation_type,
+                        Operation.amount,
+                        Operation.created_at,
+                    )
+                )
+            ).one()
+            row = (*inserted, balance)
+
+    if row is None:
+        # Ни одна строка не обновлена: кошелька нет, он разбит на полосы баланса
+        # или не хватило средств. Различать эти случаи нужно только на этом пути.
+        stripes = await session.scalar(
+            select(Wallet.stripes).where(Wallet.id == uuid_wallet)
+        )
+        if stripes:
+            stripes_cache.set(uuid_wallet, stripes)
+            return await _apply_operation_striped(
+                session, uuid_wallet, operation, idempotency_key, stripes
+            )
+        if is_withdraw and stripes is not None:
+            logger.warning(
+                "Недостаточно средств для снятия %s с кошелька %s",
+                operation.amount,
+                uuid_wallet,
+                extra={"wallet_id": uuid_wallet},
+            )
+            raise _insufficient_funds()
+        logger.debug(
+            "Кошелёк с ID %s не найден", uuid_wallet, extra={"wallet_id": uuid_wallet}
+        )
+        raise _wallet_not_found()
+
+    operation_id, wallet_id, operation_type, amount, created_at, balance = row
+    return (
+        OperationResponse(
+            id=operation_id,
+            wallet_id=wallet_id,
+            operation_type=operation_type,
+            amount=amount,
+            created_at=created_at,
+            currency=currency,
+        ),
+        balance,
+    )
+
+
+async def _insert_operation(
+    session: AsyncSession,
+    uuid_wallet: uuid.UUID,
+    operation_type: OperationType,
+    amount: int,
+    currency: str,
+    idempotency_key: str | None = None,
+) -> OperationResponse:
+    row = (
+        await session.execute(
+            insert(Operation)
+            .values(
+                id=uuid.uuid4(),
+                wallet_id=uuid_wallet,
+                operation_type=operation_type,
+                amount=amount,
+                idempotency_key=idempotency_key,
+            )
+            .returning(
+                Operation.id,
+                Operation.wallet_id,
+                Operation.operation_type,
+                Operation.amount,
+                Operation.created_at,
+            )
+        )
+    ).one()
+    return OperationResponse(**row._asdict(), currency=currency)
+
+
+async def _apply_operation_striped(
+    session: AsyncSession,
+    uuid_wallet: uuid.UUID,
+    operation: OperationCreate,
+    idempotency_key: str | None = None,
+    stripes: int = 0,
+) -> tuple[OperationResponse, int | None]:
+    """Применяет операцию к кошельку с полосами баланса.
+
+    Пополнение увеличивает одну случайную из ``stripes`` полос, блокируя только
+    её строку; если полосы уже нет (число полос изменилось), сумма зачисляется
+    в ``wallets.balance``. Снятие блокирует кошелёк и все его полосы, проверяет
+    полный баланс и списывает сначала с ``wallets.balance``, затем с самых
+    больших полос.
+
+    Вызывается внутри открытой транзакции.
+
+    Returns:
+        tuple[OperationResponse, int | None]: Созданная операция и новый
+        баланс (для пополнения None: другие полосы не читаются).
+
+    Raises:
+        HTTPException:
+            - 404: Если кошелёк не найден.
+            - 422: Если недостаточно средств для снятия или сумма точнее
+              минимальной единицы валюты.
+    """
+    currency = await _wallet_currency(session, uuid_wallet)
+    amount = _minor_amount(operation, currency)
+    wallets = Wallet.__table__
+    wallet_stripes = WalletStripe.__table__
+    balance = None
+    if operation.operation_type == OperationType.DEPOSIT:
+        updated = None
+        if stripes:
+            updated = await session.scalar(
+                update(wallet_stripes)
+                .where(
+                    wallet_stripes.c.wallet_id == uuid_wallet,
+                    wallet_stripes.c.stripe == random.randrange(stripes),
+                )
+                .values(balance=wallet_stripes.c.balance + amount)
+                .returning(wallet_stripes.c.wallet_id)
+            )
+        if updated is None:
+            updated = await session.scalar(
+                update(wallets)
+                .where(wallets.c.id == uuid_wallet)
+                .values(balance=wallets.c.balance + amount)
+                .returning(wallets.c.id)
+            )
+        if updated is None:
+            logger.debug(
+                "Кошелёк с ID %s не найден",
+                uuid_wallet,
+                extra={"wallet_id": uuid_wallet},
+            )
+            raise _wallet_not_found()
+    else:
+        main_balance = await session.scalar(
+            select(Wallet.balance)
+            .where(Wallet.id == uuid_wallet)
+            .with_for_update(key_share=True)
+        )
+        if main_balance is None:
+            logger.debug(
+                "Кошелёк с ID %s не найден",
+                uuid_wallet,
+                extra={"wallet_id": uuid_wallet},
+            )
+            raise _wallet_not_found()
+        locked = (await lock_stripes(session, [uuid_wallet])).get(uuid_wallet, {})
+        total = main_balance + sum(locked.values())
+        if total < amount:
+            logger.warning(
+                "Недостаточно средств для снятия %s с кошелька %s",
+                operation.amount,
+                uuid_wallet,
+                extra={"wallet_id": uuid_wallet},
+            )
+            raise _insufficient_funds()
+
+        remaining = amount
+        taken = min(main_balance, remaining)
+        remaining -= taken
+        if taken:
+            await session.execute(
+                update(wallets)
+                .where(wallets.c.id == uuid_wallet)
+                .values(balance=wallets.c.balance - taken)
+            )
+        changed: dict[int, int] = {}
+        for stripe, stripe_balance in sorted(
+            locked.items(), key=lambda item: item[1], reverse=True
+        ):
+            if not remaining:
+                break
+            taken = min(stripe_balance, remaining)
+            remaining -= taken
+            changed[stripe] = stripe_balance - taken
+        if changed:
+            await session.execute(
+                update(wallet_stripes)
+                .where(
+                    wallet_stripes.c.wallet_id == uuid_wallet,
+                    wallet_stripes.c.stripe.in_(changed),
+                )
+                .values(balance=case(changed, value=wallet_stripes.c.stripe))
+            )
+        balance = total - amount
+
+    response = await _insert_operation(
+        session,
+        uuid_wallet,
+        operation.operation_type,
+        amount,
+        currency,
+        idempotency_key,
+    )
+    return response, balance
+
+
+async def _apply_operation_ledger(
+    session: AsyncSession,
+    uuid_wallet: uuid.UUID,
+    operation: OperationCreate,
+    idempotency_key: str | None = None,
+) -> tuple[OperationResponse, int | None]:
+    """Добавляет операцию в журнал, не меняя ``wallets.balance``.
+
+    Пополнение - один INSERT ... SELECT без блокировки кошелька. Снятие
+    блокирует строку кошелька (снятия и компактизация одного кошелька
+    выполняются по очереди, пополнения - нет) и после этого проверяет баланс:
+    снимок плюс не более ``ledger_compact_every`` новых операций.
+
+    Вызывается внутри открытой транзакции.
+
+    Returns:
+        tuple[OperationResponse, int | None]: Созданная операция и баланс
+        после снятия (для пополнения None: параллельные пополнения не видны).
+
+    Raises:
+        HTTPException:
+            - 404: Если кошелёк не найден.
+            - 422: Если недостаточно средств для снятия или сумма точнее
+              минимальной единицы валюты.
+    """
+    currency = await _wallet_currency(session, uuid_wallet)
+    amount = _minor_amount(operation, currency)
+    balance = None
+    if operation.operation_type == OperationType.WITHDRAW:
+        # Сначала блокировка, затем суммы отдельным запросом: в READ COMMITTED
+        # подзапросы того же запроса видят снимок, снятый до ожидания
+        # блокировки, и не учли бы снятие, которое её удерживало.
+        locked = await session.scalar(
+            select(Wallet.id)
+            .where(Wallet.id == uuid_wallet)
+            .with_for_update(key_share=True)
+        )
+        if locked is not None:
+            balance = await session.scalar(
+                select(
+                    Wallet.balance + pending_sum(Wallet.id) + stripes_sum(Wallet.id)
+                ).where(Wallet.id == uuid_wallet)
+            )
+        if balance is None:
+            logger.debug(
+                "Кошелёк с ID %s не найден",
+                uuid_wallet,
+                extra={"wallet_id": uuid_wallet},
+            )
+            raise _wallet_not_found()
+        if balance < amount:
+            logger.warning(
+                "Недостаточно средств для снятия %s с кошелька %s",
+                operation.amount,
+                uuid_wallet,
+                extra={"wallet_id": uuid_wallet},
+            )
+            raise _insufficient_funds()
+        balance -= amount
+
+    operations = Operation.__table__
+    row = (
+        await session.execute(
+            insert(operations)
+            .from_select(
+                [
+                    "id",
+                    "wallet_id",
+                    "operation_type",
+                    "amount",
+                    "idempotency_key",
+                    "compacted",
+                ],
+                select(
+                    literal(uuid.uuid4(), operations.c.id.type),
+                    Wallet.id,
+                    literal(operation.operation_type, operations.c.operation_type.type),
+                    literal(amount, operations.c.amount.type),
+                    literal(idempotency_key, operations.c.idempotency_key.type),
+                    false(),
+                ).where(Wallet.id == uuid_wallet),
+            )
+            .returning(
+                operations.c.id,
+                operations.c.wallet_id,
+                operations.c.operation_type,
+                operations.c.amount,
+                operations.c.created_at,
+            )
+        )
+    ).one_or_none()
+    if row is None:
+        logger.debug(
+            "Кошелёк с ID %s не найден", uuid_wallet, extra={"wallet_id": uuid_wallet}
+        )
+        raise _wallet_not_found()
+    return OperationResponse(**row._asdict(), currency=currency), balance
+
+
+def _check_replay(
+    replay: OperationResponse,
+    operation: OperationCreate,
+) -> OperationResponse:
+    """Проверяет, что повтор по ключу идемпотентности совпадает с исходной операцией."""
+    try:
+        amount = to_minor(operation.amount, replay.currency)
+    except ValueError:
+        amount = None
+    if (replay.operation_type, replay.amount) != (operation.operation_type, amount):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ключ идемпотентности уже использован для другой операции",
+        )
+    return replay
+
+
 async def update_wallet_balance(
     session: AsyncSession,
     uuid_wallet: uuid.UUID,
     operation: OperationCreate,
-):
+    idempotency_key: str | None = None,
+) -> OperationResponse:
     """Обновляет баланс кошелька и записывает операцию.
 
+    Способ применения операции задаётся настройкой ``wallet.operation_mode``.
+    Если передан ``idempotency_key`` и операция с ним уже выполнена, она
+    возвращается без повторного применения и без блокировки кошелька.
+    Одновременные запросы с одним ключом разрешает уникальный индекс.
+    Транзакция повторяется при конфликте блокировок (см. ``run_transaction``).
+
     Args:
         session: Асинхронная сессия SQLAlchemy.
         uuid_wallet: UUID кошелька.
         operation: Данные операции (тип и сумма).
+        idempotency_key: Значение заголовка Idempotency-Key.
 
     Returns:
-        OperationResponse: Данные созданной операции.
+        OperationResponse: Данные созданной (или ранее выполненной) операции.
 
     Raises:
         HTTPException:
             - 404: Если кошелёк не найден.
-            - 422: Если недостаточно средств для снятия.
+            - 409: Если ключ уже использован для операции с другими параметрами.
+            - 422: Если недостаточно средств для снятия или сумма точнее
+              минимальной единицы валюты.
     """
+    if settings.wallet.operation_mode == "single_statement":
+        apply_operation = _apply_operation_single_statement
+    elif settings.wallet.operation_mode == "ledger":
+        apply_operation = _apply_operation_ledger
+    else:
+        apply_operation = _apply_operation_orm
+    stripes = stripes_cache.get(uuid_wallet)
+    if stripes and settings.wallet.operation_mode != "ledger":
+        apply_operation = partial(_apply_operation_striped, stripes=stripes)
     try:
-        async with session.begin():
-            wallet = await get_wallet_by_id(session, uuid_wallet)
-            if not wallet:
-                logger.debug(f"Кошелёк с ID {uuid_wallet} не найден")
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Кошелёк не найден",
+        if idempotency_key is not None:
+            replay = await get_operation_by_idempotency_key(
+                session, uuid_wallet, idempotency_key
+            )
+            await session.rollback()
+            if replay is not None:
+                logger.info(
+                    "Повтор операции %s по ключу идемпотентности для кошелька %s",
+                    replay.id,
+                    uuid_wallet,
+                    extra={"wallet_id": uuid_wallet, "operation_id": replay.id},
                 )
+                return _check_replay(replay, operation)
 
-            if operation.operation_type == OperationType.WITHDRAW:
-                if wallet.balance < operation.amount:
-                    logger.warning(
-                        f"Недостаточно средств для снятия {operation.amount} с кошелька {uuid_wallet}"
-                    )
-                    raise HTTPException(
-                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                        detail="Недостаточно средств",
-                    )
-                wallet.balance -= operation.amount
-            elif operation.operation_type == OperationType.DEPOSIT:
-                wallet.balance += operation.amount
+        async def apply() -> tuple[OperationResponse, int | None]:
+            response, balance = await apply_operation(
+                session, uuid_wallet, operation, idempotency_key
+            )
+            if idempotency_key is not None:
+                await save_idempotency_key(session, response, idempotency_key)
+            return response, balance
 
-            new_operation = Operation(
-                wallet_id=wallet.id,
-                operation_type=operation.operation_type,
-                amount=operation.amount,
+        response, balance = await run_transaction(
+            session, apply, isolation_level([operation.operation_type])
+        )
+        await _balances_changed({uuid_wallet: balance})
+        _publish_operations([response], {uuid_wallet: balance})
+        if settings.wallet.operation_mode == "ledger":
+            ledger_compactor.notify(uuid_wallet)
+        if idempotency_key is not None:
+            idempotency_cache.set((uuid_wallet, idempotency_key), response)
+        logger.info(
+            "Операция %s на сумму %s выполнена для кошелька %s",
+            operation.operation_type,
+            operation.amount,
+            uuid_wallet,
+            extra={"wallet_id": uuid_wallet, "operation_id": response.id},
+        )
+        return response
+    except IntegrityError as e:
+        await session.rollback()
+        replay = None
+        if idempotency_key is not None:
+            # Параллельный запрос-дубликат успел вставить операцию первым.
+            replay = await get_operation_by_idempotency_key(
+                session, uuid_wallet, idempotency_key
+            )
+            await session.rollback()
+        if replay is None:
+            logger.error(
+                "Ошибка при обновлении баланса кошелька %s: %s",
+                uuid_wallet,
+                e,
+                extra={"wallet_id": uuid_wallet},
             )
+            raise
+        return _check_replay(replay, operation)
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error(
+            "Ошибка при обновлении баланса кошелька %s: %s",
+            uuid_wallet,
+            e,
+            extra={"wallet_id": uuid_wallet},
+        )
+        raise
 
-            session.add(new_operation)
-            await session.commit()
-            logger.info(
-                f"Операция {operation.operation_type} на сумму {operation.amount} "
-                f"выполнена для кошелька {uuid_wallet}"
+
+async def _lock_wallets(
+    session: AsyncSession,
+    wallet_ids: set[uuid.UUID],
+    ledger: bool,
+) -> tuple[dict[uuid.UUID, int], dict[uuid.UUID, str], dict[uuid.UUID, dict]]:
+    """Блокирует кошельки и их полосы в порядке возрастания UUID.
+
+    Returns:
+        tuple: Полные балансы найденных кошельков (с полосами, в режиме
+        ledger - и с не учтёнными операциями), их валюты и балансы полос.
+    """
+    locked = await session.execute(
+        select(Wallet.id, Wallet.balance, Wallet.currency)
+        .where(Wallet.id.in_(sorted(wallet_ids)))
+        .order_by(Wallet.id)
+        .with_for_update(key_share=True)
+    )
+    balances = {}
+    currencies = {}
+    for uuid_wallet, balance, currency in locked.tuples():
+        balances[uuid_wallet] = balance
+        currencies[uuid_wallet] = currency
+        currency_cache.set(uuid_wallet, currency)
+    striped = await lock_stripes(session, balances)
+    for uuid_wallet, stripe_balances in striped.items():
+        balances[uuid_wallet] += sum(stripe_balances.values())
+    if ledger:
+        for uuid_wallet, pending in (await pending_sums(session, balances)).items():
+            balances[uuid_wallet] += pending
+    return balances, currencies, striped
+
+
+async def _write_batch(
+    session: AsyncSession,
+    new_operations: list[dict],
+    changed: dict[uuid.UUID, int],
+    striped: dict[uuid.UUID, dict],
+    ledger: bool,
+) -> dict:
+    """Записывает новые балансы одним UPDATE с CASE и операции одним INSERT.
+
+    Returns:
+        dict: Время создания операций по их id.
+    """
+    if not new_operations:
+        return {}
+    if not ledger:
+        wallets = Wallet.__table__
+        await session.execute(
+            update(wallets)
+            .where(wallets.c.id.in_(changed))
+            .values(balance=case(changed, value=wallets.c.id))
+        )
+        # Новый баланс включает полосы: они переносятся в строку кошелька.
+        collapsed = [uuid_wallet for uuid_wallet in changed if uuid_wallet in striped]
+        if collapsed:
+            await session.execute(
+                update(WalletStripe)
+                .where(WalletStripe.wallet_id.in_(collapsed))
+                .values(balance=0)
+                .execution_options(synchronize_session=False)
             )
-            return OperationResponse(
-                id=new_operation.id,
-                wallet_id=new_operation.wallet_id,
-                operation_type=new_operation.operation_type,
-                amount=new_operation.amount,
-                created_at=new_operation.created_at,
+    created = await session.execute(
+        insert(Operation).returning(Operation.id, Operation.created_at),
+        new_operations,
+    )
+    return dict(created.tuples().all())
+
+
+def _reject(error: HTTPException, label: str, index: int, atomic: bool) -> None:
+    """Отклоняет элемент пакета; в атомарном пакете - весь пакет."""
+    if atomic:
+        logger.debug("Пакет отклонён: %s %s, %s", label.lower(), index, error.detail)
+        raise HTTPException(
+            status_code=error.status_code,
+            detail=f"{label} {index}: {error.detail}",
+        )
+
+
+async def _apply_batch(
+    session: AsyncSession,
+    operations: Sequence[tuple[uuid.UUID, OperationCreate]],
+    atomic: bool,
+    ledger: bool,
+) -> tuple[list[dict | HTTPException], list[dict], dict[uuid.UUID, int], dict]:
+    """Применяет пакет операций внутри открытой транзакции (см. ``apply_operations``).
+
+    Returns:
+        tuple: Результаты по операциям, вставленные операции, новые балансы
+        изменённых кошельков и время создания операций по их id.
+    """
+    results: list[dict | HTTPException] = []
+    new_operations: list[dict] = []
+    changed: dict[uuid.UUID, int] = {}
+    balances, currencies, striped = await _lock_wallets(
+        session, {uuid_wallet for uuid_wallet, _ in operations}, ledger
+    )
+
+    for index, (uuid_wallet, operation) in enumerate(operations):
+        balance = balances.get(uuid_wallet)
+        try:
+            if balance is None:
+                raise _wallet_not_found()
+            amount = _minor_amount(operation, currencies[uuid_wallet])
+            if operation.operation_type == OperationType.WITHDRAW:
+                if balance < amount:
+                    raise _insufficient_funds()
+                balance -= amount
+            else:
+                balance += amount
+        except HTTPException as error:
+            _reject(error, "Операция", index, atomic)
+            results.append(error)
+            continue
+
+        balances[uuid_wallet] = changed[uuid_wallet] = balance
+        values = {
+            "id": uuid.uuid4(),
+            "wallet_id": uuid_wallet,
+            "operation_type": operation.operation_type,
+            "amount": amount,
+            "compacted": not ledger,
+        }
+        new_operations.append(values)
+        results.append({**values, "currency": currencies[uuid_wallet]})
+
+    created_at = await _write_batch(session, new_operations, changed, striped, ledger)
+    return results, new_operations, changed, created_at
+
+
+async def apply_operations(
+    session: AsyncSession,
+    operations: Sequence[tuple[uuid.UUID, OperationCreate]],
+    atomic: bool = False,
+) -> list[OperationResponse | HTTPException]:
+    """Применяет набор операций над одним или несколькими кошельками в одной транзакции.
+
+    Строки кошельков блокируются одним запросом в порядке возрастания UUID,
+    поэтому параллельные пакеты не попадают в взаимную блокировку. Операции
+    применяются по порядку, все принятые операции вставляются одним
+    многострочным INSERT, балансы обновляются одним UPDATE с CASE. Полосы
+    баланса изменённых кошельков переносятся в ``wallets.balance``. В режиме
+    ledger баланс проверяется с учётом новых операций журнала, а
+    ``wallets.balance`` не меняется. При конфликте блокировок пакет
+    выполняется заново (см. ``run_transaction``).
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy.
+        operations: Пары (UUID кошелька, операция) в порядке применения.
+        atomic: Если True, любая ошибка откатывает весь пакет; иначе
+            ошибочные операции отклоняются по отдельности.
+
+    Returns:
+        list[OperationResponse | HTTPException]: Результат для каждой операции
+        в том же порядке: созданная операция или ошибка (404, 422).
+
+    Raises:
+        HTTPException:
+            - 404: Если atomic=True и кошелёк одной из операций не найден.
+            - 422: Если atomic=True и для одного из снятий недостаточно средств.
+    """
+    ledger = settings.wallet.operation_mode == "ledger"
+    try:
+        results, new_operations, changed, created_at = await run_transaction(
+            session,
+            partial(_apply_batch, session, operations, atomic, ledger),
+            isolation_level({operation.operation_type for _, operation in operations}),
+        )
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error("Ошибка при выполнении пакета операций: %s", e)
+        raise
+
+    await _balances_changed(changed)
+    if ledger:
+        for uuid_wallet, count in Counter(
+            values["wallet_id"] for values in new_operations
+        ).items():
+            ledger_compactor.notify(uuid_wallet, count)
+    responses = [
+        OperationResponse(**result, created_at=created_at[result["id"]])
+        if isinstance(result, dict)
+        else result
+        for result in results
+    ]
+    _publish_operations(
+        [response for response in responses if isinstance(response, OperationResponse)],
+        changed,
+    )
+    logger.info(
+        "Пакет операций выполнен: принято %s, отклонено %s",
+        len(new_operations),
+        len(operations) - len(new_operations),
+    )
+    return responses
+
+
+async def _apply_transfer_batch(
+    session: AsyncSession,
+    transfers: Sequence[TransferCreate],
+    atomic: bool,
+    ledger: bool,
+) -> tuple[list[tuple | HTTPException], list[dict], dict[uuid.UUID, int], dict]:
+    """Применяет пакет переводов внутри открытой транзакции (см. ``apply_transfers``).
+
+    Returns:
+        tuple: Результаты по переводам (id перевода, операции списания и
+        зачисления, валюта) или ошибки, вставленные операции, новые балансы
+        изменённых кошельков и время создания операций по их id.
+    """
+    results: list[tuple | HTTPException] = []
+    new_operations: list[dict] = []
+    changed: dict[uuid.UUID, int] = {}
+    balances, currencies, striped = await _lock_wallets(
+        session,
+        {
+            uuid_wallet
+            for transfer in transfers
+            for uuid_wallet in (transfer.from_wallet_id, transfer.to_wallet_id)
+        },
+        ledger,
+    )
+
+    for index, transfer in enumerate(transfers):
+        source, target = transfer.from_wallet_id, transfer.to_wallet_id
+        try:
+            if source not in balances or target not in balances:
+                raise _wallet_not_found()
+            currency = currencies[source]
+            if currencies[target] != currency:
+                raise _currency_mismatch()
+            amount = _minor_amount(transfer, currency)
+            if balances[source] < amount:
+                raise _insufficient_funds()
+        except HTTPException as error:
+            _reject(error, "Перевод", index, atomic)
+            results.append(error)
+            continue
+
+        balances[source] = changed[source] = balances[source] - amount
+        balances[target] = changed[target] = balances[target] + amount
+        transfer_id = uuid.uuid4()
+        outgoing, incoming = (
+            {
+                "id": uuid.uuid4(),
+                "wallet_id": uuid_wallet,
+                "operation_type": operation_type,
+                "amount": amount,
+                "compacted": not ledger,
+                "transfer_id": transfer_id,
+            }
+            for uuid_wallet, operation_type in (
+                (source, OperationType.TRANSFER_OUT),
+                (target, OperationType.TRANSFER_IN),
             )
+        )
+        new_operations += [outgoing, incoming]
+        results.append((transfer_id, outgoing, incoming, currency))
+
+    created_at = await _write_batch(session, new_operations, changed, striped, ledger)
+    return results, new_operations, changed, created_at
+
+
+async def apply_transfers(
+    session: AsyncSession,
+    transfers: Sequence[TransferCreate],
+    atomic: bool = False,
+) -> list[TransferResponse | HTTPException]:
+    """Выполняет переводы между кошельками в одной транзакции.
+
+    Перевод - пара операций TRANSFER_OUT и TRANSFER_IN с общим
+    ``transfer_id``. Кошельки отправителей и получателей всех переводов
+    блокируются одним запросом в порядке возрастания UUID, поэтому встречные
+    переводы не попадают во взаимную блокировку. Переводы применяются по
+    порядку, операции вставляются одним многострочным INSERT, балансы
+    обновляются одним UPDATE с CASE (как в ``apply_operations``). Перевод
+    возможен только между кошельками в одной валюте.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy.
+        transfers: Переводы в порядке применения.
+        atomic: Если True, любая ошибка откатывает весь пакет; иначе
+            ошибочные переводы отклоняются по отдельности.
+
+    Returns:
+        list[TransferResponse | HTTPException]: Результат для каждого перевода
+        в том же порядке: выполненный перевод или ошибка (404, 422).
+
+    Raises:
+        HTTPException:
+            - 404: Если atomic=True и один из кошельков не найден.
+            - 422: Если atomic=True и у одного из отправителей недостаточно
+              средств, валюты кошельков не совпадают или сумма точнее
+              минимальной единицы валюты.
+    """
+    ledger = settings.wallet.operation_mode == "ledger"
+    try:
+        results, new_operations, changed, created_at = await run_transaction(
+            session,
+            partial(_apply_transfer_batch, session, transfers, atomic, ledger),
+            isolation_level([OperationType.TRANSFER_OUT, OperationType.TRANSFER_IN]),
+        )
     except SQLAlchemyError as e:
         await session.rollback()
-        logger.error(f"Ошибка при обновлении баланса кошелька {uuid_wallet}: {e}")
+        logger.error("Ошибка при выполнении переводов: %s", e)
         raise
+
+    await _balances_changed(changed)
+    if ledger:
+        for uuid_wallet, count in Counter(
+            values["wallet_id"] for values in new_operations
+        ).items():
+            ledger_compactor.notify(uuid_wallet, count)
+    responses: list[TransferResponse | HTTPException] = []
+    for result in results:
+        if isinstance(result, HTTPException):
+            responses.append(result)
+            continue
+        transfer_id, *operations, currency = result
+        outgoing, incoming = (
+            OperationResponse(
+                **values, created_at=created_at[values["id"]], currency=currency
+            )
+            for values in operations
+        )
+        responses.append(
+            TransferResponse(id=transfer_id, outgoing=outgoing, incoming=incoming)
+        )
+    _publish_operations(
+        [
+            operation
+            for response in responses
+            if isinstance(response, TransferResponse)
+            for operation in (response.outgoing, response.incoming)
+        ],
+        changed,
+    )
+    logger.info(
+        "Переводы выполнены: принято %s, отклонено %s",
+        len(new_operations) // 2,
+        len(transfers) - len(new_operations) // 2,
+    )
+    return responses
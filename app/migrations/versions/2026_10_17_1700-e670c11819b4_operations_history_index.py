@@ -0,0 +1,36 @@
+"""operations history index
+
+Revision ID: e670c11819b4
+Revises: 6165d62667f1
+Create Date: 2026-10-17 17:00:12.481307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e670c11819b4'
+down_revision: Union[str, Sequence[str], None] = '6165d62667f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_operations_wallet_id_created_at_id',
+        'operations',
+        ['wallet_id', 'created_at', 'id'],
+        unique=False,
+        postgresql_include=['operation_type', 'amount'],
+    )
+    op.drop_index(op.f('ix_operations_wallet_id'), table_name='operations')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_operations_wallet_id'), 'operations', ['wallet_id'], unique=False)
+    op.drop_index('ix_operations_wallet_id_created_at_id', table_name='operations')
@@ -0,0 +1,36 @@
+"""operations idempotency key
+
+Revision ID: 3b9d2f41c7a8
+Revises: e670c11819b4
+Create Date: 2026-10-17 18:00:41.903215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2f41c7a8'
+down_revision: Union[str, Sequence[str], None] = 'e670c11819b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('operations', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    op.create_index(
+        'ux_operations_wallet_id_idempotency_key',
+        'operations',
+        ['wallet_id', 'idempotency_key'],
+        unique=True,
+        postgresql_where=sa.text('idempotency_key IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_operations_wallet_id_idempotency_key', table_name='operations')
+    op.drop_column('operations', 'idempotency_key')
@@ -0,0 +1,39 @@
+"""operations ledger compacted flag
+
+Revision ID: 8f0c5a7d2e16
+Revises: 3b9d2f41c7a8
+Create Date: 2026-10-17 19:00:07.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f0c5a7d2e16'
+down_revision: Union[str, Sequence[str], None] = '3b9d2f41c7a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'operations',
+        sa.Column('compacted', sa.Boolean(), server_default=sa.true(), nullable=False),
+    )
+    op.create_index(
+        'ix_operations_wallet_id_pending',
+        'operations',
+        ['wallet_id'],
+        unique=False,
+        postgresql_where=sa.text('NOT compacted'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_operations_wallet_id_pending', table_name='operations')
+    op.drop_column('operations', 'compacted')
@@ -0,0 +1,59 @@
+"""wallet stripes
+
+Revision ID: c41e7b9a0d53
+Revises: 8f0c5a7d2e16
+Create Date: 2026-10-17 20:00:52.604117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c41e7b9a0d53"
+down_revision: Union[str, Sequence[str], None] = "8f0c5a7d2e16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "wallets",
+        sa.Column("stripes", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.create_table(
+        "wallet_stripes",
+        sa.Column("wallet_id", sa.UUID(), nullable=False),
+        sa.Column("stripe", sa.Integer(), nullable=False),
+        sa.Column(
+            "balance",
+            sa.Numeric(precision=19, scale=2),
+            server_default="0.0",
+            nullable=False,
+        ),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["wallet_id"],
+            ["wallets.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "wallet_id", "stripe", name="uq_wallet_stripes_wallet_id_stripe"
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("wallet_stripes")
+    op.drop_column("wallets", "stripes")
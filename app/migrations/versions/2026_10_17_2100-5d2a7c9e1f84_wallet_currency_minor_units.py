@@ -0,0 +1,72 @@
+"""wallet currency and minor units
+
+Revision ID: 5d2a7c9e1f84
+Revises: c41e7b9a0d53
+Create Date: 2026-10-17 21:00:14.380265
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2a7c9e1f84"
+down_revision: Union[str, Sequence[str], None] = "c41e7b9a0d53"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Существующие кошельки - рублёвые, суммы хранились с двумя знаками.
+LEGACY_CURRENCY = "RUB"
+LEGACY_SCALE = 2
+
+MONEY_COLUMNS = (
+    ("wallets", "balance", "0"),
+    ("wallet_stripes", "balance", "0"),
+    ("operations", "amount", None),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "wallets",
+        sa.Column(
+            "currency",
+            sa.String(length=3),
+            server_default=LEGACY_CURRENCY,
+            nullable=False,
+        ),
+    )
+    op.alter_column("wallets", "currency", server_default=None)
+    for table, column, server_default in MONEY_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            existing_type=sa.Numeric(precision=19, scale=2),
+            type_=sa.BigInteger(),
+            postgresql_using=f"({column} * {10**LEGACY_SCALE})::bigint",
+            server_default=server_default,
+            existing_nullable=False,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    Суммы переводятся обратно с двумя знаками после запятой, поэтому
+    кошельки в валютах с другим числом знаков нужно удалить заранее.
+    """
+    for table, column, server_default in MONEY_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            existing_type=sa.BigInteger(),
+            type_=sa.Numeric(precision=19, scale=2),
+            postgresql_using=f"{column} / {10**LEGACY_SCALE}.0",
+            server_default=server_default and "0.0",
+            existing_nullable=False,
+        )
+    op.drop_column("wallets", "currency")
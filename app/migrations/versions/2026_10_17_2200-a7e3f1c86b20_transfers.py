@@ -0,0 +1,37 @@
+"""transfers
+
+Revision ID: a7e3f1c86b20
+Revises: 5d2a7c9e1f84
+Create Date: 2026-10-17 22:00:37.915402
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7e3f1c86b20"
+down_revision: Union[str, Sequence[str], None] = "5d2a7c9e1f84"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Новое значение enum нельзя использовать в транзакции, которая его добавила.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE operationtype ADD VALUE IF NOT EXISTS 'TRANSFER_IN'")
+        op.execute("ALTER TYPE operationtype ADD VALUE IF NOT EXISTS 'TRANSFER_OUT'")
+    op.add_column("operations", sa.Column("transfer_id", sa.UUID(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    PostgreSQL не умеет удалять значения enum, поэтому TRANSFER_IN и
+    TRANSFER_OUT остаются в типе operationtype.
+    """
+    op.drop_column("operations", "transfer_id")
@@ -0,0 +1,74 @@
+"""wallet daily stats
+
+Revision ID: e2b84d6f9a15
+Revises: a7e3f1c86b20
+Create Date: 2026-10-17 23:00:21.704913
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b84d6f9a15"
+down_revision: Union[str, Sequence[str], None] = "a7e3f1c86b20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "wallet_daily_stats",
+        sa.Column("wallet_id", sa.UUID(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column(
+            "operation_type",
+            postgresql.ENUM(name="operationtype", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("amount", sa.BigInteger(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["wallet_id"],
+            ["wallets.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "wallet_id",
+            "day",
+            "operation_type",
+            name="uq_wallet_daily_stats_wallet_id_day_operation_type",
+        ),
+    )
+    op.create_table(
+        "stats_watermarks",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("watermark", sa.DateTime(), nullable=False),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("stats_watermarks")
+    op.drop_table("wallet_daily_stats")
@@ -0,0 +1,161 @@
+"""operations partitions
+
+Revision ID: 9c4e1b7d3a52
+Revises: e2b84d6f9a15
+Create Date: 2026-10-18 00:00:12.408117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c4e1b7d3a52"
+down_revision: Union[str, Sequence[str], None] = "e2b84d6f9a15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Секции создаются с месяца самой ранней операции до текущего + 3
+# (OPERATIONS_PARTITIONS_AHEAD по умолчанию).
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    month date := date_trunc(
+        'month', coalesce((SELECT min(created_at) FROM operations_unpartitioned), now())
+    );
+BEGIN
+    WHILE month <= date_trunc('month', now()) + interval '3 months' LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF operations FOR VALUES FROM (%L) TO (%L)',
+            'operations_p' || to_char(month, 'YYYYMM'),
+            month,
+            month + interval '1 month'
+        );
+        month := month + interval '1 month';
+    END LOOP;
+END $$
+"""
+
+
+def _create_operations_indexes() -> None:
+    op.create_index(
+        "ix_operations_wallet_id_created_at_id",
+        "operations",
+        ["wallet_id", "created_at", "id"],
+        unique=False,
+        postgresql_include=["operation_type", "amount"],
+    )
+    op.create_index(
+        "ix_operations_wallet_id_pending",
+        "operations",
+        ["wallet_id"],
+        unique=False,
+        postgresql_where=sa.text("NOT compacted"),
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "operation_idempotency_keys",
+        sa.Column("wallet_id", sa.UUID(), nullable=False),
+        sa.Column("idempotency_key", sa.String(length=255), nullable=False),
+        sa.Column("operation_id", sa.UUID(), nullable=False),
+        sa.Column("operation_created_at", sa.DateTime(), nullable=False),
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["wallet_id"],
+            ["wallets.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "wallet_id",
+            "idempotency_key",
+            name="uq_operation_idempotency_keys_wallet_id_idempotency_key",
+        ),
+    )
+    op.create_index(
+        "ix_operation_idempotency_keys_created_at",
+        "operation_idempotency_keys",
+        ["created_at"],
+        unique=False,
+    )
+    op.execute(
+        "INSERT INTO operation_idempotency_keys "
+        "(id, wallet_id, idempotency_key, operation_id, operation_created_at, "
+        "created_at, updated_at) "
+        "SELECT gen_random_uuid(), wallet_id, idempotency_key, id, created_at, "
+        "created_at, created_at "
+        "FROM operations WHERE idempotency_key IS NOT NULL"
+    )
+
+    op.drop_index("ux_operations_wallet_id_idempotency_key", table_name="operations")
+    op.drop_index("ix_operations_wallet_id_pending", table_name="operations")
+    op.drop_index("ix_operations_wallet_id_created_at_id", table_name="operations")
+    op.rename_table("operations", "operations_unpartitioned")
+    op.execute(
+        "ALTER TABLE operations_unpartitioned "
+        "RENAME CONSTRAINT operations_pkey TO operations_unpartitioned_pkey"
+    )
+    op.execute(
+        "CREATE TABLE operations "
+        "(LIKE operations_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.create_primary_key("operations_pkey", "operations", ["id", "created_at"])
+    op.create_foreign_key(
+        "operations_wallet_id_fkey", "operations", "wallets", ["wallet_id"], ["id"]
+    )
+    op.execute(CREATE_PARTITIONS)
+    op.execute("INSERT INTO operations SELECT * FROM operations_unpartitioned")
+    op.drop_table("operations_unpartitioned")
+    _create_operations_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table("operations", "operations_partitioned")
+    op.execute(
+        "ALTER TABLE operations_partitioned "
+        "RENAME CONSTRAINT operations_pkey TO operations_partitioned_pkey"
+    )
+    op.execute(
+        "CREATE TABLE operations (LIKE operations_partitioned INCLUDING DEFAULTS)"
+    )
+    op.create_primary_key("operations_pkey", "operations", ["id"])
+    op.create_foreign_key(
+        "operations_wallet_id_fkey", "operations", "wallets", ["wallet_id"], ["id"]
+    )
+    op.execute("INSERT INTO operations SELECT * FROM operations_partitioned")
+    # Ключи, уже удалённые из operation_idempotency_keys, в прежней схеме
+    # снимались с операций.
+    op.execute(
+        "UPDATE operations o SET idempotency_key = NULL "
+        "WHERE idempotency_key IS NOT NULL AND NOT EXISTS ("
+        "SELECT 1 FROM operation_idempotency_keys k "
+        "WHERE k.operation_id = o.id AND k.wallet_id = o.wallet_id "
+        "AND k.idempotency_key = o.idempotency_key)"
+    )
+    op.execute("DROP TABLE operations_partitioned CASCADE")
+    _create_operations_indexes()
+    op.create_index(
+        "ux_operations_wallet_id_idempotency_key",
+        "operations",
+        ["wallet_id", "idempotency_key"],
+        unique=True,
+        postgresql_where=sa.text("idempotency_key IS NOT NULL"),
+    )
+    op.drop_index(
+        "ix_operation_idempotency_keys_created_at",
+        table_name="operation_idempotency_keys",
+    )
+    op.drop_table("operation_idempotency_keys")
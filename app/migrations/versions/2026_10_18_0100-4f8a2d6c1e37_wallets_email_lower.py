@@ -0,0 +1,39 @@
+"""wallets email lower
+
+Revision ID: 4f8a2d6c1e37
+Revises: 9c4e1b7d3a52
+Create Date: 2026-10-18 01:00:44.162093
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4f8a2d6c1e37"
+down_revision: Union[str, Sequence[str], None] = "9c4e1b7d3a52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint("wallets_email_key", "wallets", type_="unique")
+    # Если есть email, отличающиеся только регистром, создание индекса
+    # завершится ошибкой: такие кошельки нужно объединить вручную.
+    op.execute("UPDATE wallets SET email = lower(trim(email))")
+    op.create_index(
+        "ux_wallets_email_lower",
+        "wallets",
+        [sa.text("lower(email)")],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ux_wallets_email_lower", table_name="wallets")
+    op.create_unique_constraint("wallets_email_key", "wallets", ["email"])
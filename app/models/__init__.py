@@ -1,9 +1,21 @@
 __all__ = (
     "Base",
     "Operation",
+    "OperationIdempotencyKey",
     "OperationType",
+    "StatsWatermark",
     "Wallet",
+    "WalletDailyStat",
+    "WalletStripe",
 )
 
 from .base import Base
-from .models import Operation, OperationType, Wallet
+from .models import (
+    Operation,
+    OperationIdempotencyKey,
+    OperationType,
+    StatsWatermark,
+    Wallet,
+    WalletDailyStat,
+    WalletStripe,
+)
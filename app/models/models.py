@@ -1,28 +1,70 @@
 import enum
 import uuid
-from decimal import Decimal
+from datetime import date, datetime
+from typing import Any, ClassVar
 
-from sqlalchemy import Enum, ForeignKey, Numeric, String
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Date,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+    String,
+    UniqueConstraint,
+    func,
+    text,
+    true,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.core.config import get_settings
 from app.models import Base
 
 
 class OperationType(enum.Enum):
     DEPOSIT = "DEPOSIT"
     WITHDRAW = "WITHDRAW"
+    # Две операции одного перевода между кошельками.
+    TRANSFER_IN = "TRANSFER_IN"
+    TRANSFER_OUT = "TRANSFER_OUT"
+
+    @property
+    def is_debit(self) -> bool:
+        """Операция уменьшает баланс кошелька."""
+        return self in (OperationType.WITHDRAW, OperationType.TRANSFER_OUT)
 
 
 class Wallet(Base):
     __tablename__ = "wallets"
+    __table_args__ = (
+        # Email уникальны без учёта регистра (см. app.crud.wallet.normalize_email).
+        Index("ux_wallets_email_lower", func.lower(text("email")), unique=True),
+    )
 
-    email: Mapped[str] = mapped_column(String, unique=True, nullable=False)
-    balance: Mapped[Decimal] = mapped_column(
-        Numeric(19, 2),
+    email: Mapped[str] = mapped_column(String, nullable=False)
+    # Код валюты ISO 4217, не меняется после создания кошелька.
+    currency: Mapped[str] = mapped_column(
+        String(3),
+        nullable=False,
+        default=lambda: get_settings().wallet.default_currency,
+    )
+    # Баланс в минимальных единицах валюты (см. app.core.money).
+    balance: Mapped[int] = mapped_column(
+        BigInteger,
         nullable=False,
-        default=0.0,
-        server_default="0.0",
+        default=0,
+        server_default="0",
+    )
+    # Число полос баланса (0 - баланс целиком в wallets.balance).
+    stripes: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
     )
     operations: Mapped[list["Operation"]] = relationship(
         "Operation",
@@ -30,24 +72,176 @@ class Wallet(Base):
     )
 
 
+class WalletStripe(Base):
+    """Полоса баланса кошелька: часть баланса в отдельной строке.
+
+    Полный баланс кошелька - ``wallets.balance`` плюс сумма его полос.
+    """
+
+    __tablename__ = "wallet_stripes"
+    __table_args__ = (
+        UniqueConstraint(
+            "wallet_id", "stripe", name="uq_wallet_stripes_wallet_id_stripe"
+        ),
+    )
+
+    wallet_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("wallets.id"),
+        nullable=False,
+    )
+    stripe: Mapped[int] = mapped_column(Integer, nullable=False)
+    balance: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
+
+
 class Operation(Base):
+    """Операция с балансом кошелька.
+
+    В PostgreSQL таблица секционирована по месяцам ``created_at`` (см.
+    app.crud.partitions), поэтому ``created_at`` входит в первичный ключ, а
+    уникальность ключей идемпотентности обеспечивает отдельная таблица
+    ``operation_idempotency_keys``.
+    """
+
     __tablename__ = "operations"
+    __table_args__ = (
+        Index(
+            "ix_operations_wallet_id_created_at_id",
+            "wallet_id",
+            "created_at",
+            "id",
+            postgresql_include=["operation_type", "amount"],
+        ),
+        Index(
+            "ix_operations_wallet_id_pending",
+            "wallet_id",
+            postgresql_where=text("NOT compacted"),
+            sqlite_where=text("NOT compacted"),
+        ),
+        PrimaryKeyConstraint("id", "created_at", name="operations_pkey"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    # Операция однозначно определяется своим UUID, created_at нужен в
+    # первичном ключе только секционированной таблице.
+    __mapper_args__: ClassVar[dict[str, Any]] = {"primary_key": ["id"]}
 
+    created_at: Mapped[datetime] = mapped_column(
+        primary_key=True,
+        server_default=func.now(),
+    )
     wallet_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("wallets.id"),
         nullable=False,
-        index=True,
     )
     operation_type: Mapped[OperationType] = mapped_column(
         Enum(OperationType, name="operationtype"),
         nullable=False,
     )
-    amount: Mapped[Decimal] = mapped_column(
-        Numeric(19, 2),
+    # Сумма в минимальных единицах валюты кошелька.
+    amount: Mapped[int] = mapped_column(
+        BigInteger,
         nullable=False,
     )
+    # Ключ запроса, создавшего операцию (для аудита; после очистки ключей
+    # остаётся в операции).
+    idempotency_key: Mapped[str | None] = mapped_column(
+        String(255),
+        nullable=True,
+    )
+    # Общий идентификатор операций TRANSFER_OUT и TRANSFER_IN одного перевода.
+    transfer_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=True,
+    )
+    # Сумма операции уже учтена в wallets.balance. Режим ledger вставляет
+    # операции неучтёнными, их переносит в баланс компактизация.
+    compacted: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        default=True,
+        server_default=true(),
+    )
     wallet: Mapped["Wallet"] = relationship(
         "Wallet",
         back_populates="operations",
     )
+
+
+class OperationIdempotencyKey(Base):
+    """Ключ идемпотентности операции (заголовок Idempotency-Key).
+
+    Вставляется в одной транзакции с операцией; уникальный индекс по
+    (wallet_id, idempotency_key) не даёт выполнить операцию с тем же ключом
+    дважды. ``operation_created_at`` позволяет найти операцию в одной секции
+    ``operations``.
+    """
+
+    __tablename__ = "operation_idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint(
+            "wallet_id",
+            "idempotency_key",
+            name="uq_operation_idempotency_keys_wallet_id_idempotency_key",
+        ),
+        Index("ix_operation_idempotency_keys_created_at", "created_at"),
+    )
+
+    wallet_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("wallets.id"),
+        nullable=False,
+    )
+    idempotency_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    operation_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=False,
+    )
+    operation_created_at: Mapped[datetime] = mapped_column(nullable=False)
+
+
+class WalletDailyStat(Base):
+    """Сумма и число операций одного типа по кошельку за день (UTC).
+
+    Строки дополняет ``StatsAggregator`` (app.crud.stats) по операциям,
+    созданным до отметки ``StatsWatermark``; более новые операции
+    учитываются при чтении статистики напрямую из ``operations``.
+    """
+
+    __tablename__ = "wallet_daily_stats"
+    __table_args__ = (
+        UniqueConstraint(
+            "wallet_id",
+            "day",
+            "operation_type",
+            name="uq_wallet_daily_stats_wallet_id_day_operation_type",
+        ),
+    )
+
+    wallet_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("wallets.id"),
+        nullable=False,
+    )
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    operation_type: Mapped[OperationType] = mapped_column(
+        Enum(OperationType, name="operationtype"),
+        nullable=False,
+    )
+    # Сумма в минимальных единицах валюты кошелька.
+    amount: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class StatsWatermark(Base):
+    """Отметка агрегации: операции с ``created_at`` раньше неё уже в сводках."""
+
+    __tablename__ = "stats_watermarks"
+
+    name: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    watermark: Mapped[datetime] = mapped_column(nullable=False)
@@ -0,0 +1,389 @@
+"""Нагрузочные тесты и микробенчмарки API кошельков.
+
+Сценарии ``get_wallet``, ``create_wallet``, ``deposit`` и ``withdraw``
+выполняются с заданной конкурентностью при равномерном (``uniform``) или
+зипфовском (``zipf``, «горячие» кошельки) распределении ключей. Для каждого
+сценария считаются p50/p95/p99 задержки, ops/s, число запросов к базе и
+процессорное время на запрос (только при запуске в процессе) и расхождение
+балансов после операций (потерянные обновления).
+
+По умолчанию приложение запускается в процессе через ``httpx.ASGITransport``
+с базой SQLite во временном файле; ``--url`` направляет нагрузку на
+запущенный сервер. Результаты можно сохранить как базовые (``--save-baseline``)
+и сравнивать с ними: при регрессии больше ``--max-regression`` или при
+расхождении балансов команда завершается с кодом 1.
+
+Пример:
+    python -m benchmarks.wallet_api --requests 5000 --concurrency 64 --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from pathlib import Path
+
+import httpx
+from sqlalchemy import event
+
+from app.core import db_helper
+from app.core.db_helper import DataBaseHelper
+from app.crud.coalescer import operation_coalescer
+from app.crud.ledger import ledger_compactor
+from app.models import Base
+from main import app
+
+SCENARIOS = ("get_wallet", "create_wallet", "deposit", "withdraw")
+DISTRIBUTIONS = ("uniform", "zipf")
+WITHDRAW_AMOUNT = Decimal("1")
+
+
+class RoundTripCounter:
+    """Считает запросы к базе через событие ``before_cursor_execute``."""
+
+    def __init__(self, helper: DataBaseHelper | None = None) -> None:
+        self.count = 0
+        self.enabled = helper is not None
+        if helper is not None:
+            event.listen(
+                helper.engine.sync_engine, "before_cursor_execute", self._on_execute
+            )
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+
+def key_picker(
+    size: int,
+    distribution: str,
+    zipf_s: float,
+    rng: random.Random,
+) -> Callable[[], int]:
+    """Возвращает функцию выбора индекса кошелька по распределению."""
+    if distribution == "uniform":
+        return lambda: rng.randrange(size)
+    weights = [1 / (rank**zipf_s) for rank in range(1, size + 1)]
+    population = range(size)
+    return lambda: rng.choices(population, weights)[0]
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, round(q * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+@asynccontextmanager
+async def in_process_client(
+    database_url: str,
+) -> AsyncIterator[tuple[httpx.AsyncClient, RoundTripCounter]]:
+    """Клиент для приложения в процессе поверх отдельной базы."""
+    helper = DataBaseHelper(url=database_url)
+    async with helper.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    counter = RoundTripCounter(helper)
+    coalescer_factory = operation_coalescer._session_factory
+    compactor_factory = ledger_compactor._session_factory
+    app.dependency_overrides[db_helper.sesion_getter] = helper.sesion_getter
+    app.dependency_overrides[db_helper.replica_session_getter] = helper.sesion_getter
+    app.dependency_overrides[db_helper.stream_session_getter] = (
+        helper.stream_session_getter
+    )
+    operation_coalescer._session_factory = helper.session_factory
+    ledger_compactor._session_factory = helper.session_factory
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://bench",
+        ) as client:
+            yield client, counter
+    finally:
+        app.dependency_overrides.clear()
+        operation_coalescer._session_factory = coalescer_factory
+        ledger_compactor._session_factory = compactor_factory
+        await helper.dispose()
+
+
+@asynccontextmanager
+async def remote_client(
+    url: str,
+) -> AsyncIterator[tuple[httpx.AsyncClient, RoundTripCounter]]:
+    """Клиент для запущенного сервера; запросы к базе не считаются."""
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        yield client, RoundTripCounter()
+
+
+async def create_wallets(
+    client: httpx.AsyncClient,
+    count: int,
+    balance: Decimal,
+) -> list[str]:
+    """Создаёт кошельки для сценария и пополняет их на ``balance``."""
+    run_id = uuid.uuid4().hex[:8]
+    response = await client.post(
+        "/api/v1/wallets/create-wallets:bulk",
+        json={"emails": [f"bench-{run_id}-{i}@example.com" for i in range(count)]},
+    )
+    response.raise_for_status()
+    wallet_ids = [wallet["id"] for wallet in response.json()["created"]]
+    if balance:
+        response = await client.post(
+            "/api/v1/wallets/operations:batch",
+            json={
+                "operations": [
+                    {
+                        "wallet_id": wallet_id,
+                        "operation_type": "DEPOSIT",
+                        "amount": str(balance),
+                    }
+                    for wallet_id in wallet_ids
+                ]
+            },
+        )
+        response.raise_for_status()
+    return wallet_ids
+
+
+async def read_balances(
+    client: httpx.AsyncClient,
+    wallet_ids: list[str],
+) -> dict[str, Decimal]:
+    balances = {}
+    for wallet_id in wallet_ids:
+        response = await client.get(
+            f"/api/v1/wallets/{wallet_id}",
+            headers={"X-Consistency": "strict"},
+        )
+        response.raise_for_status()
+        balances[wallet_id] = Decimal(response.json()["balance"])
+    return balances
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    counter: RoundTripCounter,
+    scenario: str,
+    distribution: str,
+    wallets: int,
+    requests: int,
+    concurrency: int,
+    zipf_s: float = 1.1,
+    seed: int = 0,
+) -> dict:
+    """Выполняет сценарий и возвращает его метрики.
+
+    Returns:
+        dict: ops/s, задержки p50/p95/p99 (мс), число ошибок, запросов к базе
+        и процессорного времени (мс, клиент и приложение вместе) на запрос и
+        кошельков с расхождением баланса.
+    """
+    rng = random.Random(seed)
+    initial_balance = WITHDRAW_AMOUNT * requests if scenario == "withdraw" else 0
+    wallet_ids = []
+    if scenario != "create_wallet":
+        wallet_ids = await create_wallets(client, wallets, initial_balance)
+    pick = key_picker(max(len(wallet_ids), 1), distribution, zipf_s, rng)
+    operation_type = "WITHDRAW" if scenario == "withdraw" else "DEPOSIT"
+    before = {}
+    if scenario in ("deposit", "withdraw"):
+        before = await read_balances(client, wallet_ids)
+
+    applied: defaultdict[str, Decimal] = defaultdict(Decimal)
+    latencies: list[float] = []
+    errors = 0
+    run_id = uuid.uuid4().hex[:8]
+    queue = iter(range(requests))
+
+    async def send(index: int) -> httpx.Response:
+        if scenario == "create_wallet":
+            return await client.post(
+                "/api/v1/wallets/create-wallet",
+                json={"email": f"bench-{run_id}-{index}@example.com"},
+            )
+        wallet_id = wallet_ids[pick()]
+        if scenario == "get_wallet":
+            return await client.get(f"/api/v1/wallets/{wallet_id}")
+        amount = (
+            str(WITHDRAW_AMOUNT) if scenario == "withdraw" else str(rng.randint(1, 100))
+        )
+        response = await client.post(
+            f"/api/v1/wallets/{wallet_id}/operation",
+            json={"operation_type": operation_type, "amount": amount},
+        )
+        if response.status_code == 200:
+            sign = -1 if scenario == "withdraw" else 1
+            applied[wallet_id] += sign * Decimal(amount)
+        return response
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in queue:
+            started = time.perf_counter()
+            response = await send(index)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    round_trips = counter.count
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    round_trips = counter.count - round_trips
+
+    drift = None
+    if before:
+        after = await read_balances(client, wallet_ids)
+        drift = sum(
+            after[wallet_id] != before[wallet_id] + applied[wallet_id]
+            for wallet_id in wallet_ids
+        )
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "distribution": distribution,
+        "requests": requests,
+        "concurrency": concurrency,
+        "ops_per_sec": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "errors": errors,
+        "db_round_trips_per_request": (
+            round(round_trips / requests, 2) if counter.enabled else None
+        ),
+        "cpu_ms_per_request": (
+            round(cpu / requests * 1000, 3) if counter.enabled else None
+        ),
+        "balance_drift": drift,
+    }
+
+
+def result_key(result: dict) -> str:
+    return f"{result['scenario']}/{result['distribution']}"
+
+
+def compare_with_baseline(
+    results: list[dict],
+    baseline: dict[str, dict],
+    max_regression: float,
+) -> list[str]:
+    """Сравнивает результаты с базовыми и возвращает найденные регрессии.
+
+    Регрессией считается падение ops/s или рост p99 больше чем на
+    ``max_regression`` (доля), а также любое расхождение балансов.
+    """
+    failures = []
+    for result in results:
+        key = result_key(result)
+        if result["balance_drift"]:
+            failures.append(
+                f"{key}: расхождение баланса у {result['balance_drift']} кошельков"
+            )
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result["ops_per_sec"] < base["ops_per_sec"] * (1 - max_regression):
+            failures.append(
+                f"{key}: ops/s {result['ops_per_sec']} < базовых {base['ops_per_sec']}"
+            )
+        if result["p99_ms"] > base["p99_ms"] * (1 + max_regression):
+            failures.append(
+                f"{key}: p99 {result['p99_ms']} мс > базовых {base['p99_ms']} мс"
+            )
+    return failures
+
+
+async def run(args: argparse.Namespace) -> list[dict]:
+    if args.url:
+        client_context = remote_client(args.url)
+    else:
+        database_url = args.database_url or (
+            f"sqlite+aiosqlite:///{Path(tempfile.mkdtemp()) / 'bench.db'}"
+        )
+        client_context = in_process_client(database_url)
+
+    results = []
+    async with client_context as (client, counter):
+        for scenario in args.scenarios:
+            distributions = (
+                ["uniform"] if scenario == "create_wallet" else args.distributions
+            )
+            for distribution in distributions:
+                result = await run_scenario(
+                    client,
+                    counter,
+                    scenario,
+                    distribution,
+                    wallets=args.wallets,
+                    requests=args.requests,
+                    concurrency=args.concurrency,
+                    zipf_s=args.zipf_s,
+                    seed=args.seed,
+                )
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочные тесты API кошельков")
+    parser.add_argument("--url", default=None, help="Адрес запущенного сервера")
+    parser.add_argument(
+        "--database-url", default=None, help="База для запуска в процессе"
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument(
+        "--distributions", nargs="+", choices=DISTRIBUTIONS, default=list(DISTRIBUTIONS)
+    )
+    parser.add_argument("--wallets", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--zipf-s", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Файл JSON с результатами"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=None, help="Файл базовых результатов"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Записать результаты в --baseline вместо сравнения",
+    )
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    if args.baseline is not None and args.save_baseline:
+        baseline = {result_key(result): result for result in results}
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        return
+    baseline = {}
+    if args.baseline is not None and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+    failures = compare_with_baseline(results, baseline, args.max_regression)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
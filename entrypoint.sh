@@ -1,4 +1,4 @@
 #!/bin/bash
 
 alembic upgrade head
-uvicorn main:app --host 0.0.0.0 --port 8080 --reload
\ No newline at end of file
+exec python -m app.cli.serve
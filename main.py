@@ -1,7 +1,74 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from app.api_v1.router import router as router_api_v1
+from app.core import db_helper
+from app.core.config import settings
+from app.core.events import event_broker
+from app.core.logger import (
+    LogContextMiddleware,
+    configure_logging,
+    logger,
+    shutdown_logging,
+)
+from app.core.metrics import MetricsMiddleware, instrument_engine, metrics_registry
+from app.core.responses import ModelResponse
+from app.crud.coalescer import operation_coalescer
+from app.crud.ledger import ledger_compactor
+from app.crud.partitions import partition_maintainer
+from app.crud.stats import stats_aggregator
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Запуск и остановка процесса приложения.
 
-from app.api_v1 import router as router_api_v1
+    При запуске настраивается логирование, создаются движки базы данных (при
+    импорте модуля они не создаются), заранее открываются соединения пула и
+    запускается проверка недоступных реплик.
+    При остановке (после того как сервер дождался начатых запросов)
+    применяются операции из очереди объединения, завершаются компактизация
+    журнала, агрегация сводок и создание секций operations, закрываются
+    брокер событий и пул соединений, дописываются записи журнала.
+    """
+    configure_logging(settings.logging)
+    if settings.metrics.enabled:
+        for engine in (
+            db_helper.engine,
+            *(replica.engine for replica in db_helper.replicas),
+        ):
+            instrument_engine(engine)
+    opened = await db_helper.warm_up()
+    logger.info("Пул соединений прогрет: %s соединений", opened)
+    db_helper.start_replica_monitor()
+    await event_broker.start()
+    if settings.wallet.operation_mode == "ledger":
+        ledger_compactor.start()
+    stats_aggregator.start()
+    partition_maintainer.start()
+    yield
+    await operation_coalescer.drain()
+    await ledger_compactor.stop()
+    await stats_aggregator.stop()
+    await partition_maintainer.stop()
+    await event_broker.stop()
+    await db_helper.stop_replica_monitor()
+    await db_helper.dispose()
+    logger.info("Приложение остановлено")
+    shutdown_logging()
 
-app = FastAPI(title="App")
+
+app = FastAPI(title="App", lifespan=lifespan, default_response_class=ModelResponse)
 
 app.include_router(router=router_api_v1, prefix="/api/v1")
+app.add_middleware(LogContextMiddleware)
+
+if settings.metrics.enabled:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(metrics_registry.render())
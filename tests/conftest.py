@@ -3,6 +3,7 @@ import pytest
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core import db_helper
+from app.core.db_helper import DataBaseHelper
 from app.models import Operation, Wallet
 from main import app
 
@@ -20,12 +21,66 @@ async def session():
     await engine.dispose()
 
 
+@pytest.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", echo=False
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Wallet.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def wallet(request, session: AsyncSession) -> Wallet:
+    """Кошелёк с нулевым балансом.
+
+    Другой баланс задаётся косвенной параметризацией:
+    ``@pytest.mark.parametrize("wallet", [1000], indirect=True)``.
+    """
+    wallet = Wallet(email="test@example.com", balance=getattr(request, "param", 0))
+    session.add(wallet)
+    await session.commit()
+    return wallet
+
+
+@pytest.fixture
+def get_balance(client, session: AsyncSession):
+    """Баланс кошелька из ``GET /wallets/{wallet_id}`` в основной базе, без кэша."""
+
+    async def get_balance(wallet: Wallet) -> str:
+        response = await client.get(
+            f"/api/v1/wallets/{wallet.id}",
+            headers={"X-Consistency": "strict"},
+        )
+        assert response.status_code == 200
+        await session.commit()
+        return response.json()["balance"]
+
+    return get_balance
+
+
+@pytest.fixture
+async def replicated_helper(tmp_path):
+    def url(name: str) -> str:
+        return f"sqlite+aiosqlite:///{tmp_path / name}"
+
+    helper = DataBaseHelper(
+        url=url("primary.db"),
+        replica_urls=[url("replica-1.db"), url("replica-2.db")],
+    )
+    yield helper
+    await helper.dispose()
+
+
 @pytest.fixture
 async def client(session: AsyncSession):
     async def override_session_getter():
         yield session
 
     app.dependency_overrides[db_helper.sesion_getter] = override_session_getter
+    app.dependency_overrides[db_helper.replica_session_getter] = override_session_getter
     async with httpx.AsyncClient(
         transport=httpx.ASGITransport(app=app),
         base_url="http://test",
@@ -0,0 +1,116 @@
+import time
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import db_helper
+from app.core.cache import BalanceCache, TTLCache, balance_cache
+from app.models import Wallet
+
+
+class FakeSharedBackend:
+    def __init__(self) -> None:
+        self.data: dict[UUID, int] = {}
+
+    async def get(self, wallet_id: UUID) -> int | None:
+        return self.data.get(wallet_id)
+
+    async def set(self, wallet_id: UUID, balance: int, ttl: float) -> None:
+        self.data[wallet_id] = balance
+
+    async def delete(self, wallet_id: UUID) -> None:
+        self.data.pop(wallet_id, None)
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    cache = TTLCache(max_size=10, ttl=5)
+    cache.set("a", 1)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 10)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_balance_cache_reads_through_shared_backend():
+    shared = FakeSharedBackend()
+    writer = BalanceCache(TTLCache(max_size=10, ttl=60), shared=shared)
+    reader = BalanceCache(TTLCache(max_size=10, ttl=60), shared=shared)
+    wallet_id = uuid4()
+
+    await writer.set(wallet_id, 150)
+    assert await reader.get(wallet_id) == 150
+    assert reader.local.get(wallet_id) == 150
+
+    await writer.invalidate(wallet_id)
+    assert await writer.get(wallet_id) is None
+    assert wallet_id not in shared.data
+
+
+@pytest.mark.asyncio
+async def test_get_wallet_uses_write_through_cache(client, session: AsyncSession):
+    response = await client.post(
+        "/api/v1/wallets/create-wallet",
+        json={"email": "test@example.com"},
+    )
+    wallet_id = UUID(response.json()["id"])
+    assert await balance_cache.get(wallet_id) == 0
+
+    await client.post(
+        f"/api/v1/wallets/{wallet_id}/operation",
+        json={"operation_type": "DEPOSIT", "amount": "5"},
+    )
+    await session.execute(
+        update(Wallet).where(Wallet.id == wallet_id).values(balance=700)
+    )
+    await session.commit()
+    hits = balance_cache.stats()["hits"]
+
+    response = await client.get(f"/api/v1/wallets/{wallet_id}")
+    assert response.json()["balance"] == "5.00"
+    assert balance_cache.stats()["hits"] == hits + 1
+
+    response = await client.get(
+        f"/api/v1/wallets/{wallet_id}",
+        headers={"X-Consistency": "strict"},
+    )
+    assert response.json()["balance"] == "7.00"
+    assert await balance_cache.get(wallet_id) == 700
+
+
+@pytest.mark.asyncio
+async def test_cache_stats(client):
+    response = await client.get("/api/v1/wallets/cache-stats")
+
+    assert response.status_code == 200
+    assert set(response.json()) == {"size", "hits", "misses", "evictions"}
+
+
+@pytest.mark.asyncio
+async def test_get_wallet_from_replica_does_not_fill_cache(
+    client, session: AsyncSession, monkeypatch
+):
+    wallet = Wallet(email="test@example.com", balance=700)
+    session.add(wallet)
+    await session.commit()
+    monkeypatch.setattr(db_helper, "is_replica_session", lambda session: True)
+
+    response = await client.get(f"/api/v1/wallets/{wallet.id}")
+    assert response.json()["balance"] == "7.00"
+    assert await balance_cache.get(wallet.id) is None
@@ -0,0 +1,46 @@
+import pytest
+
+from benchmarks.wallet_api import compare_with_baseline, in_process_client, run_scenario
+
+
+@pytest.mark.parametrize("scenario", ["deposit", "withdraw"])
+@pytest.mark.asyncio
+async def test_benchmark_scenario_keeps_balances(tmp_path, scenario: str):
+    async with in_process_client(f"sqlite+aiosqlite:///{tmp_path / 'bench.db'}") as (
+        client,
+        counter,
+    ):
+        result = await run_scenario(
+            client,
+            counter,
+            scenario,
+            "zipf",
+            wallets=5,
+            requests=40,
+            concurrency=4,
+        )
+
+    assert result["errors"] == 0
+    assert result["balance_drift"] == 0
+    assert result["db_round_trips_per_request"] > 0
+    assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+
+
+def test_compare_with_baseline():
+    baseline = {"deposit/zipf": {"ops_per_sec": 100, "p99_ms": 10}}
+    result = {
+        "scenario": "deposit",
+        "distribution": "zipf",
+        "ops_per_sec": 70,
+        "p99_ms": 11,
+        "balance_drift": 1,
+    }
+
+    failures = compare_with_baseline([result], baseline, max_regression=0.2)
+    assert len(failures) == 2
+    assert (
+        compare_with_baseline(
+            [result | {"ops_per_sec": 90, "balance_drift": 0}], baseline, 0.2
+        )
+        == []
+    )
@@ -0,0 +1,81 @@
+import asyncio
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.api_v1.wallet.schemas import OperationCreate
+from app.crud.coalescer import OperationCoalescer
+from app.models import Operation, OperationType, Wallet
+
+
+async def create_wallet(session_factory, balance: int) -> Wallet:
+    async with session_factory() as session:
+        wallet = Wallet(email=f"{uuid4()}@example.com", balance=balance)
+        session.add(wallet)
+        await session.commit()
+    return wallet
+
+
+@pytest.mark.asyncio
+async def test_coalescer_applies_operations_in_order(session_factory):
+    wallet = await create_wallet(session_factory, 1000)
+    coalescer = OperationCoalescer(session_factory, window_ms=20, max_batch=100)
+    operations = [
+        OperationCreate(operation_type=OperationType.WITHDRAW, amount=Decimal("8")),
+        OperationCreate(operation_type=OperationType.WITHDRAW, amount=Decimal("5")),
+        OperationCreate(operation_type=OperationType.DEPOSIT, amount=Decimal("5")),
+        OperationCreate(operation_type=OperationType.WITHDRAW, amount=Decimal("5")),
+    ]
+
+    results = await asyncio.gather(
+        *(coalescer.submit(wallet.id, operation) for operation in operations),
+        return_exceptions=True,
+    )
+
+    assert results[0].amount == 800
+    assert isinstance(results[1], HTTPException)
+    assert results[1].status_code == 422
+    assert results[2].operation_type == OperationType.DEPOSIT
+    assert results[3].operation_type == OperationType.WITHDRAW
+    async with session_factory() as session:
+        assert (
+            await session.scalar(select(Wallet.balance).where(Wallet.id == wallet.id))
+            == 200
+        )
+        assert await session.scalar(select(func.count(Operation.id))) == 3
+
+
+@pytest.mark.asyncio
+async def test_coalescer_splits_by_max_batch(session_factory):
+    wallet = await create_wallet(session_factory, 0)
+    coalescer = OperationCoalescer(session_factory, window_ms=1000, max_batch=3)
+    operation = OperationCreate(
+        operation_type=OperationType.DEPOSIT, amount=Decimal("1")
+    )
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*(coalescer.submit(wallet.id, operation) for _ in range(7))),
+        timeout=5,
+    )
+
+    assert len({result.id for result in results}) == 7
+    async with session_factory() as session:
+        assert (
+            await session.scalar(select(Wallet.balance).where(Wallet.id == wallet.id))
+            == 700
+        )
+
+
+@pytest.mark.asyncio
+async def test_coalescer_wallet_not_found(session_factory):
+    coalescer = OperationCoalescer(session_factory, window_ms=1, max_batch=10)
+    operation = OperationCreate(
+        operation_type=OperationType.DEPOSIT, amount=Decimal("1")
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await coalescer.submit(uuid4(), operation)
+    assert exc_info.value.status_code == 404
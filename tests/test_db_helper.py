@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.db_helper import DataBaseHelper
+
+
+@pytest.mark.asyncio
+async def test_pool_status(tmp_path):
+    helper = DataBaseHelper(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'test.db'}",
+        pool_size=2,
+        max_overflow=1,
+        pool_pre_ping=True,
+    )
+    try:
+        async with helper.session_factory() as session:
+            await session.execute(text("SELECT 1"))
+            assert helper.pool_status() == {
+                "size": 2,
+                "checked_in": 0,
+                "checked_out": 1,
+                "overflow": -1,
+            }
+        assert helper.pool_status()["checked_in"] == 1
+    finally:
+        await helper.dispose()
+
+
+@pytest.mark.asyncio
+async def test_replicas_round_robin(replicated_helper):
+    picked = [replicated_helper.read_session_factory() for _ in range(4)]
+    first, second = (replica.session_factory for replica in replicated_helper.replicas)
+    assert picked == [first, second, first, second]
+
+
+@pytest.mark.asyncio
+async def test_replicas_least_connections(replicated_helper):
+    replicated_helper.replica_strategy = "least_connections"
+    busy, idle = replicated_helper.replicas
+    async with busy.engine.connect():
+        assert replicated_helper.read_session_factory() is idle.session_factory
+
+
+@pytest.mark.asyncio
+async def test_replica_failover_to_primary(tmp_path):
+    helper = DataBaseHelper(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}",
+        replica_urls=[f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}"],
+    )
+    try:
+        replica = helper.replicas[0]
+        assert helper.read_session_factory() is replica.session_factory
+        async with replica.session_factory() as session:
+            with pytest.raises(OperationalError):
+                await session.execute(text("SELECT 1"))
+        assert replica.down
+        assert helper.read_session_factory() is helper.session_factory
+
+        # Реплика возвращается только после успешной фоновой проверки.
+        assert not await replica.probe()
+        assert replica.down
+        (tmp_path / "missing").mkdir()
+        assert await replica.probe()
+        assert helper.read_session_factory() is replica.session_factory
+    finally:
+        await helper.dispose()
+
+
+@pytest.mark.asyncio
+async def test_replica_monitor(tmp_path):
+    helper = DataBaseHelper(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}",
+        replica_urls=[f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"],
+        replica_retry_seconds=0.01,
+    )
+    try:
+        replica = helper.replicas[0]
+        replica.down = True
+        helper.start_replica_monitor()
+        for _ in range(100):
+            if not replica.down:
+                break
+            await asyncio.sleep(0.01)
+        assert not replica.down
+    finally:
+        await helper.stop_replica_monitor()
+        await helper.dispose()
+
+
+@pytest.mark.asyncio
+async def test_replica_session_getter_read_your_writes(replicated_helper):
+    sessions = replicated_helper.replica_session_getter(x_consistency="strict")
+    session = await anext(sessions)
+    assert session.bind is replicated_helper.engine
+    await sessions.aclose()
+
+    sessions = replicated_helper.replica_session_getter()
+    session = await anext(sessions)
+    assert session.bind is replicated_helper.replicas[0].engine
+    # Соединение берётся из пула только при первом запросе.
+    assert replicated_helper.replicas[0].checked_out() == 0
+    await sessions.aclose()
+
+
+@pytest.mark.asyncio
+async def test_pool_status_of_replica(replicated_helper):
+    replica = replicated_helper.replicas[0]
+    async with replica.engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+        assert replicated_helper.pool_status(replica.engine)["checked_out"] == 1
+        assert replicated_helper.pool_status()["checked_out"] == 0
+
+
+@pytest.mark.asyncio
+async def test_warm_up(tmp_path):
+    helper = DataBaseHelper(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'test.db'}",
+        pool_size=3,
+        replica_urls=[f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}"],
+    )
+    try:
+        assert await helper.warm_up() == 3
+        assert helper.pool_status()["checked_in"] == 3
+    finally:
+        await helper.dispose()
@@ -0,0 +1,120 @@
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import idempotency_cache
+from app.core.config import settings
+from app.crud.operation import purge_idempotency_keys
+from app.models import Operation, OperationIdempotencyKey, Wallet
+
+
+@pytest.mark.parametrize("operation_mode", ["orm", "single_statement"])
+@pytest.mark.asyncio
+async def test_operation_replay_is_not_applied_twice(
+    client,
+    session: AsyncSession,
+    monkeypatch,
+    wallet: Wallet,
+    operation_mode: str,
+):
+    monkeypatch.setattr(settings.wallet, "operation_mode", operation_mode)
+    url = f"/api/v1/wallets/{wallet.id}/operation"
+    body = {"operation_type": "DEPOSIT", "amount": "10"}
+    headers = {"Idempotency-Key": "retry-1"}
+
+    first = await client.post(url, json=body, headers=headers)
+    idempotency_cache.clear()
+    second = await client.post(url, json=body, headers=headers)
+    third = await client.post(url, json=body, headers=headers)
+
+    assert first.status_code == second.status_code == third.status_code == 200
+    assert first.json()["id"] == second.json()["id"] == third.json()["id"]
+    assert Decimal(second.json()["amount"]) == Decimal("10")
+    await session.refresh(wallet)
+    assert wallet.balance == 1000
+    count = await session.scalar(select(func.count()).select_from(Operation))
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_operation_replay_with_other_amount(client, wallet: Wallet):
+    url = f"/api/v1/wallets/{wallet.id}/operation"
+    headers = {"Idempotency-Key": "retry-2"}
+    await client.post(
+        url, json={"operation_type": "DEPOSIT", "amount": "10"}, headers=headers
+    )
+
+    response = await client.post(
+        url, json={"operation_type": "DEPOSIT", "amount": "20"}, headers=headers
+    )
+    assert response.status_code == 409
+    assert response.json() == {
+        "detail": "Ключ идемпотентности уже использован для другой операции"
+    }
+
+
+@pytest.mark.asyncio
+async def test_purge_idempotency_keys(client, session: AsyncSession, wallet: Wallet):
+    url = f"/api/v1/wallets/{wallet.id}/operation"
+    body = {"operation_type": "DEPOSIT", "amount": "10"}
+    headers = {"Idempotency-Key": "retry-3"}
+    await client.post(url, json=body, headers=headers)
+    await session.execute(
+        update(OperationIdempotencyKey).values(created_at=datetime(2026, 1, 1, 12, 0))
+    )
+    await session.commit()
+
+    assert await purge_idempotency_keys(session, timedelta(hours=24)) == 1
+    idempotency_cache.clear()
+    response = await client.post(url, json=body, headers=headers)
+    assert response.status_code == 200
+    await session.refresh(wallet)
+    assert wallet.balance == 2000
+
+
+# Модуль импортируется в отдельном процессе, как при запуске через
+# ``python -m``: в процессе тестов модули уже импортированы и циклический
+# импорт не проявился бы.
+PURGE_CLI = """
+import asyncio
+import sys
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.cli import purge_idempotency_keys as cli
+from app.models import Base
+
+# Таблицы создаются и очищаются в разных циклах событий.
+engine = create_async_engine(sys.argv[1], poolclass=NullPool)
+
+
+async def create_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+asyncio.run(create_tables())
+cli.db_helper.session_factory = async_sessionmaker(engine)
+cli.main(["--ttl-hours", "1"])
+"""
+
+
+def test_purge_idempotency_keys_cli(tmp_path):
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            PURGE_CLI,
+            f"sqlite+aiosqlite:///{tmp_path / 'purge.db'}",
+        ],
+        cwd=Path(__file__).resolve().parent.parent,
+        check=True,
+        timeout=60,
+    )
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Модуль -> (модули, которые он не должен импортировать, бюджет в секундах).
+# Запрещённые модули проверяются всегда: тест ловит регрессии вроде создания
+# движка или импорта FastAPI при импорте настроек. Бюджет примерно вдвое
+# больше времени, измеренного на свободной машине, и на загруженном CI
+# ненадёжен, поэтому проверяется только при IMPORT_TIME_BUDGETS=1.
+BUDGETS = {
+    "app.core.config": (
+        {"sqlalchemy", "fastapi", "asyncpg", "email_validator", "app.core.db_helper"},
+        0.6,
+    ),
+    "app.models": ({"fastapi", "asyncpg", "app.core.db_helper"}, 1.0),
+    "main": ({"asyncpg", "uvicorn"}, 2.0),
+}
+
+
+def import_times(module: str) -> dict[str, float]:
+    """Накопленное время импорта каждого модуля (``python -X importtime``)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative) / 1_000_000
+    return times
+
+
+@pytest.mark.parametrize("module", BUDGETS)
+def test_import_time_budget(module):
+    forbidden, budget = BUDGETS[module]
+    times = import_times(module)
+    assert not forbidden & times.keys()
+    if os.environ.get("IMPORT_TIME_BUDGETS") == "1":
+        assert times[module] < budget
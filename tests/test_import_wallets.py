@@ -0,0 +1,54 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select
+
+from app.cli.import_wallets import import_wallets, read_emails
+from app.models import Wallet
+
+
+@pytest.mark.parametrize(
+    ("file_name", "content", "file_format"),
+    [
+        (
+            "wallets.ndjson",
+            '{"email": "a@example.com"}\n"b@example.com"\n\n',
+            "ndjson",
+        ),
+        ("wallets.csv", "email,name\na@example.com,A\nb@example.com,B\n", "csv"),
+    ],
+)
+def test_read_emails(tmp_path: Path, file_name: str, content: str, file_format: str):
+    path = tmp_path / file_name
+    path.write_text(content)
+
+    assert list(read_emails(path, file_format)) == ["a@example.com", "b@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_import_wallets(session_factory):
+    async with session_factory() as session:
+        session.add(Wallet(email="taken@example.com"))
+        await session.commit()
+    output = io.StringIO()
+    duplicates_output = io.StringIO()
+
+    stats = await import_wallets(
+        ["a@example.com", "taken@example.com", "not-an-email", "b@example.com"],
+        session_factory,
+        chunk_size=2,
+        output=output,
+        duplicates_output=duplicates_output,
+    )
+
+    assert stats == {"created": 2, "duplicates": 1, "invalid": 1}
+    created = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(wallet["email"] for wallet in created) == [
+        "a@example.com",
+        "b@example.com",
+    ]
+    assert json.loads(duplicates_output.getvalue()) == {"email": "taken@example.com"}
+    async with session_factory() as session:
+        assert await session.scalar(select(func.count(Wallet.id))) == 3
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.ledger import LedgerCompactor, compact_wallet
+from app.models import Operation, Wallet
+
+
+@pytest.fixture
+def ledger_mode(monkeypatch):
+    monkeypatch.setattr(settings.wallet, "operation_mode", "ledger")
+
+
+@pytest.mark.asyncio
+async def test_ledger_operations_are_appended(
+    client, session: AsyncSession, ledger_mode, wallet: Wallet, get_balance
+):
+    url = f"/api/v1/wallets/{wallet.id}/operation"
+    for operation_type, amount in [
+        ("DEPOSIT", "10"),
+        ("DEPOSIT", "5"),
+        ("WITHDRAW", "3"),
+    ]:
+        response = await client.post(
+            url, json={"operation_type": operation_type, "amount": amount}
+        )
+        assert response.status_code == 200
+
+    response = await client.post(
+        url, json={"operation_type": "WITHDRAW", "amount": "20"}
+    )
+    assert response.status_code == 422
+    await session.refresh(wallet)
+    assert wallet.balance == 0
+    assert await get_balance(wallet) == "12.00"
+
+    await session.commit()
+    assert await compact_wallet(session, wallet.id) == 3
+    await session.refresh(wallet)
+    assert wallet.balance == 1200
+    pending = await session.scalar(
+        select(func.count()).where(Operation.compacted.is_(False))
+    )
+    assert pending == 0
+    assert await get_balance(wallet) == "12.00"
+
+
+@pytest.mark.asyncio
+async def test_ledger_batch_checks_pending_operations(
+    client, ledger_mode, wallet: Wallet, get_balance
+):
+    await client.post(
+        f"/api/v1/wallets/{wallet.id}/operation",
+        json={"operation_type": "DEPOSIT", "amount": "10"},
+    )
+    response = await client.post(
+        "/api/v1/wallets/operations:batch",
+        json={
+            "operations": [
+                {
+                    "wallet_id": str(wallet.id),
+                    "operation_type": "WITHDRAW",
+                    "amount": "7",
+                },
+                {
+                    "wallet_id": str(wallet.id),
+                    "operation_type": "WITHDRAW",
+                    "amount": "7",
+                },
+            ],
+            "atomic": False,
+        },
+    )
+    assert [result["status_code"] for result in response.json()["results"]] == [
+        200,
+        422,
+    ]
+    assert await get_balance(wallet) == "3.00"
+
+
+@pytest.mark.asyncio
+async def test_ledger_compactor(session_factory, ledger_mode):
+    async with session_factory() as session:
+        wallet = Wallet(email="test@example.com", balance=100)
+        session.add(wallet)
+        await session.flush()
+        session.add_all(
+            Operation(
+                wallet_id=wallet.id,
+                operation_type=operation_type,
+                amount=amount,
+                compacted=False,
+            )
+            for operation_type, amount in [
+                ("DEPOSIT", 400),
+                ("WITHDRAW", 200),
+            ]
+        )
+        await session.commit()
+
+    compactor = LedgerCompactor(session_factory, every=2, interval=60)
+    compactor.notify(wallet.id)
+    assert not compactor._running
+    compactor.notify(wallet.id)
+    await asyncio.gather(*compactor._running.values())
+
+    async with session_factory() as session:
+        assert await session.scalar(select(Wallet.balance)) == 300
+        assert await compactor.sweep() == 0
@@ -0,0 +1,71 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+import main
+from app.api_v1.wallet.schemas import OperationCreate
+from app.core.config import settings
+from app.crud.coalescer import OperationCoalescer
+from app.models import OperationType, Wallet
+
+
+@pytest.mark.parametrize(
+    ("budget", "workers", "broker", "expected"),
+    [
+        (0, 4, "memory", (5, 10)),
+        (40, 2, "memory", (5, 10)),
+        (32, 4, "memory", (5, 3)),
+        (12, 4, "memory", (3, 0)),
+        (12, 2, "postgres", (5, 0)),
+        (2, 4, "memory", (1, 0)),
+    ],
+)
+def test_worker_pool(monkeypatch, budget, workers, broker, expected):
+    monkeypatch.setattr(settings.db, "pool_size", 5)
+    monkeypatch.setattr(settings.db, "max_overflow", 10)
+    monkeypatch.setattr(settings.db, "connection_budget", budget)
+    monkeypatch.setattr(settings.server, "workers", workers)
+    monkeypatch.setattr(settings.events, "broker", broker)
+    assert settings.worker_pool == expected
+
+
+@pytest.mark.asyncio
+async def test_lifespan_drains_operations(session_factory, monkeypatch):
+    calls = []
+
+    async def warm_up():
+        calls.append("warm_up")
+        return 0
+
+    async def dispose():
+        calls.append("dispose")
+
+    coalescer = OperationCoalescer(session_factory, window_ms=50, max_batch=100)
+    monkeypatch.setattr(main.db_helper, "warm_up", warm_up)
+    monkeypatch.setattr(main.db_helper, "dispose", dispose)
+    monkeypatch.setattr(main, "operation_coalescer", coalescer)
+    async with session_factory() as session:
+        wallet = Wallet(email="test@example.com", balance=0)
+        session.add(wallet)
+        await session.commit()
+
+    async with main.lifespan(main.app):
+        assert calls == ["warm_up"]
+        operation = OperationCreate(
+            operation_type=OperationType.DEPOSIT, amount=Decimal("1")
+        )
+        pending = [
+            asyncio.create_task(coalescer.submit(wallet.id, operation))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+
+    assert calls == ["warm_up", "dispose"]
+    assert all(task.done() and not task.exception() for task in pending)
+    async with session_factory() as session:
+        assert (
+            await session.scalar(select(Wallet.balance).where(Wallet.id == wallet.id))
+            == 300
+        )
@@ -0,0 +1,94 @@
+import io
+import json
+import logging
+import queue
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+from app.core.logger import (
+    DroppingQueueHandler,
+    JsonFormatter,
+    RouteSampler,
+    request_scope,
+)
+
+
+def make_record(level: int = logging.INFO, **extra) -> logging.LogRecord:
+    record = logging.makeLogRecord(
+        {
+            "name": "test",
+            "levelno": level,
+            "levelname": logging.getLevelName(level),
+            "msg": "Кошелёк %s получен",
+            "args": ("abc",),
+        }
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter():
+    wallet_id = uuid.uuid4()
+    data = json.loads(JsonFormatter().format(make_record(wallet_id=wallet_id)))
+    assert data["level"] == "INFO"
+    assert data["message"] == "Кошелёк abc получен"
+    assert data["wallet_id"] == str(wallet_id)
+    assert "args" not in data
+
+
+def test_route_sampler():
+    sampler = RouteSampler(1.0, {"GET /api/v1/wallets/{wallet_id}": 0.0})
+    # Вне запроса записи не отбрасываются.
+    assert sampler.filter(make_record())
+
+    route = SimpleNamespace(path="/api/v1/wallets/{wallet_id}")
+    token = request_scope.set(
+        {"method": "GET", "path": "/api/v1/wallets/1", "route": route}
+    )
+    try:
+        record = make_record()
+        assert not sampler.filter(record)
+        assert record.route == "/api/v1/wallets/{wallet_id}"
+        assert sampler.filter(make_record(logging.WARNING))
+
+        request_scope.get()["method"] = "POST"
+        assert sampler.filter(make_record())
+    finally:
+        request_scope.reset(token)
+
+
+def test_dropping_queue_handler():
+    handler = DroppingQueueHandler(queue.Queue(2))
+    for _ in range(5):
+        handler.handle(make_record())
+    assert handler.dropped == 3
+
+    # Сообщение форматирует поток записи при выводе.
+    record = handler.queue.get_nowait()
+    assert record.args == ("abc",)
+    stream = io.StringIO()
+    writer = logging.StreamHandler(stream)
+    writer.setFormatter(JsonFormatter())
+    writer.handle(record)
+    assert json.loads(stream.getvalue())["message"] == "Кошелёк abc получен"
+
+
+def test_import_has_no_side_effects():
+    # Логирование настраивают lifespan и скрипты: импорт модуля не читает
+    # настройки, не запускает поток записи и не добавляет обработчики.
+    code = (
+        "import logging, threading\n"
+        "from app.core import config\n"
+        "import app.core.logger\n"
+        "assert config.get_settings.cache_info().currsize == 0\n"
+        "assert threading.active_count() == 1\n"
+        "assert not logging.getLogger().handlers\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parent.parent,
+        check=True,
+    )
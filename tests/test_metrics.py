@@ -0,0 +1,67 @@
+import re
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db_helper import DataBaseHelper
+from app.core.metrics import Histogram, RequestStats, instrument_engine, request_stats
+from app.models import Wallet
+
+
+def test_histogram_buckets():
+    histogram = Histogram([0.1, 1.0])
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    lines = histogram.render("latency", 'route="/"')
+    assert lines == [
+        'latency_bucket{route="/",le="0.1"} 2',
+        'latency_bucket{route="/",le="1.0"} 3',
+        'latency_bucket{route="/",le="+Inf"} 4',
+        'latency_sum{route="/"} 2.65',
+        'latency_count{route="/"} 4',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_server_timing_and_metrics(client, session: AsyncSession):
+    instrument_engine(session.bind)
+    wallet = Wallet(email="test@example.com", balance=0)
+    session.add(wallet)
+    await session.commit()
+
+    response = await client.post(
+        f"/api/v1/wallets/{wallet.id}/operation",
+        json={"operation_type": "DEPOSIT", "amount": "10"},
+    )
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    queries = int(re.search(r'desc="(\d+) queries"', timing).group(1))
+    assert queries >= 2
+    assert "pool;dur=" in timing
+    assert "app;dur=" in timing
+
+    metrics = (await client.get("/metrics")).text
+    assert (
+        'db_statements_per_request_count{method="POST",'
+        'route="/api/v1/wallets/{wallet_id}/operation"}'
+    ) in metrics
+
+
+@pytest.mark.asyncio
+async def test_pool_wait_is_recorded(tmp_path):
+    helper = DataBaseHelper(url=f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    instrument_engine(helper.engine)
+    stats = RequestStats()
+    token = request_stats.set(stats)
+    try:
+        async with helper.session_factory() as session:
+            await session.execute(text("SELECT 1"))
+    finally:
+        request_stats.reset(token)
+        await helper.dispose()
+
+    assert stats.statements == 1
+    assert stats.pool_wait > 0
+    assert stats.db_time > 0
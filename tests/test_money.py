@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+import pytest
+
+from app.core.money import format_minor, to_minor
+
+
+@pytest.mark.parametrize(
+    ("amount", "currency", "minor"),
+    [
+        ("10", "RUB", 1000),
+        ("0.01", "USD", 1),
+        ("1234.5", "EUR", 123450),
+        ("500", "JPY", 500),
+        ("1.005", "KWD", 1005),
+    ],
+)
+def test_to_minor(amount: str, currency: str, minor: int):
+    assert to_minor(Decimal(amount), currency) == minor
+
+
+@pytest.mark.parametrize(
+    ("amount", "currency"),
+    [("0.001", "RUB"), ("0.5", "JPY"), ("1e30", "USD")],
+)
+def test_to_minor_rejects_unrepresentable(amount: str, currency: str):
+    with pytest.raises(ValueError):
+        to_minor(Decimal(amount), currency)
+
+
+@pytest.mark.parametrize(
+    ("minor", "currency", "formatted"),
+    [
+        (123405, "RUB", "1234.05"),
+        (7, "USD", "0.07"),
+        (-150, "RUB", "-1.50"),
+        (500, "JPY", "500"),
+        (1005, "BHD", "1.005"),
+    ],
+)
+def test_format_minor(minor: int, currency: str, formatted: str):
+    assert format_minor(minor, currency) == formatted
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import db_helper
+from app.models import Operation, OperationType, Wallet
+from main import app
+
+
+@pytest.fixture
+async def wallets_with_history(session: AsyncSession) -> list[Wallet]:
+    wallets = [Wallet(email=f"test{i}@example.com", balance=0) for i in range(2)]
+    session.add_all(wallets)
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    session.add_all(
+        Operation(
+            wallet=wallets[i % 2],
+            operation_type=OperationType.DEPOSIT,
+            amount=(i + 1) * 100,
+            created_at=start + timedelta(minutes=i),
+        )
+        for i in range(6)
+    )
+    await session.commit()
+    return wallets
+
+
+@pytest.fixture
+async def export_client(client, session: AsyncSession):
+    app.dependency_overrides[db_helper.stream_session_getter] = lambda: session
+    return client
+
+
+@pytest.mark.asyncio
+async def test_export_operations_ndjson(export_client, wallets_with_history):
+    wallet = wallets_with_history[0]
+    response = await export_client.get(
+        f"/api/v1/wallets/{wallet.id}/operations/export",
+        params={"created_from": "2026-01-01T12:01:00"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["amount"] for row in rows] == ["3.00", "5.00"]
+    assert {row["wallet_id"] for row in rows} == {str(wallet.id)}
+
+
+@pytest.mark.asyncio
+async def test_export_operations_csv(export_client, wallets_with_history):
+    response = await export_client.get(
+        "/api/v1/wallets/operations/export",
+        params={"format": "csv", "created_to": "2026-01-01T12:04:00"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert sorted(Decimal(row["amount"]) for row in rows) == [
+        Decimal(i) for i in range(1, 5)
+    ]
+    assert rows[0].keys() == {
+        "id",
+        "wallet_id",
+        "operation_type",
+        "amount",
+        "currency",
+        "created_at",
+    }
+
+
+@pytest.mark.asyncio
+async def test_export_operations_wallet_not_found(export_client):
+    response = await export_client.get(f"/api/v1/wallets/{uuid4()}/operations/export")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Кошелёк не найден"}
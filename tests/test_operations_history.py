@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Operation, OperationType, Wallet
+
+
+@pytest.fixture
+async def wallet_with_history(session: AsyncSession) -> Wallet:
+    wallet = Wallet(email="test@example.com", balance=0)
+    session.add(wallet)
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    session.add_all(
+        Operation(
+            wallet=wallet,
+            operation_type=OperationType.DEPOSIT if i % 2 else OperationType.WITHDRAW,
+            amount=(i + 1) * 100,
+            created_at=start + timedelta(minutes=i // 2),
+        )
+        for i in range(7)
+    )
+    await session.commit()
+    return wallet
+
+
+@pytest.mark.asyncio
+async def test_list_operations_pages(client, wallet_with_history: Wallet):
+    url = f"/api/v1/wallets/{wallet_with_history.id}/operations"
+    amounts = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 3} | ({"cursor": cursor} if cursor else {})
+        response = await client.get(url, params=params)
+        assert response.status_code == 200
+        data = response.json()
+        amounts.extend(Decimal(item["amount"]) for item in data["items"])
+        pages += 1
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert sorted(amounts) == [Decimal(i) for i in range(1, 8)]
+    assert amounts[0] == Decimal("7")
+
+
+@pytest.mark.asyncio
+async def test_list_operations_filters(client, wallet_with_history: Wallet):
+    response = await client.get(
+        f"/api/v1/wallets/{wallet_with_history.id}/operations",
+        params={
+            "operation_type": "DEPOSIT",
+            "created_from": "2026-01-01T12:01:00",
+            "created_to": "2026-01-01T12:03:00",
+        },
+    )
+    assert response.status_code == 200
+    assert [item["amount"] for item in response.json()["items"]] == ["6.00", "4.00"]
+
+
+@pytest.mark.asyncio
+async def test_list_operations_invalid_cursor(client, wallet_with_history: Wallet):
+    response = await client.get(
+        f"/api/v1/wallets/{wallet_with_history.id}/operations",
+        params={"cursor": "broken"},
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Некорректный курсор"}
+
+
+@pytest.mark.asyncio
+async def test_list_operations_wallet_not_found(client):
+    response = await client.get(f"/api/v1/wallets/{uuid4()}/operations")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Кошелёк не найден"}
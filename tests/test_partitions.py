@@ -0,0 +1,93 @@
+from contextlib import asynccontextmanager
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import partitions
+from app.crud.partitions import (
+    add_months,
+    archive_partitions,
+    create_partitions,
+    partition_month,
+    partition_name,
+)
+
+
+@pytest.mark.parametrize(
+    ("value", "months", "expected"),
+    [
+        (date(2026, 10, 17), 0, date(2026, 10, 1)),
+        (date(2026, 10, 17), 3, date(2027, 1, 1)),
+        (date(2026, 1, 31), -1, date(2025, 12, 1)),
+        (date(2026, 12, 1), -24, date(2024, 12, 1)),
+    ],
+)
+def test_add_months(value, months, expected):
+    assert add_months(value, months) == expected
+
+
+def test_partition_name():
+    assert partition_name(date(2026, 3, 1)) == "operations_p202603"
+    assert partition_month("operations_p202603") == date(2026, 3, 1)
+    assert partition_month("operations_unpartitioned") is None
+
+
+@pytest.mark.asyncio
+async def test_partitions_sqlite_noop(session: AsyncSession, tmp_path):
+    engine = session.bind
+    assert await create_partitions(engine, 3) == []
+    assert await archive_partitions(engine, 1, tmp_path / "archive") == []
+    assert not (tmp_path / "archive").exists()
+
+
+class RecordingEngine:
+    """Движок PostgreSQL, который только записывает выполненные запросы."""
+
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    def execution_options(self, **options):
+        return self
+
+    @asynccontextmanager
+    async def connect(self):
+        yield self
+
+    begin = connect
+
+    async def execute(self, statement, *args):
+        self.statements.append(str(statement))
+
+
+@pytest.mark.asyncio
+async def test_archive_finalizes_pending_detach(monkeypatch, tmp_path):
+    async def partition_tables(engine):
+        return {
+            "operations_p202601": "detach_pending",
+            "operations_p202602": "attached",
+            "operations_p202603": "detached",
+        }
+
+    async def export_table(engine, name, path):
+        path.write_bytes(b"")
+
+    monkeypatch.setattr(partitions, "_partition_tables", partition_tables)
+    monkeypatch.setattr(partitions, "_export_table", export_table)
+    engine = RecordingEngine()
+
+    archived = await archive_partitions(engine, 1, tmp_path, today=date(2026, 10, 17))
+
+    assert [path.name for path in archived] == [
+        "operations_p202601.csv.gz",
+        "operations_p202602.csv.gz",
+        "operations_p202603.csv.gz",
+    ]
+    detaches = [sql for sql in engine.statements if "DETACH" in sql]
+    assert detaches == [
+        "ALTER TABLE operations DETACH PARTITION operations_p202601 FINALIZE",
+        "ALTER TABLE operations DETACH PARTITION operations_p202602 CONCURRENTLY",
+    ]
@@ -0,0 +1,29 @@
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from app.api_v1.wallet.schemas import OperationResponse
+from app.core.responses import ModelResponse
+from app.models import OperationType
+
+
+def test_model_response():
+    operation = OperationResponse(
+        id=uuid.uuid4(),
+        wallet_id=uuid.uuid4(),
+        operation_type=OperationType.DEPOSIT,
+        amount=150,
+        currency="RUB",
+        created_at=datetime(2026, 10, 17, 12, 0),
+    )
+    response = ModelResponse(operation)
+    assert response.media_type == "application/json"
+    assert response.body == operation.model_dump_json().encode()
+    data = json.loads(response.body)
+    assert data["amount"] == "1.50"
+    assert data["operation_type"] == "DEPOSIT"
+    assert data["created_at"] == "2026-10-17T12:00:00"
+
+    response = ModelResponse({"amount": Decimal("1.50"), "id": operation.id})
+    assert json.loads(response.body) == {"amount": "1.50", "id": str(operation.id)}
@@ -0,0 +1,120 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+from app.crud import wallet as wallet_crud
+from app.crud.transaction import isolation_level, run_transaction
+from app.models import OperationType, Wallet
+
+
+class DriverError(Exception):
+    def __init__(self, sqlstate: str) -> None:
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+def db_error(sqlstate: str) -> OperationalError:
+    return OperationalError("UPDATE wallets", {}, DriverError(sqlstate))
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings.transaction, "base_delay_ms", 0)
+    monkeypatch.setattr(settings.transaction, "max_attempts", 3)
+
+
+def failing(errors: list[Exception]):
+    attempts = []
+
+    async def work():
+        attempts.append(1)
+        if errors:
+            raise errors.pop(0)
+        return len(attempts)
+
+    return work, attempts
+
+
+@pytest.mark.asyncio
+async def test_run_transaction_retries_lock_conflicts(session: AsyncSession):
+    retries = metrics_registry.retries["40P01"]
+    work, attempts = failing([db_error("40P01"), db_error("40001")])
+
+    assert await run_transaction(session, work) == 3
+    assert len(attempts) == 3
+    assert metrics_registry.retries["40P01"] == retries + 1
+
+
+@pytest.mark.asyncio
+async def test_run_transaction_does_not_retry_other_errors(session: AsyncSession):
+    work, attempts = failing([db_error("23505")])
+
+    with pytest.raises(OperationalError):
+        await run_transaction(session, work)
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_run_transaction_gives_up(session: AsyncSession, monkeypatch):
+    exhausted = metrics_registry.retries_exhausted["55P03"]
+    work, attempts = failing([db_error("55P03")] * 5)
+
+    with pytest.raises(OperationalError):
+        await run_transaction(session, work)
+    assert len(attempts) == 3
+    assert metrics_registry.retries_exhausted["55P03"] == exhausted + 1
+
+    monkeypatch.setattr(settings.transaction, "base_delay_ms", 10)
+    monkeypatch.setattr(settings.transaction, "deadline_ms", 0)
+    work, attempts = failing([db_error("55P03")] * 5)
+    with pytest.raises(OperationalError):
+        await run_transaction(session, work)
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_run_transaction_isolation_level(session: AsyncSession, monkeypatch):
+    async def work():
+        connection = await session.connection()
+        return await connection.get_isolation_level()
+
+    assert await run_transaction(session, work, "SERIALIZABLE") == "SERIALIZABLE"
+
+    monkeypatch.setattr(settings.transaction, "withdraw_isolation", "SERIALIZABLE")
+    monkeypatch.setattr(settings.transaction, "deposit_isolation", "REPEATABLE READ")
+    assert isolation_level([OperationType.DEPOSIT]) == "REPEATABLE READ"
+    assert (
+        isolation_level([OperationType.DEPOSIT, OperationType.WITHDRAW])
+        == "SERIALIZABLE"
+    )
+    monkeypatch.setattr(settings.transaction, "deposit_isolation", None)
+    assert isolation_level([OperationType.DEPOSIT]) is None
+
+
+@pytest.mark.asyncio
+async def test_create_operation_lock_conflict(
+    client, session: AsyncSession, monkeypatch
+):
+    wallet = Wallet(email="test@example.com", balance=1000)
+    session.add(wallet)
+    await session.commit()
+    monkeypatch.setattr(settings.wallet, "operation_mode", "single_statement")
+    errors = [db_error("40001")]
+    apply_operation = wallet_crud._apply_operation_single_statement
+
+    async def conflicting(*args):
+        if errors:
+            raise errors.pop(0)
+        return await apply_operation(*args)
+
+    monkeypatch.setattr(wallet_crud, "_apply_operation_single_statement", conflicting)
+    url = f"/api/v1/wallets/{wallet.id}/operation"
+    response = await client.post(url, json={"operation_type": "DEPOSIT", "amount": "5"})
+    assert response.status_code == 200
+
+    errors.extend([db_error("40001")] * 3)
+    response = await client.post(url, json={"operation_type": "DEPOSIT", "amount": "5"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
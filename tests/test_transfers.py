@@ -0,0 +1,146 @@
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import Operation, OperationType, Wallet
+
+
+@pytest.fixture
+async def wallets(session: AsyncSession) -> tuple[Wallet, Wallet]:
+    first = Wallet(email="first@example.com", balance=1000)
+    second = Wallet(email="second@example.com", balance=0)
+    session.add_all([first, second])
+    await session.commit()
+    return first, second
+
+
+async def get_balances(client, session: AsyncSession, *wallet_ids) -> list[str]:
+    balances = []
+    for wallet_id in wallet_ids:
+        response = await client.get(
+            f"/api/v1/wallets/{wallet_id}",
+            headers={"X-Consistency": "strict"},
+        )
+        balances.append(response.json()["balance"])
+    await session.commit()
+    return balances
+
+
+@pytest.mark.parametrize("operation_mode", ["single_statement", "ledger"])
+@pytest.mark.asyncio
+async def test_create_transfer(
+    client,
+    session: AsyncSession,
+    monkeypatch,
+    wallets: tuple[Wallet, Wallet],
+    operation_mode: str,
+):
+    monkeypatch.setattr(settings.wallet, "operation_mode", operation_mode)
+    first, second = wallets
+
+    response = await client.post(
+        "/api/v1/transfers",
+        json={
+            "from_wallet_id": str(first.id),
+            "to_wallet_id": str(second.id),
+            "amount": "2.50",
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["outgoing"]["operation_type"] == "TRANSFER_OUT"
+    assert data["outgoing"]["wallet_id"] == str(first.id)
+    assert data["incoming"]["operation_type"] == "TRANSFER_IN"
+    assert data["incoming"]["amount"] == "2.50"
+    assert await get_balances(client, session, first.id, second.id) == ["7.50", "2.50"]
+
+    operations = (
+        await session.execute(select(Operation.operation_type, Operation.transfer_id))
+    ).all()
+    await session.commit()
+    assert {operation_type for operation_type, _ in operations} == {
+        OperationType.TRANSFER_OUT,
+        OperationType.TRANSFER_IN,
+    }
+    assert {str(transfer_id) for _, transfer_id in operations} == {data["id"]}
+
+
+@pytest.mark.asyncio
+async def test_create_transfer_errors(client, session: AsyncSession, wallets):
+    first, second = wallets
+    usd = Wallet(email="usd@example.com", balance=1000, currency="USD")
+    session.add(usd)
+    await session.commit()
+    cases = [
+        (second.id, first.id, "1", 422, "Недостаточно средств"),
+        (first.id, usd.id, "1", 422, "Валюты кошельков не совпадают"),
+        (first.id, uuid4(), "1", 404, "Кошелёк не найден"),
+    ]
+    for source, target, amount, status_code, detail in cases:
+        response = await client.post(
+            "/api/v1/transfers",
+            json={
+                "from_wallet_id": str(source),
+                "to_wallet_id": str(target),
+                "amount": amount,
+            },
+        )
+        assert response.status_code == status_code
+        assert response.json() == {"detail": detail}
+
+    response = await client.post(
+        "/api/v1/transfers",
+        json={
+            "from_wallet_id": str(first.id),
+            "to_wallet_id": str(first.id),
+            "amount": "1",
+        },
+    )
+    assert response.status_code == 422
+    assert await get_balances(client, session, first.id, second.id) == ["10.00", "0.00"]
+
+
+@pytest.mark.asyncio
+async def test_create_transfers_batch(client, session: AsyncSession, wallets):
+    first, second = wallets
+    # После отката атомарного пакета объекты сессии истекают.
+    first_id, second_id = first.id, second.id
+    transfer = {"from_wallet_id": str(first.id), "to_wallet_id": str(second.id)}
+    back = {"from_wallet_id": str(second.id), "to_wallet_id": str(first.id)}
+
+    response = await client.post(
+        "/api/v1/transfers:batch",
+        json={
+            "atomic": False,
+            "transfers": [
+                {**transfer, "amount": "6"},
+                {**transfer, "amount": "6"},
+                {**back, "amount": "1"},
+            ],
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status_code"] for result in results] == [200, 422, 200]
+    assert await get_balances(client, session, first.id, second.id) == ["5.00", "5.00"]
+
+    response = await client.post(
+        "/api/v1/transfers:batch",
+        json={"transfers": [{**transfer, "amount": "1"}, {**back, "amount": "100"}]},
+    )
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Перевод 1: Недостаточно средств"}
+    assert await get_balances(client, session, first_id, second_id) == ["5.00", "5.00"]
+
+
+@pytest.mark.asyncio
+async def test_operation_rejects_transfer_type(client, wallets):
+    first, _ = wallets
+    response = await client.post(
+        f"/api/v1/wallets/{first.id}/operation",
+        json={"operation_type": "TRANSFER_IN", "amount": "1"},
+    )
+    assert response.status_code == 422
@@ -0,0 +1,102 @@
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api_v1.wallet import views
+from app.core import db_helper
+from app.core.cache import email_cache
+from app.crud.wallet import create_wallets_bulk
+from app.models import Wallet
+from main import app
+
+
+@pytest.fixture(autouse=True)
+def clear_email_cache():
+    email_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_wallet_by_email(client, session: AsyncSession, monkeypatch):
+    lookups = []
+    get_wallet_by_email = views.get_wallet_by_email
+
+    async def counting_get_wallet_by_email(session, email):
+        lookups.append(email)
+        return await get_wallet_by_email(session, email)
+
+    monkeypatch.setattr(views, "get_wallet_by_email", counting_get_wallet_by_email)
+
+    for _ in range(3):
+        response = await client.get("/api/v1/wallets/by-email/New@Example.com")
+        await session.commit()
+        assert response.status_code == 404
+    assert lookups == ["new@example.com"]
+
+    response = await client.post(
+        "/api/v1/wallets/create-wallet", json={"email": "NEW@example.com"}
+    )
+    assert response.status_code == 201
+    created = response.json()
+    assert created["email"] == "new@example.com"
+
+    response = await client.post(
+        "/api/v1/wallets/create-wallet", json={"email": "new@EXAMPLE.com"}
+    )
+    assert response.status_code == 409
+
+    # Создание кошелька удаляет отметку «кошелька нет» из кэша.
+    for _ in range(2):
+        response = await client.get("/api/v1/wallets/by-email/new@example.COM")
+        await session.commit()
+        assert response.status_code == 200
+        assert response.json() == created
+    assert len(lookups) == 2
+
+
+@pytest.mark.asyncio
+async def test_create_wallets_bulk_normalizes_email(session: AsyncSession):
+    created, duplicates = await create_wallets_bulk(
+        session, ["Bulk@Example.com", "bulk@example.com", " other@example.com"]
+    )
+    assert [email for _, email in created] == [
+        "bulk@example.com",
+        "other@example.com",
+    ]
+    assert duplicates == []
+
+    created, duplicates = await create_wallets_bulk(session, ["BULK@example.com"])
+    assert created == []
+    assert duplicates == ["bulk@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_wallet_by_email_replica_miss_not_cached(replicated_helper, monkeypatch):
+    replicas = [replica.engine for replica in replicated_helper.replicas]
+    for engine in (replicated_helper.engine, *replicas):
+        async with engine.begin() as conn:
+            await conn.run_sync(Wallet.metadata.create_all)
+    monkeypatch.setattr(views, "db_helper", replicated_helper)
+    app.dependency_overrides[db_helper.replica_session_getter] = (
+        replicated_helper.replica_session_getter
+    )
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            # Кошелёк есть только в основной базе: реплика отстаёт.
+            async with replicated_helper.session_factory() as session:
+                session.add(Wallet(email="lag@example.com"))
+                await session.commit()
+
+            response = await client.get("/api/v1/wallets/by-email/lag@example.com")
+            assert response.status_code == 404
+            assert email_cache.get("lag@example.com") is None
+
+            response = await client.get(
+                "/api/v1/wallets/by-email/lag@example.com",
+                headers={"X-Consistency": "strict"},
+            )
+            assert response.status_code == 200
+            assert response.json()["email"] == "lag@example.com"
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,148 @@
+import json
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.api_v1.wallet import views
+from app.core import db_helper
+from app.core.events import EventHub, PostgresBroker, event_hub
+from app.models import Wallet
+from main import app
+
+
+@pytest.mark.asyncio
+async def test_hub_drops_slow_subscriber():
+    hub = EventHub(buffer_size=2)
+    wallet_id = uuid.uuid4()
+    fast = hub.subscribe(wallet_id)
+    slow = hub.subscribe(wallet_id)
+
+    hub.dispatch(wallet_id, "1")
+    assert await fast.get() == "1"
+    hub.dispatch(wallet_id, "2")
+    hub.dispatch(wallet_id, "3")
+
+    assert slow.dropped
+    assert await slow.get() is None
+    assert [await fast.get(), await fast.get()] == ["2", "3"]
+    hub.dispatch(wallet_id, "4")
+    assert slow.queue.empty()
+    hub.unsubscribe(fast)
+    assert not hub._subscribers
+
+
+@pytest.mark.asyncio
+async def test_postgres_broker_message_format():
+    hub = EventHub(buffer_size=10)
+    broker = PostgresBroker(hub, dsn="", channel="wallet_events", reconnect_seconds=1)
+    wallet_id = uuid.uuid4()
+    subscription = hub.subscribe(wallet_id)
+
+    broker.publish(wallet_id, '{"event": "operation"}')
+    message = broker._outbox.get_nowait()
+    broker._on_notify(None, 1, "wallet_events", message)
+
+    assert await subscription.get() == '{"event": "operation"}'
+
+
+@pytest.mark.parametrize("wallet", [1000], indirect=True)
+@pytest.mark.asyncio
+async def test_operations_are_published(client, session: AsyncSession, wallet: Wallet):
+    subscription = event_hub.subscribe(wallet.id)
+    try:
+        response = await client.post(
+            f"/api/v1/wallets/{wallet.id}/operation",
+            json={"operation_type": "DEPOSIT", "amount": "5"},
+        )
+        assert response.status_code == 200
+        event = json.loads(await subscription.get())
+        assert event["event"] == "operation"
+        assert event["balance"] == "15.00"
+        assert event["operation"]["id"] == response.json()["id"]
+
+        await session.commit()
+        response = await client.post(
+            "/api/v1/wallets/operations:batch",
+            json={
+                "operations": [
+                    {
+                        "wallet_id": str(wallet.id),
+                        "operation_type": operation_type,
+                        "amount": amount,
+                    }
+                    for operation_type, amount in [
+                        ("WITHDRAW", "4"),
+                        ("WITHDRAW", "100"),
+                        ("DEPOSIT", "2"),
+                    ]
+                ],
+                "atomic": False,
+            },
+        )
+        assert response.status_code == 200
+        balances = [json.loads(await subscription.get())["balance"] for _ in range(2)]
+        assert balances == ["11.00", "13.00"]
+        assert subscription.queue.empty()
+    finally:
+        event_hub.unsubscribe(subscription)
+
+
+@pytest.mark.parametrize("wallet", [1000], indirect=True)
+@pytest.mark.asyncio
+async def test_sse_events(client, wallet: Wallet):
+    response = await client.get(f"/api/v1/wallets/{uuid.uuid4()}/events")
+    assert response.status_code == 404
+
+    hub = EventHub(buffer_size=1)
+    subscription = hub.subscribe(wallet.id)
+    stream = views.sse_events(subscription, '{"event": "snapshot"}', heartbeat=0.01)
+    assert await anext(stream) == 'data: {"event": "snapshot"}\n\n'
+    assert await anext(stream) == ": ping\n\n"
+    hub.dispatch(wallet.id, "{}")
+    assert await anext(stream) == "data: {}\n\n"
+    hub.dispatch(wallet.id, "1")
+    hub.dispatch(wallet.id, "2")
+    assert await anext(stream) == "event: dropped\ndata: {}\n\n"
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+
+
+class ClosedSession:
+    async def close(self) -> None:
+        pass
+
+
+def test_websocket_events(monkeypatch):
+    wallet_id = uuid.uuid4()
+
+    async def get_wallet_balance(session, uuid_wallet):
+        return (500, "RUB") if uuid_wallet == wallet_id else None
+
+    async def override_session_getter():
+        yield ClosedSession()
+
+    monkeypatch.setattr(views, "get_wallet_balance", get_wallet_balance)
+    app.dependency_overrides[db_helper.sesion_getter] = override_session_getter
+    try:
+        client = TestClient(app)
+        with client.websocket_connect(f"/api/v1/wallets/{wallet_id}/ws") as ws:
+            assert ws.receive_json() == {
+                "currency": "RUB",
+                "event": "snapshot",
+                "wallet_id": str(wallet_id),
+                "balance": "5.00",
+                "operation": None,
+            }
+            ws.portal.call(event_hub.dispatch, wallet_id, '{"event": "operation"}')
+            assert ws.receive_json() == {"event": "operation"}
+
+        with client.websocket_connect(f"/api/v1/wallets/{uuid.uuid4()}/ws") as ws:
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                ws.receive_json()
+            assert exc_info.value.code == views.WS_CLOSE_NOT_FOUND
+    finally:
+        app.dependency_overrides.clear()
+    assert not event_hub._subscribers
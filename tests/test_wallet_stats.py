@@ -0,0 +1,103 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.stats import aggregate_operations
+from app.models import Operation, OperationType, Wallet, WalletDailyStat
+
+OPERATIONS = [
+    (datetime(2026, 9, 30, 23, 0), OperationType.DEPOSIT, 10000),
+    (datetime(2026, 10, 1, 9, 0), OperationType.DEPOSIT, 5000),
+    (datetime(2026, 10, 1, 18, 0), OperationType.WITHDRAW, 1500),
+    (datetime(2026, 10, 2, 12, 0), OperationType.TRANSFER_OUT, 2000),
+    (datetime(2026, 10, 2, 13, 0), OperationType.TRANSFER_IN, 250),
+]
+
+
+@pytest.fixture
+async def wallet(session: AsyncSession) -> Wallet:
+    wallet = Wallet(email="stats@example.com", balance=0)
+    session.add(wallet)
+    await session.flush()
+    session.add_all(
+        Operation(
+            wallet_id=wallet.id,
+            operation_type=operation_type,
+            amount=amount,
+            created_at=created_at,
+        )
+        for created_at, operation_type, amount in OPERATIONS
+    )
+    await session.commit()
+    return wallet
+
+
+async def get_stats(client, session: AsyncSession, wallet_id, **params) -> dict:
+    response = await client.get(
+        f"/api/v1/wallets/{wallet_id}/stats",
+        params={"from": "2026-09-01", "to": "2026-11-01", **params},
+    )
+    await session.commit()
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_wallet_stats_by_day(client, session: AsyncSession, wallet: Wallet):
+    expected = await get_stats(client, session, wallet.id)
+    assert [bucket["period"] for bucket in expected["buckets"]] == [
+        "2026-09-30",
+        "2026-10-01",
+        "2026-10-02",
+    ]
+    october_first = expected["buckets"][1]
+    assert october_first["deposit_amount"] == "50.00"
+    assert october_first["withdraw_count"] == 1
+    assert october_first["net_amount"] == "35.00"
+    assert expected["buckets"][2]["net_amount"] == "-17.50"
+
+    # Часть операций уже в сводках, часть - ещё нет: ответ не меняется.
+    assert await aggregate_operations(session, datetime(2026, 10, 1, 12, 0)) == 2
+    assert await get_stats(client, session, wallet.id) == expected
+
+    assert await aggregate_operations(session, datetime(2026, 10, 3)) == 3
+    assert await aggregate_operations(session, datetime(2026, 10, 3)) == 0
+    assert await get_stats(client, session, wallet.id) == expected
+    rows = await session.scalar(select(func.count()).select_from(WalletDailyStat))
+    await session.commit()
+    assert rows == 5
+
+
+@pytest.mark.asyncio
+async def test_wallet_stats_by_month(client, session: AsyncSession, wallet: Wallet):
+    await aggregate_operations(session, datetime(2026, 10, 2))
+    data = await get_stats(client, session, wallet.id, granularity="month")
+    assert [bucket["period"] for bucket in data["buckets"]] == [
+        "2026-09-01",
+        "2026-10-01",
+    ]
+    october = data["buckets"][1]
+    assert october["deposit_count"] == 1
+    assert october["transfer_in_amount"] == "2.50"
+    assert october["net_amount"] == "17.50"
+
+    data = await get_stats(client, session, wallet.id, **{"from": "2026-10-02"})
+    assert len(data["buckets"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_wallet_stats_errors(client, wallet: Wallet):
+    response = await client.get(
+        f"/api/v1/wallets/{uuid4()}/stats",
+        params={"from": "2026-10-01", "to": "2026-11-01"},
+    )
+    assert response.status_code == 404
+
+    response = await client.get(
+        f"/api/v1/wallets/{wallet.id}/stats",
+        params={"from": "2026-11-01", "to": "2026-10-01"},
+    )
+    assert response.status_code == 422
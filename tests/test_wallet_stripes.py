@@ -0,0 +1,118 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import stripes_cache
+from app.core.config import settings
+from app.models import Wallet, WalletStripe
+
+
+async def stripe_balances(session: AsyncSession, wallet: Wallet) -> list[int]:
+    balances = (
+        await session.scalars(
+            select(WalletStripe.balance)
+            .where(WalletStripe.wallet_id == wallet.id)
+            .order_by(WalletStripe.stripe)
+        )
+    ).all()
+    await session.commit()
+    return list(balances)
+
+
+@pytest.mark.parametrize("wallet", [1000], indirect=True)
+@pytest.mark.asyncio
+async def test_update_wallet_stripes(
+    client, session: AsyncSession, wallet: Wallet, get_balance
+):
+    response = await client.put(
+        f"/api/v1/wallets/{wallet.id}/stripes", json={"stripes": 3}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "id": str(wallet.id),
+        "currency": "RUB",
+        "balance": "10.00",
+        "stripes": 3,
+    }
+    assert await stripe_balances(session, wallet) == [333] * 3
+    await session.refresh(wallet)
+    await session.commit()
+    assert wallet.balance == 1
+    assert await get_balance(wallet) == "10.00"
+
+    response = await client.put(
+        f"/api/v1/wallets/{wallet.id}/stripes", json={"stripes": 0}
+    )
+    assert response.status_code == 200
+    assert await stripe_balances(session, wallet) == []
+    await session.refresh(wallet)
+    assert wallet.balance == 1000
+
+
+@pytest.mark.parametrize("operation_mode", ["orm", "single_statement"])
+@pytest.mark.parametrize("wallet", [1000], indirect=True)
+@pytest.mark.asyncio
+async def test_striped_wallet_operations(
+    client,
+    session: AsyncSession,
+    monkeypatch,
+    wallet: Wallet,
+    get_balance,
+    operation_mode: str,
+):
+    monkeypatch.setattr(settings.wallet, "operation_mode", operation_mode)
+    await client.put(f"/api/v1/wallets/{wallet.id}/stripes", json={"stripes": 4})
+    stripes_cache.delete(wallet.id)
+    url = f"/api/v1/wallets/{wallet.id}/operation"
+
+    for _ in range(5):
+        response = await client.post(
+            url, json={"operation_type": "DEPOSIT", "amount": "1"}
+        )
+        assert response.status_code == 200
+    assert sum(await stripe_balances(session, wallet)) == 1500
+    assert await get_balance(wallet) == "15.00"
+
+    response = await client.post(
+        url, json={"operation_type": "WITHDRAW", "amount": "12"}
+    )
+    assert response.status_code == 200
+    assert await get_balance(wallet) == "3.00"
+    assert all(balance >= 0 for balance in await stripe_balances(session, wallet))
+
+    response = await client.post(
+        url, json={"operation_type": "WITHDRAW", "amount": "5"}
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("wallet", [1000], indirect=True)
+@pytest.mark.asyncio
+async def test_batch_collapses_stripes(
+    client, session: AsyncSession, wallet: Wallet, get_balance
+):
+    await client.put(f"/api/v1/wallets/{wallet.id}/stripes", json={"stripes": 2})
+    response = await client.post(
+        "/api/v1/wallets/operations:batch",
+        json={
+            "operations": [
+                {
+                    "wallet_id": str(wallet.id),
+                    "operation_type": "WITHDRAW",
+                    "amount": "8",
+                }
+            ]
+        },
+    )
+    assert response.json()["results"][0]["status_code"] == 200
+    assert await stripe_balances(session, wallet) == [0] * 2
+    assert await get_balance(wallet) == "2.00"
+
+
+@pytest.mark.asyncio
+async def test_update_wallet_stripes_not_found(client):
+    response = await client.put(
+        "/api/v1/wallets/00000000-0000-0000-0000-000000000000/stripes",
+        json={"stripes": 2},
+    )
+    assert response.status_code == 404
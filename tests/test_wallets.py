@@ -1,10 +1,11 @@
-from decimal import Decimal
 from uuid import UUID, uuid4
 
 import pytest
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Wallet
+from app.core.config import settings
+from app.models import Operation, Wallet
 
 
 @pytest.mark.asyncio
@@ -13,12 +14,15 @@ async def test_ping_pong(client):
 
     assert response.status_code == 200
     data = response.json()
-    assert data == {"messege": "OK"}
+    assert data["messege"] == "OK"
+    assert data["database"] == "primary"
+    # Пул движка тестовой сессии: база в памяти работает без QueuePool.
+    assert data["pool"] == {}
 
 
 @pytest.mark.asyncio
 async def test_get_wallet_success(client, session: AsyncSession):
-    wallet = Wallet(email="test@example.com", balance=Decimal("100.50"))
+    wallet = Wallet(email="test@example.com", balance=10050)
     session.add(wallet)
     await session.commit()
 
@@ -54,16 +58,15 @@ async def test_create_operation_success_deposit(
     session: AsyncSession,
     amount: str,
 ):
-    wallet = Wallet(email="test@example.com", balance=Decimal("0"))
+    wallet = Wallet(email="test@example.com", balance=0)
     session.add(wallet)
     await session.commit()
 
-    amount = Decimal(amount)
-    new_balance = wallet.balance + amount
+    new_balance = wallet.balance + int(amount) * 100
 
     response = await client.post(
         f"/api/v1/wallets/{wallet.id}/operation",
-        json={"operation_type": "DEPOSIT", "amount": str(amount)},
+        json={"operation_type": "DEPOSIT", "amount": amount},
     )
     assert response.status_code == 200
     assert wallet.balance == new_balance
@@ -92,11 +95,11 @@ async def test_create_operation_withraw_succsess(
     session: AsyncSession,
     amount: str,
 ):
-    wallet = Wallet(email="test@example.com", balance=Decimal("10"))
+    wallet = Wallet(email="test@example.com", balance=1000)
     session.add(wallet)
     await session.commit()
 
-    new_balance = wallet.balance - Decimal(amount)
+    new_balance = wallet.balance - int(amount) * 100
 
     response = await client.post(
         f"/api/v1/wallets/{wallet.id}/operation",
@@ -119,7 +122,7 @@ async def test_create_operation_invalid_amount(
     session: AsyncSession,
     amount: str,
 ):
-    wallet = Wallet(email="test@example.com", balance=Decimal("10"))
+    wallet = Wallet(email="test@example.com", balance=1000)
     session.add(wallet)
     await session.commit()
 
@@ -136,7 +139,7 @@ async def test_create_operation_withraw_insufficient_funds(
     client,
     session: AsyncSession,
 ):
-    wallet = Wallet(email="test@example.com", balance=Decimal("10"))
+    wallet = Wallet(email="test@example.com", balance=1000)
     session.add(wallet)
     await session.commit()
 
@@ -162,7 +165,49 @@ async def test_create_wallet_success(client, session: AsyncSession):
     wallet = await session.get(Wallet, UUID(data["id"]))
     assert wallet is not None
     assert wallet.email == "test@example.com"
-    assert wallet.balance == 0.0
+    assert wallet.balance == 0
+    assert wallet.currency == data["currency"] == "RUB"
+
+
+@pytest.mark.parametrize(
+    ("operation_mode", "amount", "status_code", "balance"),
+    [
+        ("orm", "5", 200, "5"),
+        ("single_statement", "5", 200, "5"),
+        ("orm", "0.5", 422, "0"),
+        ("single_statement", "0.5", 422, "0"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_create_operation_currency_scale(
+    client,
+    monkeypatch,
+    operation_mode: str,
+    amount: str,
+    status_code: int,
+    balance: str,
+):
+    monkeypatch.setattr(settings.wallet, "operation_mode", operation_mode)
+    response = await client.post(
+        "/api/v1/wallets/create-wallet",
+        json={"email": "test@example.com", "currency": "JPY"},
+    )
+    assert response.status_code == 201
+    wallet_id = response.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/wallets/{wallet_id}/operation",
+        json={"operation_type": "DEPOSIT", "amount": amount},
+    )
+    assert response.status_code == status_code
+    if status_code == 200:
+        assert response.json()["amount"] == amount
+        assert response.json()["currency"] == "JPY"
+
+    response = await client.get(
+        f"/api/v1/wallets/{wallet_id}", headers={"X-Consistency": "strict"}
+    )
+    assert response.json() == {"id": wallet_id, "currency": "JPY", "balance": balance}
 
 
 @pytest.mark.asyncio
@@ -177,7 +222,7 @@ async def test_create_wallet_invalid_email(client):
 
 @pytest.mark.asyncio
 async def test_create_wallet_duplicate_email(client, session: AsyncSession):
-    wallet = Wallet(email="test@example.com", balance=0.0)
+    wallet = Wallet(email="test@example.com", balance=0)
     session.add(wallet)
     await session.commit()
 
@@ -187,3 +232,168 @@ async def test_create_wallet_duplicate_email(client, session: AsyncSession):
     )
     assert response.status_code == 409
     assert response.json() == {"detail": "Кошелёк с таким email уже существует"}
+
+
+@pytest.mark.parametrize(
+    ("operation_mode", "operation_type", "amount", "expected_balance"),
+    [
+        ("orm", "DEPOSIT", "5", 1500),
+        ("orm", "WITHDRAW", "4", 600),
+        ("single_statement", "DEPOSIT", "5", 1500),
+        ("single_statement", "WITHDRAW", "4", 600),
+    ],
+)
+@pytest.mark.asyncio
+async def test_create_operation_modes(
+    client,
+    session: AsyncSession,
+    monkeypatch,
+    operation_mode: str,
+    operation_type: str,
+    amount: str,
+    expected_balance: int,
+):
+    monkeypatch.setattr(settings.wallet, "operation_mode", operation_mode)
+    wallet = Wallet(email="test@example.com", balance=1000)
+    session.add(wallet)
+    await session.commit()
+
+    response = await client.post(
+        f"/api/v1/wallets/{wallet.id}/operation",
+        json={"operation_type": operation_type, "amount": amount},
+    )
+    assert response.status_code == 200
+    assert wallet.balance == expected_balance
+    operation = await session.get(Operation, UUID(response.json()["id"]))
+    assert operation is not None
+    assert operation.amount == int(amount) * 100
+
+
+@pytest.mark.parametrize("operation_mode", ["orm", "single_statement"])
+@pytest.mark.asyncio
+async def test_create_operation_modes_insufficient_funds(
+    client,
+    session: AsyncSession,
+    monkeypatch,
+    operation_mode: str,
+):
+    monkeypatch.setattr(settings.wallet, "operation_mode", operation_mode)
+    wallet = Wallet(email="test@example.com", balance=1000)
+    session.add(wallet)
+    await session.commit()
+
+    response = await client.post(
+        f"/api/v1/wallets/{wallet.id}/operation",
+        json={"operation_type": "WITHDRAW", "amount": "10.01"},
+    )
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Недостаточно средств"}
+    await session.refresh(wallet)
+    assert wallet.balance == 1000
+
+
+@pytest.mark.asyncio
+async def test_create_operations_batch_per_item(client, session: AsyncSession):
+    first = Wallet(email="first@example.com", balance=1000)
+    second = Wallet(email="second@example.com", balance=0)
+    session.add_all([first, second])
+    await session.commit()
+
+    response = await client.post(
+        "/api/v1/wallets/operations:batch",
+        json={
+            "atomic": False,
+            "operations": [
+                {
+                    "wallet_id": str(second.id),
+                    "operation_type": "DEPOSIT",
+                    "amount": "5",
+                },
+                {
+                    "wallet_id": str(first.id),
+                    "operation_type": "WITHDRAW",
+                    "amount": "7",
+                },
+                {
+                    "wallet_id": str(first.id),
+                    "operation_type": "WITHDRAW",
+                    "amount": "7",
+                },
+                {"wallet_id": str(uuid4()), "operation_type": "DEPOSIT", "amount": "1"},
+                {
+                    "wallet_id": str(second.id),
+                    "operation_type": "WITHDRAW",
+                    "amount": "5",
+                },
+            ],
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status_code"] for result in results] == [200, 200, 422, 404, 200]
+    assert results[1]["operation"]["wallet_id"] == str(first.id)
+    assert results[2]["detail"] == "Недостаточно средств"
+
+    balances = dict(
+        (await session.execute(select(Wallet.id, Wallet.balance))).tuples().all()
+    )
+    assert balances == {first.id: 300, second.id: 0}
+    assert await session.scalar(select(func.count(Operation.id))) == 3
+
+
+@pytest.mark.asyncio
+async def test_create_operations_batch_atomic(client, session: AsyncSession):
+    wallet = Wallet(email="test@example.com", balance=1000)
+    session.add(wallet)
+    await session.commit()
+    wallet_id = wallet.id
+
+    response = await client.post(
+        "/api/v1/wallets/operations:batch",
+        json={
+            "operations": [
+                {
+                    "wallet_id": str(wallet_id),
+                    "operation_type": "DEPOSIT",
+                    "amount": "5",
+                },
+                {
+                    "wallet_id": str(wallet_id),
+                    "operation_type": "WITHDRAW",
+                    "amount": "20",
+                },
+            ],
+        },
+    )
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Операция 1: Недостаточно средств"}
+    assert await session.scalar(
+        select(Wallet.balance).where(Wallet.id == wallet_id)
+    ) == 1000
+    assert await session.scalar(select(func.count(Operation.id))) == 0
+
+
+@pytest.mark.asyncio
+async def test_create_wallets_bulk(client, session: AsyncSession):
+    session.add(Wallet(email="taken@example.com", balance=0))
+    await session.commit()
+
+    response = await client.post(
+        "/api/v1/wallets/create-wallets:bulk",
+        json={
+            "emails": [
+                "first@example.com",
+                "taken@example.com",
+                "second@example.com",
+                "first@example.com",
+            ],
+        },
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert sorted(wallet["email"] for wallet in data["created"]) == [
+        "first@example.com",
+        "second@example.com",
+    ]
+    assert data["duplicates"] == ["taken@example.com"]
+    assert await session.scalar(select(func.count(Wallet.id))) == 3